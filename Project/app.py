@@ -1,34 +1,117 @@
-from flask import Flask, render_template, request, redirect, url_for, Response, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, Response, jsonify, session, g
 import pandas as pd
-import io
 import re
-import threading
 import time
 import os
-from helper import important_words_from_texts, generate_ngrams, generate_podcast_strings_for_keywordplanner
-from queries_list import one_word_list, two_word_list, synonym_for_one_word, synonym_for_two_word
+import json
+from helper import important_words_from_texts
+from keyword_cache import keyword_cache
+from extraction import (
+    EARLY_EXTRACTION, extract_important_words, start_early_extraction,
+    take_early_extraction, discard_early_extraction
+)
+from ingest import read_episodes_csv, CSVValidationError
+from suggestions import SuggestionCache, build_suggestion_bundle
+from keyword_index import current_index, status_cache_stats
+from corpus_ranking import rank_keywords
+from dedupe import find_duplicates
+from episode_search import EpisodeIndex, SearchQueryError
+from title_index import TitleIndex, TitleSearch, DuplicateTitleError, parse_row
+from query_table import QueryTable
+from mutation_log import ADD_QUERY, REMOVE_QUERY
+from export import MIMETYPES as EXPORT_MIMETYPES, ExportFormatError, export_stream
+from table_pages import PREVIEW_ROWS, table_page, preview_html, forget_upload, page_cache
+from session_store import create_store, DEFAULT_SESSION_DIR, MemoryStore
+from jobs import JobQueue, JobCancelled
+from profiling import PROFILE_HEADER, Profile, list_profiles, profile_file, token_matches
+from metrics import registry, stage, REQUEST_SECONDS, STAGE_SECONDS, EXTRACTION_ROWS, EXTRACTION_SECONDS
 import uuid
-try:
-    from cachetools import TTLCache
-    CACHETOOLS_AVAILABLE = True
-except ImportError:
-    # Fallback for environments without cachetools
-    CACHETOOLS_AVAILABLE = False
-    print("Warning: cachetools not available, using fallback cache")
 
 app = Flask(__name__)
 # Use environment variable for secret key in production, fallback for development
 app.secret_key = os.environ.get('SECRET_KEY', 'super_secret_key_dev_only')
 
-# Create a TTL cache: maxsize=100 means it can hold up to 100 users' data at once  - ttl=14400 means each user's data lives for 4 hours (14400 seconds)
-if CACHETOOLS_AVAILABLE:
-    user_data = TTLCache(maxsize=100, ttl=14400)
-else:
-    # Fallback: simple dict with manual cleanup
-    user_data = {}
-
-# Thread lock for thread-safe operations
-data_lock = threading.Lock()
+# Per-user data: in this process by default, or on disk shared by all workers (SESSION_BACKEND=disk).
+# By default a user's data lives for 4 hours after the last save, for at most 100 users at once
+user_store = create_store()
+
+# Keyword-extraction jobs and their chunk checkpoints survive restarts (see jobs.py).
+# With the memory backend only the worker holding the upload can run its job
+job_queue = JobQueue(
+    os.environ.get("JOB_DB", os.path.join(os.environ.get("SESSION_DIR", DEFAULT_SESSION_DIR), "jobs.sqlite3")),
+    pin_jobs=isinstance(user_store, MemoryStore),
+)
+
+# Suggestion bundles per (upload id, row); the first rows are prefilled once keywords are extracted
+suggestion_cache = SuggestionCache(maxsize=int(os.environ.get("SUGGESTION_CACHE_SIZE", 500)))
+SUGGESTION_PREFILL_ROWS = int(os.environ.get("SUGGESTION_PREFILL_ROWS", 50))
+
+# /suggestions/batch: episodes per JSON response (larger batches must be streamed) and rows per pass
+SUGGESTION_BATCH_MAX_ROWS = int(os.environ.get("SUGGESTION_BATCH_MAX_ROWS", 500))
+SUGGESTION_BATCH_CHUNK_ROWS = 256
+
+# Titles rendered into the results page dropdown; the rest are found through /titles/search
+RESULTS_TITLE_OPTIONS = 50
+TITLE_SEARCH_MAX_RESULTS = 50
+
+# Minimum seconds between two events of the progress stream
+PROGRESS_STREAM_INTERVAL = float(os.environ.get("PROGRESS_STREAM_INTERVAL", 0.5))
+PROGRESS_STREAM_KEEPALIVE = 15
+
+# Values /metrics reads at scrape time (this worker)
+registry.gauge("qg_session_users", "Users whose data the session store holds.", lambda: user_store.stats()["users"])
+registry.gauge("qg_session_evictions", "Users evicted from the session store so far.", lambda: user_store.stats()["evictions"])
+registry.gauge("qg_jobs", "Extraction jobs by state (running_here: run by this worker).",
+               lambda: {(k,): v for k, v in job_queue.stats().items() if k in ("queued", "running", "running_here")},
+               labelnames=("state",))
+registry.gauge("qg_cache_entries", "Entries in each in-process cache.",
+               lambda: {("suggestions",): len(suggestion_cache), ("table_pages",): len(page_cache)},
+               labelnames=("cache",))
+registry.gauge("qg_cache_evictions", "Evictions from each in-process cache.",
+               lambda: {("suggestions",): suggestion_cache.stats()["evictions"],
+                        ("table_pages",): page_cache.stats()["evictions"]},
+               labelnames=("cache",))
+
+
+@app.before_request
+def start_job_dispatcher():
+    # Only processes that serve requests run jobs, not process-pool children or the reloader's parent
+    if not job_queue.started:
+        job_queue.start(run_extraction_job)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def start_request_profile():
+    # Opt-in: only requests carrying the admin token in X-Profile (see profiling.py)
+    if token_matches(request.headers.get(PROFILE_HEADER)):
+        g.profile = Profile("request", f"{request.method} {request.path}")
+
+@app.after_request
+def stop_request_profile(response):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        summary = profile.stop(status=response.status_code)
+        response.headers["X-Profile-Id"] = summary["id"]
+    return response
+
+@app.teardown_request
+def stop_failed_request_profile(error=None):
+    # after_request is skipped when the view raises; the profile must still be stopped and saved
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.stop(status=500, error=repr(error) if error is not None else None)
+
+@app.after_request
+def record_request_time(response):
+    # Streamed bodies (downloads, the progress stream) are timed up to their first byte
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
 
 
 def get_user_id():
@@ -41,19 +124,81 @@ def get_user_data(user_id: str | None = None):
     """Get the user's full data dict (or empty if not set).
     If user_id is provided, use it (for background threads). Otherwise, use the session-bound id.
     """
-    with data_lock:
-        uid = user_id or get_user_id()
-        return user_data.get(uid, {})
+    uid = user_id or get_user_id()
+    return user_store.get(uid)
 
 def save_user_data(new_data: dict, user_id: str | None = None):
     """Update or overwrite per-user data and refresh TTL.
     If user_id is provided, use it (for background threads). Otherwise, use the session-bound id.
     """
-    with data_lock:
-        uid = user_id or get_user_id()
-        data = user_data.get(uid, {})
-        data.update(new_data)
-        user_data[uid] = data  # refresh TTL
+    uid = user_id or get_user_id()
+    user_store.update(uid, new_data)
+
+def save_user_df(df, user_id: str | None = None):
+    """Save an edited DataFrame and bump its version so cached table pages are rebuilt."""
+    save_user_data({"df": df, "data_version": time.time_ns()}, user_id=user_id)
+
+def cached_important_words(texts):
+    """Important Words for a few descriptions (lazy per-row path), checking the keyword cache first."""
+    if keyword_cache is None:
+        return important_words_from_texts(texts)
+    return keyword_cache.lookup_or_extract(texts, important_words_from_texts)
+
+def resolve_episode_row(user: dict, title, row=None):
+    """Return the positional row of an episode, or None if the title is unknown.
+    Raises DuplicateTitleError if the title is shared by several episodes and no row was sent.
+    """
+    title_index = user.get("title_index")
+    if title_index is None:
+        title_index = TitleIndex(user["df"]["Title"].tolist())
+    return title_index.resolve(title, parse_row(row))
+
+def save_episode_values(row_id: int, values: dict, user_id: str | None = None):
+    """Write {column: value} into one episode's row.
+    The store records it as a cell edit instead of re-saving the whole DataFrame.
+    """
+    uid = user_id or get_user_id()
+    user_store.apply_edits(uid, row_id, values)
+
+def episode_bundle(user: dict, row_id: int, iw_value):
+    """The episode's suggestion bundle, with grams in corpus-ranked order once the upload is processed."""
+    ranking = user.get("keyword_ranking")
+    ranked = ranking.grams(row_id) if ranking is not None else None
+    return suggestion_cache.get_or_build(user.get("upload_id"), row_id, iw_value or "", ranked)
+
+def episode_duplicates(user: dict, row_id: int) -> list:
+    """[{row, title, exact}] for the other copies of an episode (see dedupe.py)."""
+    groups = user.get("duplicate_groups")
+    if groups is None:
+        return []
+    titles = user["df"]["Title"]
+    return [
+        {"row": r, "title": titles.iat[r], "exact": groups.is_exact(row_id, r)}
+        for r in groups.rows(row_id) if r != row_id
+    ]
+
+def added_queries(user: dict, row_id: int) -> list:
+    """The episode's saved queries as a list."""
+    queries = user.get("queries")
+    return queries.queries(row_id) if queries is not None else []
+
+def saved_query_count(user: dict, row_id: int) -> int:
+    """The episode's query count as downloads show it, including uploaded counts whose queries weren't listed."""
+    queries = user.get("queries")
+    return queries.count(row_id) if queries is not None else 0
+
+def title_options(df, selected_row: int | None = None) -> list:
+    """[(position, title)] for the results dropdown: the first episodes plus the selected one."""
+    rows = list(range(min(RESULTS_TITLE_OPTIONS, len(df))))
+    if selected_row is not None and selected_row not in rows:
+        rows.insert(0, selected_row)
+    titles = df["Title"].to_numpy()[rows].tolist()
+    return [(row + 1, title) for row, title in zip(rows, titles)]
+
+def save_cell_edits(edits: list, user_id: str | None = None):
+    """Write (row, column, value) edits across many rows as one store update."""
+    uid = user_id or get_user_id()
+    user_store.apply_cell_edits(uid, edits)
 
 
 
@@ -72,37 +217,66 @@ def home():
         try:
             file = request.files.get("file")
             if file and file.filename.endswith(".csv"):
-                df = pd.read_csv(file)
                 uploaded_filename = file.filename
-
-                # Validate required columns
-                if "Title" not in df.columns or "Description" not in df.columns:
-                    message = "CSV must contain columns: Title, Description"
+                upload_id = uuid.uuid4().hex
+
+                # Parse in bounded chunks; with EARLY_EXTRACTION each chunk's keywords
+                # are extracted while the rest of the file is still being read
+                on_chunk = None
+                if EARLY_EXTRACTION:
+                    on_chunk = lambda start_row, chunk: start_early_extraction(
+                        upload_id, start_row, chunk["Description"].tolist()
+                    )
+                try:
+                    with stage("csv_parse"):
+                        df = read_episodes_csv(file, on_chunk=on_chunk)
+                    # Saved queries live in their own table until download
+                    df, queries = QueryTable.from_frame(df)
+                except CSVValidationError as e:
+                    discard_early_extraction(upload_id)
+                    message = str(e)
                     return render_template("home.html", rows=None, cols=None, filename=None, message=message, table=None)
-
-                # Column handling rules:
-                # - If CSV has only Title and Description, add 3 new columns with defaults
-                # - If it has 3+ columns, preserve provided values; only add missing required columns with defaults
-                existing_cols = set(df.columns)
-                required_defaults = {
-                    "Analyzed": False,
-                    "No of Queries": 0,
-                    "Added Queries": ""
-                }
-                # Only add the three tracking columns if missing; do not create important_words here
-                for col, default_val in required_defaults.items():
-                    if col not in existing_cols:
-                        df[col] = default_val
+                except Exception:
+                    discard_early_extraction(upload_id)
+                    raise
 
                 message = "CSV uploaded successfully. Click 'Generate Important Queries' to continue."
 
+                # Suggestions computed for a previous upload are no longer reachable
+                previous_upload_id = get_user_data().get("upload_id")
+                if previous_upload_id:
+                    suggestion_cache.invalidate(previous_upload_id)
+                    discard_early_extraction(previous_upload_id)
+                    forget_upload(previous_upload_id)
+
+                with stage("dedupe_exact"):
+                    exact_duplicates = find_duplicates(df["Description"].tolist())
+                # An upload that already has Important Words is searchable right away
+                if "Important Words" in df.columns:
+                    episode_index = EpisodeIndex.build(df["Important Words"].tolist())
+                else:
+                    episode_index = EpisodeIndex(len(df))
+
+                titles = df["Title"].tolist()
+                with stage("title_search"):
+                    title_search = TitleSearch(titles)
+
                 # Save all user-specific data in cache
                 save_user_data({
                     "df": df,
+                    "queries": queries,
+                    "upload_id": upload_id,
+                    "data_version": time.time_ns(),
+                    "title_index": TitleIndex(titles),
+                    "title_search": title_search,
+                    "keyword_ranking": None,
+                    "duplicate_groups": exact_duplicates,
+                    "episode_index": episode_index,
                     "uploaded_filename": uploaded_filename,
-                    "current_csv_file": uploaded_filename,  # optional
-                    "processing_state": {}  # Reset processing state
+                    "current_csv_file": uploaded_filename  # optional
                 })
+                job_queue.cancel(get_user_id())  # A job for the previous upload is no longer needed
+                user_store.progress(get_user_id()).reset()  # Reset processing state
             else:
                 message = "Please upload a valid CSV file."
         except Exception as e:
@@ -118,12 +292,16 @@ def home():
     uploaded_filename = user.get("uploaded_filename")
 
 
-    # If a CSV is already uploaded, render the table
+    # If a CSV is already uploaded, render only the first page; the rest comes from /data
+    queries = user.get("queries")
     if df is not None:
-        table_html = df.to_html(classes="table table-striped", index=False)
+        with stage("preview_html"):
+            table_html = preview_html(df, user.get("upload_id"), user.get("data_version"), queries)
 
-    rows = df.shape[0] if df is not None else None
-    cols = df.shape[1] if df is not None else None
+    rows = cols = None
+    if df is not None:
+        rows = df.shape[0]
+        cols = len(queries.column_names(df.columns)) if queries is not None else df.shape[1]
 
     return render_template("home.html",
                            rows=rows,
@@ -135,120 +313,226 @@ def home():
 
 
 
+# TABLE DATA - server-side pages for the home page DataTable
+@app.route("/data", methods=["GET"])
+def data():
+    user = get_user_data()
+    df = user.get("df")
+
+    if df is None:
+        return jsonify({"columns": [], "data": [], "recordsTotal": 0, "recordsFiltered": 0})
+
+    args = request.args
+    try:
+        # offset/limit, or DataTables' start/length
+        offset = int(args.get("offset", args.get("start", 0)))
+        limit = int(args.get("limit", args.get("length", PREVIEW_ROWS)))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    columns = [c.strip() for c in args.get("columns", "").split(",") if c.strip()] or None
+    title_filter = args.get("title", args.get("search[value]", ""))
+
+    page = table_page(df, user.get("upload_id"), user.get("data_version"),
+                      offset=offset, limit=limit, columns=columns, title_filter=title_filter,
+                      queries=user.get("queries"))
+    if "draw" in args:
+        page = dict(page, draw=int(args.get("draw") or 0))
+    return jsonify(page)
+
+
+
+
 # BACKGROUND PROCESSING
-def process_important_words(uid: str):
+def process_important_words(uid: str, job: dict | None = None):
+    """Extract Important Words for the user's upload; returns an error message, or None when done.
+    With a queue job, finished chunks are checkpointed and a resumed job skips them.
+    """
+    # Progress is updated in place; readers see each update without any lock
+    progress = user_store.progress(uid)
     try:
         user = get_user_data(uid)
         df = user.get("df")
-        processing_state = user.get("processing_state", {})
-        
+        upload_id = user.get("upload_id")
+
         if df is None:
             # Update processing state to error
-            processing_state.update({
-                "percent": 0,
-                "eta": "00:00:00",
-                "done": False,
-                "in_progress": False,
-                "error": "No data available"
-            })
-            save_user_data({"processing_state": processing_state}, user_id=uid)
-            return
-        
+            progress.update(
+                percent=0,
+                eta="00:00:00",
+                done=False,
+                in_progress=False,
+                error="No data available"
+            )
+            return "No data available"
+        if job is not None and job["upload_id"] != upload_id:
+            # The user uploaded another file since the job was queued
+            raise JobCancelled(job["id"])
+
         total_rows = len(df)
-        batch_size = 10
-        important_words_list = []
+        done_batches = job_queue.checkpoints(job["id"]) if job is not None else None
+        resumed_rows = sum(end - start for start, end, _ in done_batches or ())
 
         # Initialize processing state
-        processing_state.update({
-            "in_progress": True,
-            "started_at": time.time(),
-            "percent": 0,
-            "eta": "00:00:00",
-            "done": False,
-            "error": None
-        })
-        save_user_data({"processing_state": processing_state}, user_id=uid)
+        started_at = time.time()
+        progress.reset(in_progress=True, started_at=started_at, percent=int(resumed_rows / max(total_rows, 1) * 100))
 
-        for start in range(0, total_rows, batch_size):
-            end = min(start + batch_size, total_rows)
-            batch_texts = df["Description"].iloc[start:end].tolist()
-            
-            try:
-                batch_words = important_words_from_texts(batch_texts)
-                important_words_list.extend(batch_words)
-            except Exception as e:
-                # Handle batch processing error
-                processing_state.update({
-                    "percent": 0,
-                    "eta": "00:00:00",
-                    "done": False,
-                    "in_progress": False,
-                    "error": f"Processing error: {str(e)}"
-                })
-                save_user_data({"processing_state": processing_state})
-                return
-            
+        def on_batch_done(processed):
             # Update progress & ETA
-            processed = end
             progress_ratio = processed / max(total_rows, 1)
-            processing_state["percent"] = int(progress_ratio * 100)
-            elapsed = time.time() - (processing_state["started_at"] or time.time())
-            # Avoid division by zero for very first batch
-            if progress_ratio > 0:
-                estimated_total = elapsed / progress_ratio
-                remaining = max(0, estimated_total - elapsed)
+            elapsed = time.time() - started_at
+            # ETA from the rows done in this run (a resumed job starts part-way through)
+            if processed > resumed_rows:
+                remaining = elapsed / (processed - resumed_rows) * (total_rows - processed)
             else:
                 remaining = 0
             hrs = int(remaining // 3600)
             mins = int((remaining % 3600) // 60)
             secs = int(remaining % 60)
-            processing_state["eta"] = f"{hrs:02d}:{mins:02d}:{secs:02d}"
-            
-            # Save updated state back to user cache
-            save_user_data({"processing_state": processing_state}, user_id=uid)
-            time.sleep(0.001)  # small delay
+            progress.update(percent=int(progress_ratio * 100), eta=f"{hrs:02d}:{mins:02d}:{secs:02d}")
+
+        on_batch_result = None
+        if job is not None:
+            on_batch_result = lambda start, end, words: job_queue.save_checkpoint(job["id"], start, end, words)
+
+        try:
+            # Inline batches by default, or a process pool when EXTRACTION_PROCESSES is set
+            extraction_started = time.perf_counter()
+            important_words_list = extract_important_words(
+                df["Description"], on_batch_done,
+                early_jobs=take_early_extraction(upload_id),
+                done_batches=done_batches,
+                on_batch_result=on_batch_result
+            )
+            # Rows/second = rate(qg_extraction_rows_total) / rate(qg_extraction_seconds_total)
+            extraction_seconds = time.perf_counter() - extraction_started
+            STAGE_SECONDS.observe(extraction_seconds, "keyword_extraction")
+            EXTRACTION_ROWS.inc(total_rows - resumed_rows)
+            EXTRACTION_SECONDS.inc(extraction_seconds)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            # Handle batch processing error
+            progress.update(
+                percent=0,
+                eta="00:00:00",
+                done=False,
+                in_progress=False,
+                error=f"Processing error: {str(e)}"
+            )
+            return f"Processing error: {str(e)}"
+
+        if get_user_data(uid).get("upload_id") != upload_id:
+            # Replaced while extracting: don't write these keywords into the new upload
+            raise JobCancelled(job["id"] if job is not None else None)
 
         # Save the results to the user's DataFrame
         df["Important Words"] = important_words_list
 
-        # Update processing state to finished
-        processing_state.update({
-            "percent": 100,
-            "eta": "00:00:00",
-            "done": True,
-            "in_progress": False,
-            "error": None
-        })
+        # Reverse lookup from keywords to episodes, for /search
+        with stage("episode_index"):
+            episode_index = EpisodeIndex.build(important_words_list)
 
-        # Save final state and updated DataFrame back to user cache
+        # Save the updated DataFrame before reporting done, so /results finds it
         save_user_data({
             "df": df,
-            "processing_state": processing_state
+            "data_version": time.time_ns(),
+            "episode_index": episode_index
         }, user_id=uid)
-        
+
+        # Update processing state to finished
+        progress.update(
+            percent=100,
+            eta="00:00:00",
+            done=True,
+            in_progress=False,
+            error=None
+        )
+
+        # The results are usable now; the corpus-wide stages refine them while the user works
+        rank_and_group_episodes(uid, upload_id, df["Description"].tolist(), important_words_list)
+        return None
+
+    except JobCancelled:
+        raise
     except Exception as e:
         # Handle any unexpected errors
-        processing_state = get_user_data(uid).get("processing_state", {})
-        processing_state.update({
-            "percent": 0,
-            "eta": "00:00:00",
-            "done": False,
-            "in_progress": False,
-            "error": f"Unexpected error: {str(e)}"
-        })
-        save_user_data({"processing_state": processing_state}, user_id=uid)
+        progress.update(
+            percent=0,
+            eta="00:00:00",
+            done=False,
+            in_progress=False,
+            error=f"Unexpected error: {str(e)}"
+        )
+        return f"Unexpected error: {str(e)}"
+
+
+def rank_and_group_episodes(uid: str, upload_id, descriptions: list, important_words_list: list):
+    """Keyword ranking and near-duplicate groups for a processed upload, saved once both are ready.
+
+    Runs after the job has reported done: until then suggestions keep the order of
+    appearance and duplicates are the exact ones found at upload.
+    """
+    # Rank every episode's keywords against the whole show (see corpus_ranking.py)
+    try:
+        with stage("keyword_ranking"):
+            keyword_ranking = rank_keywords(descriptions)
+    except Exception:
+        app.logger.exception("Keyword ranking failed, keeping keywords in order of appearance")
+        keyword_ranking = None
+
+    # Add near duplicates to the exact ones found at upload, now that word sets are known
+    duplicate_groups = get_user_data(uid).get("duplicate_groups")
+    try:
+        with stage("dedupe_near"):
+            duplicate_groups = find_duplicates(
+                descriptions, important_words_list,
+                exact_ids=duplicate_groups.exact_ids if duplicate_groups is not None else None
+            )
+    except Exception:
+        app.logger.exception("Near-duplicate detection failed, keeping exact duplicates only")
+
+    if get_user_data(uid).get("upload_id") != upload_id:
+        # Replaced in the meantime: these belong to the old upload
+        return
+    save_user_data({"keyword_ranking": keyword_ranking, "duplicate_groups": duplicate_groups}, user_id=uid)
 
+    # Bundles built so far are unranked
+    suggestion_cache.invalidate(upload_id)
+    # Prefill suggestion bundles for the first episodes so early clicks are lookups
+    try:
+        for row_id, iw_value in enumerate(important_words_list[:SUGGESTION_PREFILL_ROWS]):
+            ranked = keyword_ranking.grams(row_id) if keyword_ranking is not None else None
+            suggestion_cache.get_or_build(upload_id, row_id, iw_value, ranked)
+    except Exception:
+        # The job already reported done; bundles are built on demand instead
+        app.logger.exception("Suggestion prefill failed")
 
 
+def run_extraction_job(job: dict):
+    profile = Profile("job", f"process_important_words job {job['id']}") if job.get("profile") else None
+    error = "Extraction stopped unexpectedly"
+    try:
+        error = process_important_words(job["uid"], job)
+        return error
+    except JobCancelled:
+        error = None
+        raise
+    finally:
+        if error and user_store.progress_snapshot(job["uid"])["in_progress"]:
+            # However the job failed, /progress must not keep reporting it as running
+            user_store.progress(job["uid"]).update(in_progress=False, done=False, eta="00:00:00", error=error)
+        if profile is not None:
+            profile.stop(job_id=job["id"], rows=job["total_rows"], error=error)
 
 
 # START PROCESSING
 @app.route("/process", methods=["POST"])
 def process():
     try:
-        user = get_user_data()
+        uid = get_user_id()
+        user = get_user_data(uid)
         df = user.get("df")
-        processing_state = user.get("processing_state", {})
 
         if df is None:
             return jsonify({"status": "no_csv_uploaded", "error": "No CSV uploaded yet"}), 400
@@ -257,32 +541,17 @@ def process():
         if "Important Words" in df.columns and df["Important Words"].notna().any():
             return jsonify({"status": "already_processed", "redirect": url_for("results")})
 
-        # If already running, just acknowledge
-        if processing_state and processing_state.get("in_progress") and not processing_state.get("done"):
+        # If already queued or running, just acknowledge
+        if job_queue.active_job(uid) is not None:
             return jsonify({"status": "already_running"})
 
-        # If there was a previous error, reset the state
-        if processing_state.get("error"):
-            processing_state = {}
-
-        # Initialize or reset processing_state
-        processing_state = {
-            "in_progress": True,
-            "started_at": time.time(),
-            "percent": 0,
-            "eta": "00:00:00",
-            "done": False,
-            "error": None
-        }
-
-        # Save state tied to this user id
-        uid = get_user_id()
-        save_user_data({"processing_state": processing_state}, user_id=uid)
+        # Initialize or reset the processing state (clears a previous error)
+        user_store.progress(uid).reset(in_progress=True, started_at=time.time())
 
-        # Start processing in a background thread
-        thread = threading.Thread(target=process_important_words, args=(uid,), daemon=True)
-        thread.start()
-        return jsonify({"status": "started"})
+        # Queue the job; a worker with a free slot runs it in the background
+        profile = token_matches(request.headers.get(PROFILE_HEADER))
+        job_id = job_queue.submit(uid, user.get("upload_id"), len(df), profile=profile)
+        return jsonify({"status": "started", "job_id": job_id})
         
     except Exception as e:
         return jsonify({"status": "error", "error": f"Failed to start processing: {str(e)}"}), 500
@@ -292,19 +561,20 @@ def process():
 
 
 # PROGRESS POLLING
+def progress_payload(processing_state: dict) -> dict:
+    return {
+        "in_progress": bool(processing_state.get("in_progress", False)),
+        "percent": int(processing_state.get("percent", 0)),
+        "eta": processing_state.get("eta", "00:00:00"),
+        "done": bool(processing_state.get("done", False)),
+        "error": processing_state.get("error")
+    }
+
 @app.route("/progress", methods=["GET"])
 def progress():
+    # Polling fallback for browsers without EventSource
     try:
-        user = get_user_data()
-        processing_state = user.get("processing_state", {})
-
-        return jsonify({
-            "in_progress": bool(processing_state.get("in_progress", False)),
-            "percent": int(processing_state.get("percent", 0)),
-            "eta": processing_state.get("eta", "00:00:00"),
-            "done": bool(processing_state.get("done", False)),
-            "error": processing_state.get("error")
-        })
+        return jsonify(progress_payload(user_store.progress_snapshot(get_user_id())))
     except Exception as e:
         return jsonify({
             "in_progress": False,
@@ -315,6 +585,106 @@ def progress():
         })
 
 
+def progress_events(uid: str):
+    """Yield SSE messages until the job is done, failed or not running."""
+    seq = None
+    last_payload = None
+    last_sent = 0.0
+    while True:
+        record = user_store.live_progress(uid)
+        if record is not None:
+            # Sleep until the job reports something new
+            seq, _ = record.wait(seq, timeout=PROGRESS_STREAM_KEEPALIVE)
+        elif last_payload is not None:
+            # The job runs in another worker: read the shared state at the stream rate
+            time.sleep(PROGRESS_STREAM_INTERVAL)
+
+        payload = progress_payload(user_store.progress_snapshot(uid))
+        finished = payload["done"] or payload["error"] or not payload["in_progress"]
+        if payload != last_payload:
+            # Throttle: coalesce updates that arrive faster than the stream rate
+            wait = last_sent + PROGRESS_STREAM_INTERVAL - time.monotonic()
+            if wait > 0 and not finished:
+                time.sleep(wait)
+                payload = progress_payload(user_store.progress_snapshot(uid))
+                finished = payload["done"] or payload["error"] or not payload["in_progress"]
+            yield f"data: {json.dumps(payload)}\n\n"
+            last_payload = payload
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= PROGRESS_STREAM_KEEPALIVE:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        if finished:
+            return
+
+
+@app.route("/progress/stream", methods=["GET"])
+def progress_stream():
+    """Server-Sent Events with the same payload as /progress, pushed as the job advances."""
+    return Response(
+        progress_events(get_user_id()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+
+
+
+
+# JOB METRICS
+@app.route("/jobs/metrics", methods=["GET"])
+def jobs_metrics():
+    """Queue depth and running jobs (all workers), and this worker's running jobs and cap."""
+    return jsonify(job_queue.stats())
+
+
+# METRICS
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Latency histograms, extraction throughput, lock waits and store/job gauges in Prometheus text format (this worker)."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+# PROFILES - admin only, with the PROFILE_TOKEN in X-Profile or ?token=
+def profile_admin_allowed() -> bool:
+    return token_matches(request.headers.get(PROFILE_HEADER) or request.args.get("token"))
+
+@app.route("/profiles", methods=["GET"])
+def profiles():
+    """Summaries of the most recent request and job profiles."""
+    if not profile_admin_allowed():
+        return jsonify({"success": False, "error": "Not found"}), 404
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 200)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    return jsonify({"success": True, "profiles": list_profiles(limit)})
+
+@app.route("/profiles/<profile_id>.<ext>", methods=["GET"])
+def profile_download(profile_id, ext):
+    """One stored profile file (pstats, collapsed stacks or its JSON summary)."""
+    path = profile_file(profile_id, ext) if profile_admin_allowed() else None
+    if path is None:
+        return jsonify({"success": False, "error": "Not found"}), 404
+    with open(path, "rb") as f:
+        body = f.read()
+    mimetype = "application/octet-stream" if ext == "pstats" else "text/plain" if ext == "collapsed" else "application/json"
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={profile_id}.{ext}"})
+
+
+# CACHE STATS
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the keyword, keyword-status, suggestion and table-page caches (this worker)."""
+    return jsonify({
+        "keywords": keyword_cache.stats() if keyword_cache is not None else None,
+        "keyword_status": status_cache_stats(),
+        "suggestions": suggestion_cache.stats(),
+        "table_pages": page_cache.stats()
+    })
+
+
 
 
 
@@ -350,64 +720,64 @@ def results():
         analyzed_count = 0
     total_episodes = int(df.shape[0])
 
+    # Dropdown marks for episodes that have duplicates: {row: group number}
+    duplicate_groups = user.get("duplicate_groups")
+    duplicate_labels = duplicate_groups.labels() if duplicate_groups is not None else {}
+
     # POST: when user clicks "Get Suggestions" button
     if request.method == "POST":
         title = request.form.get("title")
-        if not title or title not in df["Title"].values:
+        message = None
+        try:
+            row_id = resolve_episode_row(user, title, request.form.get("row")) if title else None
+        except DuplicateTitleError as e:
+            row_id, message = None, str(e)
+        if row_id is None:
             return render_template(
                 "results.html",
-                titles=df["Title"].tolist(),
+                message=message,
+                titles=title_options(df),
+                duplicate_labels=duplicate_labels,
                 download_ready=("Important Words" in df.columns),
                 analyzed_count=analyzed_count,
                 total_episodes=total_episodes
             )
 
-        row = df[df["Title"] == title].iloc[0]
+        row = df.iloc[row_id]
 
         # Ensure important words exist for this episode
         iw_value = row.get("Important Words") if isinstance(row, dict) else row["Important Words"]
         if not iw_value or (isinstance(iw_value, float) and pd.isna(iw_value)) or (isinstance(iw_value, str) and not iw_value.strip()):
             desc_text = row["Description"]
-            computed = important_words_from_texts([desc_text])
+            computed = cached_important_words([desc_text])
             iw_string = computed[0] if isinstance(computed, (list, tuple)) and computed else ""
-            df.loc[df["Title"] == title, "Important Words"] = iw_string
+            save_episode_values(row_id, {"Important Words": iw_string})
             iw_value = iw_string
 
-            # Save updated DataFrame back to cache
-            save_user_data({"df": df})
+        bundle = episode_bundle(user, row_id, iw_value)
 
-        words = (iw_value or "").split()
-
-        one_word = generate_ngrams(words, n=1)
-        two_word = generate_ngrams(words, n=2)
-        one_word_podcasts = generate_ngrams(words, n=1, append_label="podcasts")
-        two_word_podcasts = generate_ngrams(words, n=2, append_label="podcasts")
-
-        one_word_text, two_word_text = generate_podcast_strings_for_keywordplanner(
-            one_word, two_word, red_one_word=one_word_list, red_two_word=two_word_list
-        )
-
-        titles_with_index = [(i + 1, t) for i, t in enumerate(df["Title"].tolist())]
+        titles_with_index = title_options(df, row_id)
         true_count = df['Analyzed'].sum()
 
         return render_template(
             "results.html",
             titles=titles_with_index,
+            duplicate_labels=duplicate_labels,
+            duplicates=episode_duplicates(user, row_id),
             selected_title=title,
+            selected_row=row_id,
             no_of_episodes_analysed=true_count,
-            one_word=one_word,
-            two_word=two_word,
-            one_word_podcasts=one_word_podcasts,
-            two_word_podcasts=two_word_podcasts,
-            red_one_word=one_word_list,
-            red_two_word=two_word_list,
-            yellow_one_word=synonym_for_one_word,
-            yellow_two_word=synonym_for_two_word,
-            one_word_podcast_text=one_word_text,
-            two_word_podcast_text=two_word_text,
+            one_word=bundle["one_word"],
+            two_word=bundle["two_word"],
+            one_word_podcasts=bundle["one_word_podcasts"],
+            two_word_podcasts=bundle["two_word_podcasts"],
+            one_word_status=bundle["one_word_status"],
+            two_word_status=bundle["two_word_status"],
+            one_word_podcast_text=bundle["one_word_podcast_text"],
+            two_word_podcast_text=bundle["two_word_podcast_text"],
             download_ready=True,
             episode_analyzed=row.get("Analyzed", False),
-            queries_count=row.get("No of Queries", 0),
+            queries_count=saved_query_count(user, row_id),
             analyzed_count=analyzed_count,
             total_episodes=total_episodes
         )
@@ -415,7 +785,8 @@ def results():
     # GET: base page (initial load, no suggestions yet)
     return render_template(
         "results.html",
-        titles=df["Title"].tolist(),
+        titles=title_options(df),
+        duplicate_labels=duplicate_labels,
         download_ready=("Important Words" in df.columns),
         analyzed_count=analyzed_count,
         total_episodes=total_episodes
@@ -426,6 +797,63 @@ def results():
 
 
 
+# TITLE TYPEAHEAD - episodes for the results dropdown
+@app.route("/titles/search", methods=["GET"])
+def titles_search():
+    """Up to `limit` episodes whose title has words starting with each typed word, in upload order."""
+    user = get_user_data()
+    df = user.get("df")
+
+    if df is None:
+        return jsonify({"success": False, "error": "No CSV uploaded yet."}), 400
+
+    title_search = user.get("title_search")
+    if title_search is None:
+        # Data saved before the typeahead existed
+        title_search = TitleSearch(df["Title"].tolist())
+        save_user_data({"title_search": title_search})
+
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), TITLE_SEARCH_MAX_RESULTS)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    rows = title_search.search(request.args.get("q", ""), limit)
+
+    duplicate_groups = user.get("duplicate_groups")
+    labels = duplicate_groups.labels() if duplicate_groups is not None else {}
+    titles = df["Title"].to_numpy()[rows].tolist() if rows else []
+    return jsonify({
+        "success": True,
+        "titles": [
+            {"row": row_id, "title": title, "duplicate_group": labels.get(row_id)}
+            for row_id, title in zip(rows, titles)
+        ]
+    })
+
+
+
+
+def render_suggestions_partial(title, bundle):
+    """Render the suggestions partial for a bundle once and keep the HTML on it."""
+    html = bundle.get("html")
+    if html is None:
+        with stage("render_suggestions"):
+            html = render_template(
+                "partials/suggestions_and_planner.html",
+                selected_title=title,
+                one_word=bundle["one_word"],
+                two_word=bundle["two_word"],
+                one_word_podcasts=bundle["one_word_podcasts"],
+                two_word_podcasts=bundle["two_word_podcasts"],
+                one_word_status=bundle["one_word_status"],
+                two_word_status=bundle["two_word_status"],
+                one_word_podcast_text=bundle["one_word_podcast_text"],
+                two_word_podcast_text=bundle["two_word_podcast_text"]
+            )
+        bundle["html"] = html
+    return html
+
+
 @app.route("/get_suggestions", methods=["POST"])
 def get_suggestions():
     try:
@@ -437,59 +865,154 @@ def get_suggestions():
             return jsonify({"success": False, "error": "No CSV uploaded yet."})
 
         title = request.form.get("title")
-        if not title or title not in df["Title"].values:
+        row_id = resolve_episode_row(user, title, request.form.get("row")) if title else None
+        if row_id is None:
             return jsonify({"success": False, "error": "Invalid title"})
+    except DuplicateTitleError as e:
+        return jsonify({"success": False, "error": str(e), "rows": e.rows})
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to get suggestions: {str(e)}"})
 
-    row = df[df["Title"] == title].iloc[0]
+    row = df.iloc[row_id]
 
     # Ensure Important Words exist
     iw_value = row.get("Important Words")
     if not iw_value or (isinstance(iw_value, float) and pd.isna(iw_value)) or (isinstance(iw_value, str) and not iw_value.strip()):
         desc_text = row["Description"]
-        computed = important_words_from_texts([desc_text])
+        computed = cached_important_words([desc_text])
         iw_string = computed[0] if computed else ""
-        df.loc[df["Title"] == title, "Important Words"] = iw_string
+        save_episode_values(row_id, {"Important Words": iw_string})
         iw_value = iw_string
 
-        # Save updated DataFrame back to cache
-        save_user_data({"df": df})
+    # Repeat views of the same episode are served from the bundle cache
+    bundle = episode_bundle(user, row_id, iw_value)
+    suggestions_and_planner_HTML = render_suggestions_partial(title, bundle)
 
-    words = (iw_value or "").split()
+    return jsonify({"success": True, "html": suggestions_and_planner_HTML})
 
-    # Generate n-grams
-    one_word = generate_ngrams(words, n=1)
-    two_word = generate_ngrams(words, n=2)
-    one_word_podcasts = generate_ngrams(words, n=1, append_label="podcasts")
-    two_word_podcasts = generate_ngrams(words, n=2, append_label="podcasts")
 
-    one_word_text, two_word_text = generate_podcast_strings_for_keywordplanner(
-        one_word, two_word, red_one_word=one_word_list, red_two_word=two_word_list
-    )
 
-    # Render partial templates
-    suggestions_and_planner_HTML = render_template(
-        "partials/suggestions_and_planner.html",
-        selected_title=title,
-        one_word=one_word,
-        two_word=two_word,
-        one_word_podcasts=one_word_podcasts,
-        two_word_podcasts=two_word_podcasts,
-        red_one_word=one_word_list, 
-        red_two_word=two_word_list,
-        yellow_one_word=synonym_for_one_word,
-        yellow_two_word=synonym_for_two_word,
-        one_word_podcast_text=one_word_text,
-        two_word_podcast_text=two_word_text
-    )
 
-    return jsonify({"success": True, "html": suggestions_and_planner_HTML})
 
 
 
+# BATCH SUGGESTIONS - JSON for many episodes at once
+def is_missing_important_words(value) -> bool:
+    return not value or (isinstance(value, float) and pd.isna(value)) or (isinstance(value, str) and not value.strip())
+
+
+def suggestion_batch_items(uid: str, upload_id, targets: list):
+    """Yield one JSON-ready dict per target: a positional row, or an error dict passed through.
+
+    Rows are handled in chunks: each chunk reads its titles and Important Words in one go,
+    extracts the missing Important Words in one call and saves them as one store update.
+    """
+    index = current_index()
+    bundles_by_words = {}  # unranked bundles, shared by episodes with the same Important Words
+    for start in range(0, len(targets), SUGGESTION_BATCH_CHUNK_ROWS):
+        chunk = targets[start:start + SUGGESTION_BATCH_CHUNK_ROWS]
+        user = get_user_data(uid)
+        df = user.get("df")
+        if df is None or user.get("upload_id") != upload_id:
+            yield {"error": "The upload changed while the batch was running."}
+            return
+
+        rows = [t for t in chunk if isinstance(t, int)]
+        titles = df["Title"].to_numpy()[rows].tolist() if rows else []
+        if "Important Words" in df.columns and rows:
+            words = df["Important Words"].to_numpy()[rows].tolist()
+        else:
+            words = [None] * len(rows)
+
+        missing = [i for i, value in enumerate(words) if is_missing_important_words(value)]
+        if missing:
+            computed = cached_important_words(df["Description"].to_numpy()[[rows[i] for i in missing]].tolist())
+            for i, value in zip(missing, computed):
+                words[i] = value or ""
+            save_cell_edits([(rows[i], "Important Words", words[i]) for i in missing], user_id=uid)
+
+        ranking = user.get("keyword_ranking")
+        found = iter(zip(rows, titles, words))
+        for target in chunk:
+            if not isinstance(target, int):
+                yield target
+                continue
+            row_id, title, iw_value = next(found)
+            # Reuse bundles already built for single-episode views, without evicting them
+            bundle = suggestion_cache.get(upload_id, row_id, iw_value, index.generation)
+            if bundle is None and ranking is not None:
+                bundle = build_suggestion_bundle(iw_value, index, ranking.grams(row_id))
+            elif bundle is None:
+                bundle = bundles_by_words.get(iw_value)
+                if bundle is None:
+                    bundle = bundles_by_words[iw_value] = build_suggestion_bundle(iw_value, index)
+            yield {
+                "row": row_id,
+                "title": title,
+                "one_word": bundle["one_word"],
+                "one_word_status": bundle["one_word_status"],
+                "two_word": bundle["two_word"],
+                "two_word_status": bundle["two_word_status"],
+                "one_word_podcast_text": bundle["one_word_podcast_text"],
+                "two_word_podcast_text": bundle["two_word_podcast_text"],
+            }
+
+
+@app.route("/suggestions/batch", methods=["POST"])
+def suggestions_batch():
+    """Suggestions for many episodes as compact JSON.
+
+    Body: {"titles": ["A", {"title": "B", "row": 7}, ...]} or {"start": 0, "end": 100} (positional rows,
+    end exclusive). Sends NDJSON, one episode per line and a final {"done": true, "count": n} line,
+    when "stream" is true or the client accepts application/x-ndjson; otherwise one JSON object,
+    limited to SUGGESTION_BATCH_MAX_ROWS episodes. The "<gram> podcasts" cards are each gram plus
+    " podcasts" and share its status, so they are not repeated.
+    """
+    uid = get_user_id()
+    user = get_user_data(uid)
+    df = user.get("df")
+    if df is None:
+        return jsonify({"success": False, "error": "No CSV uploaded yet."}), 400
+
+    data = request.get_json(silent=True) or {}
+    targets = []
+    if data.get("titles") is not None:
+        if not isinstance(data["titles"], list):
+            return jsonify({"success": False, "error": "titles must be a list"}), 400
+        for entry in data["titles"]:
+            title, row = (entry.get("title"), entry.get("row")) if isinstance(entry, dict) else (entry, None)
+            try:
+                row_id = resolve_episode_row(user, title, row)
+            except DuplicateTitleError as e:
+                targets.append({"title": title, "error": str(e), "rows": e.rows})
+                continue
+            targets.append(row_id if row_id is not None else {"title": title, "error": "Invalid title"})
+    elif data.get("start") is not None:
+        start, end = parse_row(data.get("start")), parse_row(data.get("end", len(df)))
+        if start is None or end is None:
+            return jsonify({"success": False, "error": "start and end must be non-negative integers"}), 400
+        targets = list(range(start, min(end, len(df))))
+    else:
+        return jsonify({"success": False, "error": "Send titles or a start/end row range"}), 400
+
+    items = suggestion_batch_items(uid, user.get("upload_id"), targets)
+    stream = bool(data.get("stream")) or request.accept_mimetypes.best == "application/x-ndjson"
+    if stream:
+        def ndjson():
+            count = 0
+            for item in items:
+                yield json.dumps(item) + "\n"
+                count += 1
+            yield json.dumps({"done": True, "count": count}) + "\n"
 
+        return Response(ndjson(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
 
+    if len(targets) > SUGGESTION_BATCH_MAX_ROWS:
+        return jsonify({
+            "success": False,
+            "error": f"At most {SUGGESTION_BATCH_MAX_ROWS} episodes per response; send \"stream\": true for more"
+        }), 400
+    return jsonify({"success": True, "episodes": list(items)})
 
 
 # MARK EPISODE ANALYZED
@@ -505,20 +1028,22 @@ def mark_episode_analyzed():
     title = data.get("title")
     explicit_value = data.get("value")
 
-    if title not in df["Title"].values:
+    try:
+        row_id = resolve_episode_row(user, title, data.get("row"))
+    except DuplicateTitleError as e:
+        return jsonify({"success": False, "error": str(e), "rows": e.rows}), 400
+    if row_id is None:
         return jsonify({"success": False, "error": "Invalid title"}), 400
 
     # Toggle if explicit value not provided
     if explicit_value is None:
-        current = bool(df.loc[df["Title"] == title, "Analyzed"].values[0])
+        current = bool(df["Analyzed"].iat[row_id])
         new_val = not current
     else:
         new_val = bool(explicit_value)
 
-    df.loc[df["Title"] == title, "Analyzed"] = new_val
-
-    # Save updated DataFrame back to cache
-    save_user_data({"df": df})
+    # Record the edit in the user's data
+    save_episode_values(row_id, {"Analyzed": new_val})
 
     return jsonify({"success": True, "Analyzed": new_val})
 
@@ -539,35 +1064,92 @@ def add_query():
     title = (data.get("title") or "").strip()
     query = (data.get("query") or "").strip()
 
-    if not title or not query or title not in df["Title"].values:
+    try:
+        row_id = resolve_episode_row(user, title, data.get("row")) if title and query else None
+    except DuplicateTitleError as e:
+        return jsonify({"success": False, "error": str(e), "rows": e.rows}), 400
+    if row_id is None:
         return jsonify({"success": False, "error": "Invalid title or query"}), 400
 
-    # Ensure tracking columns exist
-    if "No of Queries" not in df.columns:
-        df["No of Queries"] = 0
-    if "Added Queries" not in df.columns:
-        df["Added Queries"] = ""
+    # With "propagate", every copy of a duplicated episode gets the query
+    groups = user.get("duplicate_groups")
+    targets = groups.rows(row_id) if data.get("propagate") and groups is not None else [row_id]
+
+    # Record the edits in the user's data
+    save_cell_edits([(target, ADD_QUERY, query) for target in targets])
+
+    user = get_user_data()
+    return jsonify({"success": True, "saved_count": saved_query_count(user, row_id),
+                    "saved_queries": added_queries(user, row_id),
+                    "updated_rows": targets})
+
+
+
+# KEYWORD SEARCH - which episodes mention a keyword
+SEARCH_MAX_ROWS = 500
+
+def search_episodes(user: dict, query: str):
+    """Sorted rows matching query in the user's episode index; raises SearchQueryError."""
+    index = user.get("episode_index")
+    if index is None:
+        index = EpisodeIndex(len(user["df"]))
+    return index.search(query)
+
+@app.route("/search", methods=["GET"])
+def search():
+    """Episodes whose Important Words contain the query, e.g. ?q=cooking AND italian OR pasta recipes."""
+    user = get_user_data()
+    df = user.get("df")
+
+    if df is None:
+        return jsonify({"success": False, "error": "No CSV uploaded yet."}), 400
 
-    existing_raw = df.loc[df["Title"] == title, "Added Queries"].values[0]
+    try:
+        rows = search_episodes(user, request.args.get("q", ""))
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(max(int(request.args.get("limit", 100)), 1), SEARCH_MAX_ROWS)
+    except SearchQueryError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except ValueError:
+        return jsonify({"success": False, "error": "offset and limit must be integers"}), 400
+
+    page = rows[offset:offset + limit]
+    titles = df["Title"].to_numpy()[page].tolist()
+    if "Analyzed" in df.columns:
+        analyzed = df["Analyzed"].to_numpy()[page].tolist()
+    else:
+        analyzed = [False] * len(page)
+    return jsonify({
+        "success": True,
+        "total": int(len(rows)),
+        "offset": offset,
+        "episodes": [
+            {"row": row_id, "title": title, "analyzed": bool(done)}
+            for row_id, title, done in zip(page.tolist(), titles, analyzed)
+        ]
+    })
 
-    # Coerce NaN / non-string to safe string
-    if isinstance(existing_raw, float) and pd.isna(existing_raw):
-        existing_raw = ""
-    if not isinstance(existing_raw, str):
-        existing_raw = str(existing_raw) if existing_raw is not None else ""
+@app.route("/search/add_query", methods=["POST"])
+def search_add_query():
+    """Add one query to every episode matching a search, as one store update."""
+    user = get_user_data()
+    df = user.get("df")
 
-    items = [q for q in (s.strip() for s in existing_raw.split(",")) if q]
-    if query not in items:
-        items.append(query)
+    if df is None:
+        return jsonify({"success": False, "error": "No CSV uploaded yet."}), 400
 
-    # Update DataFrame
-    df.loc[df["Title"] == title, "Added Queries"] = ",".join(items)
-    df.loc[df["Title"] == title, "No of Queries"] = len(items)
+    data = request.get_json() or {}
+    query = (data.get("query") or "").strip()
+    if not query:
+        return jsonify({"success": False, "error": "Invalid query"}), 400
+    try:
+        rows = search_episodes(user, data.get("q", "")).tolist()
+    except SearchQueryError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-    # Save updated DataFrame back to cache
-    save_user_data({"df": df})
+    save_cell_edits([(row_id, ADD_QUERY, query) for row_id in rows])
 
-    return jsonify({"success": True, "saved_count": len(items), "saved_queries": items})
+    return jsonify({"success": True, "updated_count": len(rows), "updated_rows": rows})
 
 
 
@@ -585,29 +1167,24 @@ def remove_query():
     title = (data.get("title") or "").strip()
     query = (data.get("query") or "").strip()
 
-    if not title or not query or title not in df["Title"].values:
+    try:
+        row_id = resolve_episode_row(user, title, data.get("row")) if title and query else None
+    except DuplicateTitleError as e:
+        return jsonify({"success": False, "error": str(e), "rows": e.rows}), 400
+    if row_id is None:
         return jsonify({"success": False, "error": "Invalid title or query"}), 400
 
-    existing_raw = df.loc[df["Title"] == title, "Added Queries"].values[0]
-
-    # Coerce NaN / non-string to safe string
-    if isinstance(existing_raw, float) and pd.isna(existing_raw):
-        existing_raw = ""
-    if not isinstance(existing_raw, str):
-        existing_raw = str(existing_raw) if existing_raw is not None else ""
-
-    items = [q for q in (s.strip() for s in existing_raw.split(",")) if q]
-    # Remove the query
-    items = [q for q in items if q != query]
+    # With "propagate", the query is removed from every copy of a duplicated episode
+    groups = user.get("duplicate_groups")
+    targets = groups.rows(row_id) if data.get("propagate") and groups is not None else [row_id]
 
-    # Update DataFrame
-    df.loc[df["Title"] == title, "Added Queries"] = ",".join(items)
-    df.loc[df["Title"] == title, "No of Queries"] = len(items)
+    # Record the edits in the user's data
+    save_cell_edits([(target, REMOVE_QUERY, query) for target in targets])
 
-    # Save updated DataFrame back to cache
-    save_user_data({"df": df})
-
-    return jsonify({"success": True, "saved_count": len(items), "saved_queries": items})
+    user = get_user_data()
+    return jsonify({"success": True, "saved_count": saved_query_count(user, row_id),
+                    "saved_queries": added_queries(user, row_id),
+                    "updated_rows": targets})
 
 
 
@@ -622,25 +1199,20 @@ def get_episode_status():
         return jsonify({"Analyzed": False, "saved_count": 0, "saved_queries": []})
 
     title = request.args.get("title")
-    if not title or title not in df["Title"].values:
+    try:
+        row_id = resolve_episode_row(user, title, request.args.get("row")) if title else None
+    except DuplicateTitleError as e:
+        return jsonify({"Analyzed": False, "saved_count": 0, "saved_queries": [], "error": str(e), "rows": e.rows})
+    if row_id is None:
         return jsonify({"Analyzed": False, "saved_count": 0, "saved_queries": []})
 
-    row = df[df["Title"] == title].iloc[0]
-
-    # Get raw value and guard against NaN / non-string
-    existing_raw = row.get("Added Queries", "")
-    if isinstance(existing_raw, float) and pd.isna(existing_raw):
-        existing_raw = ""
-    if not isinstance(existing_raw, str):
-        existing_raw = str(existing_raw) if existing_raw is not None else ""
-
-    # Build list of trimmed non-empty queries
-    items = [q for q in (s.strip() for s in existing_raw.split(",")) if q]
+    row = df.iloc[row_id]
 
     return jsonify({
         "Analyzed": bool(row.get("Analyzed", False)),
-        "saved_count": len(items),
-        "saved_queries": items
+        "saved_count": saved_query_count(user, row_id),
+        "saved_queries": added_queries(user, row_id),
+        "duplicates": episode_duplicates(user, row_id)
     })
 
 
@@ -694,16 +1266,18 @@ def download():
     base_name = re.sub(r"_\d+_rows_processed_\d+_rows_pending$", "", base_name)
 
     # Create new descriptive name
-    download_name = f"{base_name}_{true_count}_rows_processed_{false_count}_rows_pending.csv"
+    fmt = request.args.get("format", "csv")
+    download_name = f"{base_name}_{true_count}_rows_processed_{false_count}_rows_pending.{fmt}"
 
-    # Prepare CSV for download
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
+    # Stream the file chunk by chunk; the saved queries are written back into their columns per chunk
+    try:
+        body = export_stream(df, user.get("queries"), fmt)
+    except ExportFormatError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     return Response(
-        csv_buffer.getvalue(),
-        mimetype="text/csv",
+        body,
+        mimetype=EXPORT_MIMETYPES[fmt],
         headers={"Content-Disposition": f"attachment; filename={download_name}"}
     )
 
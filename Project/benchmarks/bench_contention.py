@@ -0,0 +1,101 @@
+"""Benchmark: N concurrent users uploading, processing and clicking.
+
+Each simulated user has its own session (Flask test client) and runs in its
+own thread: upload a CSV, start /process, poll /progress until done, then
+click through episodes (get_suggestions, add_query, mark_episode_analyzed).
+Reports latency percentiles per request type. --stripes 1 puts every user
+on one lock, like the old global data_lock. Run from the Project directory:
+
+    python benchmarks/bench_contention.py --users 8 --rows 5000 --clicks 50
+    python benchmarks/bench_contention.py --users 8 --rows 5000 --clicks 50 --stripes 1
+"""
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_episodes_csv  # noqa: E402
+
+
+def simulate_user(app, csv_bytes, rows, clicks, timings, errors):
+    client = app.test_client()
+
+    def timed(kind, fn, *args, **kwargs):
+        start = time.perf_counter()
+        response = fn(*args, **kwargs)
+        timings[kind].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors.append((kind, response.status_code))
+        return response
+
+    try:
+        timed("upload", client.post, "/", data={"file": (io.BytesIO(csv_bytes), "episodes.csv")},
+              content_type="multipart/form-data")
+        timed("process", client.post, "/process")
+        while True:
+            state = timed("progress", client.get, "/progress").json
+            if state["done"] or state["error"]:
+                break
+            time.sleep(0.02)
+
+        for i in range(clicks):
+            title = f"Episode {(i * 7919) % rows}"
+            timed("get_suggestions", client.post, "/get_suggestions", data={"title": title})
+            timed("add_query", client.post, "/add_query", json={"title": title, "query": f"query {i}"})
+            timed("mark_episode_analyzed", client.post, "/mark_episode_analyzed", json={"title": title})
+    except Exception as e:
+        errors.append(("exception", repr(e)))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--clicks", type=int, default=50)
+    parser.add_argument("--stripes", type=int, default=None, help="SESSION_LOCK_STRIPES for this run")
+    parser.add_argument("--backend", choices=["memory", "disk"], default=None, help="SESSION_BACKEND for this run")
+    args = parser.parse_args()
+
+    # The app reads its settings at import time
+    if args.stripes is not None:
+        os.environ["SESSION_LOCK_STRIPES"] = str(args.stripes)
+    if args.backend is not None:
+        os.environ["SESSION_BACKEND"] = args.backend
+    os.environ.setdefault("SESSION_MAX_USERS", str(max(100, args.users)))
+    from app import app
+    app.testing = True
+
+    csvs = [make_episodes_csv(args.rows, seed=42 + u) for u in range(args.users)]
+    timings = defaultdict(list)
+    errors = []
+    threads = [
+        threading.Thread(target=simulate_user, args=(app, csvs[u], args.rows, args.clicks, timings, errors))
+        for u in range(args.users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    print(f"{args.users} users x {args.rows:,} rows x {args.clicks} clicks  wall {wall:.2f}s")
+    for kind, values in timings.items():
+        print(f"  {kind:<22} n={len(values):>6}  p50 {percentile(values, 0.50) * 1000:8.2f} ms"
+              f"  p95 {percentile(values, 0.95) * 1000:8.2f} ms  max {max(values) * 1000:8.2f} ms")
+    if errors:
+        print(f"  {len(errors)} errors, first: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark: peak memory and time of /download exports.
+
+Builds an upload of --rows synthetic episodes with saved queries on every
+tenth row and reports, for the old single-buffer CSV (to_csv into a
+StringIO, then getvalue) and for each streaming format, the peak memory
+allocated on top of the upload (tracemalloc; for Parquet also pyarrow's
+own pool), the time and the output size. The output is consumed and
+dropped as a WSGI server would. Run from the Project directory:
+
+    python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import make_descriptions  # noqa: E402
+from export import export_stream  # noqa: E402
+from ingest import compact_chunk  # noqa: E402
+from query_table import QueryTable  # noqa: E402
+
+
+def make_upload(rows):
+    descriptions = make_descriptions(rows, words_per_description=40)
+    df = compact_chunk(pd.DataFrame({"Title": [f"Episode {i}" for i in range(rows)], "Description": descriptions}))
+    df["Important Words"] = [" ".join(d.split()[:8]) for d in descriptions]
+    df, queries = QueryTable.from_frame(df)
+    for row_id in range(0, rows, 10):
+        queries.add(row_id, f"query {row_id % 500}")
+        queries.add(row_id, "podcast, interview")
+    return df, queries
+
+
+def single_buffer(df, queries):
+    buffer = io.StringIO()
+    queries.materialize(df).to_csv(buffer, index=False)
+    yield buffer.getvalue()
+
+
+def measure(body_fn):
+    try:
+        import pyarrow as pa
+        pool = pa.default_memory_pool()
+        arrow_before = pool.max_memory() or 0
+    except ImportError:
+        pool = None
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    for piece in body_fn():
+        size += len(piece)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = (pool.max_memory() or 0) - arrow_before if pool is not None else 0
+    return peak, arrow_peak, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=None, help="EXPORT_CHUNK_ROWS for the streaming formats")
+    args = parser.parse_args()
+
+    df, queries = make_upload(args.rows)
+    upload_mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{args.rows:,} rows, upload frame {upload_mb:,.0f} MB")
+
+    scenarios = {"csv (single buffer)": lambda: single_buffer(df, queries)}
+    for fmt in ("csv", "csv.gz", "parquet"):
+        scenarios[f"{fmt} (streamed)"] = lambda fmt=fmt: export_stream(df, queries, fmt, args.chunk_rows)
+
+    for name, body_fn in scenarios.items():
+        try:
+            peak, arrow_peak, elapsed, size = measure(body_fn)
+        except Exception as e:
+            print(f"  {name:<20} skipped: {e}")
+            continue
+        line = f"  {name:<20} peak {peak / 2**20:>8,.1f} MB"
+        if arrow_peak:
+            line += f" (+{arrow_peak / 2**20:,.1f} MB arrow)"
+        print(line + f"  {elapsed:6.2f}s  output {size / 2**20:>8,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark: row-by-row vs bulk keyword extraction.
+
+Reports rows/second for important_words_from_texts (one row at a time, as the
+background job used to call it) and important_words_bulk, and checks that both
+produce identical output. Run from the Project directory:
+
+    python benchmarks/bench_extraction.py --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import make_descriptions  # noqa: E402
+from helper import important_words_bulk, important_words_from_texts  # noqa: E402
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def rowwise(texts):
+    out = []
+    for start in range(0, len(texts), 10):
+        out.extend(important_words_from_texts(texts[start:start + 10]))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rowwise-max", type=int, default=100_000,
+                        help="skip the slow row-by-row path above this many rows")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        texts = pd.Series(make_descriptions(rows))
+        bulk, bulk_s = timed(important_words_bulk, texts)
+        line = f"{rows:>9,} rows  bulk {rows / bulk_s:>10,.0f} rows/s"
+        if rows <= args.rowwise_max:
+            single, single_s = timed(rowwise, texts.tolist())
+            assert single == bulk, "bulk output differs from important_words_from_texts"
+            line += f"  row-by-row {rows / single_s:>10,.0f} rows/s  speedup x{single_s / bulk_s:.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
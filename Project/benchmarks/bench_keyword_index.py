@@ -0,0 +1,72 @@
+"""Microbenchmark: classifying one episode's suggestion cards.
+
+Compares the old linear scans over the queries_list lists with the hashed
+keyword index. Run from the Project directory:
+
+    python benchmarks/bench_keyword_index.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper import generate_ngrams  # noqa: E402
+from keyword_index import classify  # noqa: E402
+from queries_list import one_word_list, two_word_list, synonym_for_one_word, synonym_for_two_word  # noqa: E402
+
+
+def sample_episode_words(seed=0, size=200):
+    """Mix of listed and unlisted words, like a real Important Words value."""
+    rng = random.Random(seed)
+    pool = one_word_list + [f"unlisted{i}" for i in range(len(one_word_list))]
+    return [rng.choice(pool) for _ in range(size)]
+
+
+def classify_with_lists(one_word, two_word, one_word_podcasts, two_word_podcasts):
+    """What the templates and planner did before: `in` against plain lists."""
+    out = []
+    for word in one_word:
+        out.append("red" if word in one_word_list else "yellow" if word in synonym_for_one_word else "new")
+    for word in two_word:
+        out.append("red" if word in two_word_list else "yellow" if word in synonym_for_two_word else "new")
+    for word in one_word_podcasts:
+        base = word.rsplit(" ", 1)[0]
+        out.append("red" if base in one_word_list else "yellow" if base in synonym_for_one_word else "new")
+    for word in two_word_podcasts:
+        base = word.rsplit(" ", 1)[0]
+        out.append("red" if base in two_word_list else "yellow" if base in synonym_for_two_word else "new")
+    # keyword planner filter
+    [w for w in one_word if w not in one_word_list]
+    [w for w in two_word if w not in two_word_list]
+    return out
+
+
+def classify_with_index(one_word, two_word, one_word_podcasts, two_word_podcasts):
+    out = [classify(w, 1) for w in one_word]
+    out += [classify(w, 2) for w in two_word]
+    out += [classify(w.rsplit(" ", 1)[0], 1) for w in one_word_podcasts]
+    out += [classify(w.rsplit(" ", 1)[0], 2) for w in two_word_podcasts]
+    [s for s in out[:len(one_word)] if s != "red"]
+    [s for s in out[len(one_word):len(one_word) + len(two_word)] if s != "red"]
+    return out
+
+
+def main():
+    words = sample_episode_words()
+    grams = (
+        generate_ngrams(words, n=1),
+        generate_ngrams(words, n=2),
+        generate_ngrams(words, n=1, append_label="podcasts"),
+        generate_ngrams(words, n=2, append_label="podcasts"),
+    )
+    assert classify_with_lists(*grams) == classify_with_index(*grams)
+
+    for name, fn, number in (("lists", classify_with_lists, 5), ("index", classify_with_index, 200)):
+        best = min(timeit.repeat(lambda: fn(*grams), number=number, repeat=5)) / number
+        print(f"{name:>6}: {best * 1000:8.3f} ms per suggestions request ({sum(map(len, grams))} cards)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: startup time and memory of loading the Feedspot keyword lists.
+
+Each scenario runs in a fresh interpreter, after importing numpy and the
+stdlib modules the app loads anyway (through Flask and pandas), and
+reports the time and RSS growth until the first classification:
+
+  import (.pyc)    import queries_list with a cached .pyc and hash it into frozensets
+  import (source)  the same without a .pyc, as after a deploy or with -B
+  artifact         map the prebuilt keyword index artifact
+
+Run from the Project directory:
+
+    python benchmarks/bench_keyword_startup.py --runs 7
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRELUDE = """
+import argparse, ast, hashlib, json, mmap, re, struct, sys, time
+import numpy
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+rss0 = rss_kb()
+t0 = time.perf_counter()
+"""
+
+SCENARIOS = {
+    "import (.pyc)": """
+import re
+from queries_list import one_word_list, two_word_list, synonym_for_one_word, synonym_for_two_word
+norm = lambda p: re.sub(r"\\s+", " ", str(p)).strip().lower()
+red_one_word = frozenset(norm(w) for w in one_word_list)
+sets = [frozenset(norm(w) for w in words) for words in (two_word_list, synonym_for_one_word, synonym_for_two_word)]
+found = "music" in red_one_word
+""",
+    "import (source)": None,  # same code, run with -B from a copy without __pycache__
+    "artifact": """
+from keyword_index import classify
+found = classify("music") == "red"
+""",
+}
+
+REPORT = """
+print(json.dumps({"seconds": time.perf_counter() - t0, "rss_kb": rss_kb() - rss0, "found": found}))
+"""
+
+
+def run_once(code, cwd, no_pyc=False):
+    args = [sys.executable] + (["-B"] if no_pyc else []) + ["-c", PRELUDE + code + REPORT]
+    output = subprocess.run(args, cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Warm the .pyc for the first scenario and the artifact's page cache for the last
+    run_once(SCENARIOS["import (.pyc)"], PROJECT_DIR)
+    run_once(SCENARIOS["artifact"], PROJECT_DIR)
+
+    with tempfile.TemporaryDirectory() as source_dir:
+        shutil.copy(os.path.join(PROJECT_DIR, "queries_list.py"), source_dir)
+        print(f"{'scenario':<16} {'median ms':>10} {'min ms':>8} {'RSS +KiB':>9}")
+        for name, code in SCENARIOS.items():
+            if code is None:
+                results = [run_once(SCENARIOS["import (.pyc)"], source_dir, no_pyc=True) for _ in range(args.runs)]
+            else:
+                results = [run_once(code, PROJECT_DIR) for _ in range(args.runs)]
+            assert all(r["found"] for r in results), name
+            seconds = [r["seconds"] for r in results]
+            rss = statistics.median(r["rss_kb"] for r in results)
+            print(f"{name:<16} {statistics.median(seconds) * 1000:>10.1f} {min(seconds) * 1000:>8.1f} {rss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
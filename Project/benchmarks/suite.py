@@ -0,0 +1,206 @@
+"""Benchmark suite: helper micro-benchmarks and end-to-end route timings, saved as JSON.
+
+Micro-benchmarks time each helper function on seeded synthetic
+descriptions (best of --repeat runs). The end-to-end part drives one user
+through the Flask test client: upload -> /process (until done) ->
+/get_suggestions -> /add_query -> /download, with the session store, job
+database and keyword cache in a fresh temporary directory so runs don't
+warm each other up. Run from the Project directory:
+
+    python benchmarks/suite.py --rows 5000 --output before.json --project /tmp/old/Project
+    python benchmarks/suite.py --rows 5000 --output after.json --compare before.json
+
+--project times another checkout's app and helpers with this suite (for
+code older than the suite itself); helpers it doesn't have are skipped.
+With --compare, every timing more than --threshold slower than in the
+earlier file is reported as a regression and the exit status is 1.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Helper functions timed on the synthetic column, by name
+MICRO_HELPERS = ("clean_text", "clean_texts_bulk", "important_words_from_texts", "important_words_bulk")
+
+
+def best_of(fn, repeat, number=1):
+    """Best seconds per call over `repeat` runs of `number` calls."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def micro_benchmarks(descriptions, repeat):
+    """Seconds per call of each helper, on the whole synthetic column unless noted.
+
+    Helpers missing from the code under test (older than the suite) are left out.
+    """
+    import helper
+    from helper import generate_ngrams, generate_podcast_strings_for_keywordplanner, important_words_from_texts
+
+    words = important_words_from_texts(descriptions[:1])[0].split()
+    one_word = generate_ngrams(words, n=1)
+    two_word = generate_ngrams(words, n=2)
+    red_one_word = frozenset(one_word[::3])
+    red_two_word = frozenset(two_word[::3])
+
+    timings = {}
+    for name in MICRO_HELPERS:
+        fn = getattr(helper, name, None)
+        if fn is None:
+            print(f"skipping {name}: not in this helper.py")
+        elif name == "clean_text":
+            timings[name] = best_of(lambda: [fn(t) for t in descriptions], repeat)
+        else:
+            timings[name] = best_of(lambda: fn(descriptions), repeat)
+    return {
+        **timings,
+        # One episode's grams and planner strings, as one /get_suggestions builds them
+        "generate_ngrams": best_of(lambda: (generate_ngrams(words, 1), generate_ngrams(words, 2)), repeat, 100),
+        "generate_podcast_strings_for_keywordplanner": best_of(
+            lambda: generate_podcast_strings_for_keywordplanner(one_word, two_word, red_one_word, red_two_word),
+            repeat, 100,
+        ),
+    }
+
+
+def end_to_end(csv_bytes, rows, clicks):
+    """Seconds of each step for one user; the per-click routes report their median."""
+    from app import app
+    app.testing = True
+    client = app.test_client()
+    timings = {}
+
+    def timed(name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        response = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} returned HTTP {response.status_code}")
+        return response, elapsed
+
+    _, timings["upload"] = timed("upload", client.post, "/", content_type="multipart/form-data",
+                                 data={"file": (io.BytesIO(csv_bytes), "episodes.csv")})
+
+    start = time.perf_counter()
+    timed("process", client.post, "/process")
+    while True:
+        state = client.get("/progress").json
+        if state["error"]:
+            raise RuntimeError(f"processing failed: {state['error']}")
+        if state["done"]:
+            break
+        time.sleep(0.01)
+    timings["process"] = time.perf_counter() - start
+
+    suggestions, queries = [], []
+    for i in range(clicks):
+        title = f"Episode {(i * 7919) % rows}"
+        suggestions.append(timed("get_suggestions", client.post, "/get_suggestions", data={"title": title})[1])
+        queries.append(timed("add_query", client.post, "/add_query",
+                             json={"title": title, "query": f"query {i}"})[1])
+    timings["get_suggestions"] = statistics.median(suggestions)
+    timings["add_query"] = statistics.median(queries)
+
+    def download():
+        response = client.get("/download")
+        response.get_data()
+        return response
+    _, timings["download"] = timed("download", download)
+    return timings
+
+
+def git_revision(project_dir):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Lines describing each timing that got more than `threshold` slower than the baseline."""
+    regressions = []
+    for group in ("micro", "end_to_end"):
+        for name, seconds in results[group].items():
+            before = baseline.get(group, {}).get(name)
+            if before and seconds > before * (1 + threshold):
+                regressions.append(f"{group}.{name}: {before * 1000:.2f} ms -> {seconds * 1000:.2f} ms"
+                                   f" (+{(seconds / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="episodes in the end-to-end CSV")
+    parser.add_argument("--micro-rows", type=int, default=2000, help="descriptions per micro-benchmark")
+    parser.add_argument("--words", type=int, default=80, help="words per description")
+    parser.add_argument("--url-share", type=float, default=0.05)
+    parser.add_argument("--emoji-share", type=float, default=0.03)
+    parser.add_argument("--html-share", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--clicks", type=int, default=20)
+    parser.add_argument("--skip-e2e", action="store_true", help="only run the micro-benchmarks")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: print only)")
+    parser.add_argument("--compare", default=None, help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    parser.add_argument("--project", default=PROJECT_DIR,
+                        help="Project directory of the code to time (default: this checkout)")
+    args = parser.parse_args()
+
+    # The code under test comes first; the synthetic data generator falls back to this checkout's
+    project_dir = os.path.abspath(args.project)
+    sys.path.insert(0, project_dir)
+    from benchmarks.synthetic import make_descriptions, make_episodes_csv
+
+    synthetic = dict(words_per_description=args.words, url_share=args.url_share,
+                     emoji_share=args.emoji_share, html_share=args.html_share, seed=args.seed)
+    results = {
+        "meta": {
+            "revision": git_revision(project_dir),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": vars(args),
+        },
+        "micro": micro_benchmarks(make_descriptions(args.micro_rows, **synthetic), args.repeat),
+        "end_to_end": {},
+    }
+
+    if not args.skip_e2e:
+        with tempfile.TemporaryDirectory() as tmp:
+            # The app reads its settings at import time
+            os.environ["SESSION_DIR"] = tmp
+            os.environ["JOB_DB"] = os.path.join(tmp, "jobs.sqlite3")
+            os.environ["KEYWORD_CACHE_MAX_ENTRIES"] = "0"
+            results["end_to_end"] = end_to_end(make_episodes_csv(args.rows, **synthetic), args.rows, args.clicks)
+
+    for group in ("micro", "end_to_end"):
+        for name, seconds in results[group].items():
+            print(f"{group:>10}  {name:<45} {seconds * 1000:10.3f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
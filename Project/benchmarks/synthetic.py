@@ -0,0 +1,41 @@
+"""Seeded generator of synthetic podcast episode descriptions."""
+import random
+
+from queries_list import one_word_list
+
+FILLER = ["the", "and", "with", "our", "this", "about", "for", "you", "is", "in", "we", "podcast"]
+URLS = ["https://example.com/ep/{n}", "www.show.fm/{n}", "http://bit.ly/x{n}"]
+EMOJI = ["🎙️", "🔥", "😀", "café", "naïve"]
+HTML = ["<b>{w}</b>", "<a href='https://x.io/{n}'>{w}</a>", "<p>{w}</p>", "<br/>"]
+
+
+def make_descriptions(rows, words_per_description=80, url_share=0.05, emoji_share=0.03, html_share=0.05, seed=42):
+    """Return `rows` descriptions mixing vocabulary words, stopwords, URLs, emoji and HTML."""
+    rng = random.Random(seed)
+    vocab = one_word_list
+    out = []
+    for n in range(rows):
+        parts = []
+        for _ in range(words_per_description):
+            r = rng.random()
+            w = rng.choice(vocab)
+            if r < url_share:
+                parts.append(rng.choice(URLS).format(n=n))
+            elif r < url_share + emoji_share:
+                parts.append(rng.choice(EMOJI))
+            elif r < url_share + emoji_share + html_share:
+                parts.append(rng.choice(HTML).format(w=w, n=n))
+            elif r < 0.45:
+                parts.append(rng.choice(FILLER))
+            else:
+                parts.append(w.capitalize() if rng.random() < 0.2 else w)
+        out.append(" ".join(parts))
+    return out
+
+
+def make_episodes_csv(rows, words_per_description=80, url_share=0.05, emoji_share=0.03, html_share=0.05, seed=42):
+    """Return the bytes of an episodes CSV (Title, Description) of `rows` synthetic episodes."""
+    descriptions = make_descriptions(rows, words_per_description, url_share, emoji_share, html_share, seed)
+    lines = ["Title,Description"]
+    lines += [f'"Episode {i}","{text.replace(chr(34), "")}"' for i, text in enumerate(descriptions)]
+    return "\n".join(lines).encode()
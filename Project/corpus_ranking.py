@@ -0,0 +1,173 @@
+"""Corpus-wide ranking of each episode's keywords.
+
+Runs once per upload, after keyword extraction has reported done, so the
+results page is usable while the episodes are ranked. Every description is
+tokenized in full (not just its first 200 keywords) and counted into sparse
+(episode, term) tables held in NumPy arrays, one for unigrams and one for
+bigrams of adjacent non-stopword tokens. Each episode's terms are then
+ranked by TF-IDF, or, with KEYWORD_RANKING=collocation, its bigrams by how
+strongly the two words go together across the show (normalized PMI).
+
+Terms found in more than KEYWORD_RANKING_MAX_DF of the episodes (the show
+name, the host, sponsor reads, the standard intro) are moved behind every
+other term of the episode, so the suggestions lead with what is distinctive
+about it. KEYWORD_RANKING=off keeps the order of appearance.
+"""
+import os
+
+import numpy as np
+
+from helper import tokenize_chunk
+
+
+RANKING_METHODS = ("tfidf", "collocation", "off")
+KEYWORD_RANKING = os.environ.get("KEYWORD_RANKING", "tfidf")
+if KEYWORD_RANKING not in RANKING_METHODS:
+    raise ValueError(f"KEYWORD_RANKING must be one of {', '.join(RANKING_METHODS)}")
+KEYWORD_RANKING_MAX_DF = float(os.environ.get("KEYWORD_RANKING_MAX_DF", 0.5))
+
+MIN_DOCS_FOR_SUPPRESSION = 20  # with fewer episodes, document frequencies say little about the show
+MAX_GRAMS = 200                # like generate_ngrams' limit
+_DEMOTED = 1e6                 # subtracted from the score of show-wide terms
+TOKENIZE_CHUNK_ROWS = 20000
+
+
+class KeywordRanking:
+    """Ranked unigrams and bigrams of every episode, as CSR arrays over one vocabulary."""
+
+    def __init__(self, vocab, one_word_codes, one_word_offsets, bigram_words, two_word_codes, two_word_offsets):
+        self.vocab = vocab                      # object array of words
+        self.one_word_codes = one_word_codes    # vocab codes, episode by episode, best first
+        self.one_word_offsets = one_word_offsets
+        self.bigram_words = bigram_words        # (n_bigrams, 2) vocab codes
+        self.two_word_codes = two_word_codes    # bigram codes, episode by episode, best first
+        self.two_word_offsets = two_word_offsets
+
+    def __len__(self):
+        return len(self.one_word_offsets) - 1
+
+    def one_word(self, row):
+        codes = self.one_word_codes[self.one_word_offsets[row]:self.one_word_offsets[row + 1]]
+        return self.vocab[codes].tolist()
+
+    def two_word(self, row):
+        pairs = self.bigram_words[self.two_word_codes[self.two_word_offsets[row]:self.two_word_offsets[row + 1]]]
+        return [f"{a} {b}" for a, b in zip(self.vocab[pairs[:, 0]].tolist(), self.vocab[pairs[:, 1]].tolist())]
+
+    def grams(self, row):
+        """(one_word, two_word) ranked for a row, or None if the row is out of range."""
+        if not 0 <= row < len(self):
+            return None
+        return self.one_word(row), self.two_word(row)
+
+
+def _tokenize(texts):
+    """Token codes and episode ids for all texts, over one vocabulary."""
+    vocab = {}
+    all_codes, all_docs = [], []
+    for start in range(0, len(texts), TOKENIZE_CHUNK_ROWS):
+        codes, doc_ids, uniques = tokenize_chunk(texts[start:start + TOKENIZE_CHUNK_ROWS])
+        if not len(codes):
+            continue
+        # Map the chunk's codes to global ones; only tokens that survived the stopword filter
+        used = np.unique(codes)
+        mapping = np.zeros(len(uniques), dtype=np.int64)
+        mapping[used] = [vocab.setdefault(uniques[c], len(vocab)) for c in used.tolist()]
+        all_codes.append(mapping[codes])
+        all_docs.append(doc_ids + start)
+    if not all_codes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), []
+    return np.concatenate(all_codes), np.concatenate(all_docs), [w.decode("ascii") for w in vocab]
+
+
+def _doc_term_counts(docs, terms, n_terms):
+    """Sparse (episode, term) counts: unique pairs sorted by episode, with tf and first position."""
+    keys, first, tf = np.unique(docs * n_terms + terms, return_index=True, return_counts=True)
+    return keys // n_terms, keys % n_terms, tf, first
+
+
+def _sort_order(docs, scores, first):
+    """Argsort by (episode, score descending, first appearance), as one sort of int64 keys."""
+    if not len(docs):
+        return np.zeros(0, dtype=np.int64)
+    # Dense rank of the scores, best first, and the first appearance counted from the episode's start
+    _, score_rank = np.unique(-scores, return_inverse=True)
+    score_rank = score_rank.ravel().astype(np.int64)
+    group_starts = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+    doc_start = np.minimum.reduceat(first, group_starts)
+    position = first - np.repeat(doc_start, np.diff(np.r_[group_starts, len(docs)]))
+    n_ranks = int(score_rank.max()) + 1
+    span = int(position.max()) + 1
+    if (int(docs[-1]) + 1) * n_ranks * span >= 2 ** 63:
+        return np.lexsort((first, -scores, docs))
+    keys = (docs.astype(np.int64) * n_ranks + score_rank) * span + position
+    return np.argsort(keys, kind="stable")
+
+
+def _rank(docs, scores, first, n_docs, max_grams):
+    """Order each episode's terms by score (ties: first appearance) and keep max_grams per episode.
+
+    docs must be sorted, as _doc_term_counts returns them.
+    """
+    order = _sort_order(docs, scores, first)
+    sorted_docs = docs[order]
+    within = np.arange(len(order)) - np.searchsorted(sorted_docs, sorted_docs, side="left")
+    order = order[within < max_grams]
+    offsets = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(docs[order], minlength=n_docs), out=offsets[1:])
+    return order, offsets
+
+
+def rank_keywords(texts, method=KEYWORD_RANKING, max_df=KEYWORD_RANKING_MAX_DF, max_grams=MAX_GRAMS):
+    """KeywordRanking for a list of descriptions, or None when ranking is off."""
+    if method == "off":
+        return None
+    texts = [str(t).replace("\x00", " ") for t in texts]
+    n_docs = len(texts)
+    codes, doc_ids, vocab = _tokenize(texts)
+    n_vocab = max(len(vocab), 1)
+    suppress = n_docs >= MIN_DOCS_FOR_SUPPRESSION
+
+    def idf(df):
+        return np.log((1 + n_docs) / (1 + df)) + 1
+
+    # Unigrams
+    docs, terms, tf, first = _doc_term_counts(doc_ids, codes, n_vocab)
+    df = np.bincount(terms, minlength=n_vocab)
+    scores = (1 + np.log(tf)) * idf(df[terms])
+    if suppress:
+        scores[df[terms] > max_df * n_docs] -= _DEMOTED
+    order, one_word_offsets = _rank(docs, scores, first, n_docs, max_grams)
+    one_word_codes = terms[order].astype(np.int32)
+
+    # Bigrams: adjacent tokens of the same episode (stopwords already removed)
+    pair = (doc_ids[1:] == doc_ids[:-1]) & (codes[1:] != codes[:-1])
+    left, right, pair_docs = codes[:-1][pair], codes[1:][pair], doc_ids[1:][pair]
+    bigram_keys, bigram_codes = np.unique(left * n_vocab + right, return_inverse=True)
+    bigram_codes = bigram_codes.reshape(-1)
+    n_bigrams = max(len(bigram_keys), 1)
+    bigram_words = np.stack([bigram_keys // n_vocab, bigram_keys % n_vocab], axis=1).astype(np.int32)
+
+    docs, terms, tf, first = _doc_term_counts(pair_docs, bigram_codes, n_bigrams)
+    df = np.bincount(terms, minlength=n_bigrams)
+    if method == "collocation":
+        # Normalized PMI of the two words over the whole show, in [-1, 1]
+        total = max(len(codes), 1)
+        word_count = np.bincount(codes, minlength=n_vocab)
+        pair_count = np.bincount(bigram_codes, minlength=n_bigrams)[terms]
+        a, b = bigram_words[terms, 0], bigram_words[terms, 1]
+        p_pair = pair_count / total
+        pmi = np.log(p_pair / ((word_count[a] / total) * (word_count[b] / total)))
+        npmi = np.where(p_pair < 1, pmi / -np.log(np.minimum(p_pair, 1 - 1e-12)), 1.0)
+        scores = (1 + np.log(tf)) * npmi
+    else:
+        scores = (1 + np.log(tf)) * idf(df[terms])
+    if suppress:
+        scores[df[terms] > max_df * n_docs] -= _DEMOTED
+    order, two_word_offsets = _rank(docs, scores, first, n_docs, max_grams)
+    two_word_codes = terms[order].astype(np.int32)
+
+    return KeywordRanking(
+        np.asarray(vocab, dtype=object), one_word_codes, one_word_offsets,
+        bigram_words, two_word_codes, two_word_offsets,
+    )
@@ -0,0 +1,173 @@
+"""Exact and near-duplicate episodes within an upload.
+
+Exact duplicates share the same cleaned description: each description is
+cleaned like the keyword extractor does, lowercased and hashed, so this is
+one pass over the column and runs at upload time. Near duplicates (reposts
+with a changed intro, an extra sponsor line, a new title) are found once
+keywords are extracted: every episode's Important Words set gets a MinHash
+signature, and LSH banding only compares episodes that agree on a whole
+band of it, so the work grows linearly with the number of rows. Candidates
+are kept when their signatures estimate a Jaccard similarity of at least
+DUPLICATE_SIMILARITY.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from helper import clean_texts_bulk
+
+
+DUPLICATE_SIMILARITY = float(os.environ.get("DUPLICATE_SIMILARITY", 0.8))
+
+NUM_HASHES = 32
+BAND_ROWS = 4   # 8 bands of 4: pairs at 0.8 Jaccard become candidates ~98.5% of the time
+_SEED = 20240601
+
+
+class DuplicateGroups:
+    """Episodes grouped with their duplicates; episodes without any are in no group."""
+
+    def __init__(self, exact_ids, group_of):
+        self.exact_ids = exact_ids    # same id = same cleaned description
+        self.group_of = group_of      # group number per row, -1 if the episode is unique
+        grouped = np.flatnonzero(group_of >= 0)
+        order = grouped[np.argsort(group_of[grouped], kind="stable")]
+        self._members = order
+        self._offsets = np.zeros(int(group_of.max(initial=-1)) + 2, dtype=np.int64)
+        np.cumsum(np.bincount(group_of[grouped], minlength=len(self._offsets) - 1), out=self._offsets[1:])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def grouped_rows(self):
+        return int(len(self._members))
+
+    def group(self, row):
+        """The row's group number, or None."""
+        if not 0 <= row < len(self.group_of) or self.group_of[row] < 0:
+            return None
+        return int(self.group_of[row])
+
+    def rows(self, row):
+        """Every row in the same group as row, itself included ([row] if it has no duplicates)."""
+        group = self.group(row)
+        if group is None:
+            return [row]
+        return self._members[self._offsets[group]:self._offsets[group + 1]].tolist()
+
+    def is_exact(self, row, other):
+        return bool(self.exact_ids[row] == self.exact_ids[other])
+
+    def labels(self):
+        """{row: group number + 1} for every grouped row."""
+        return dict(zip(self._members.tolist(), (self.group_of[self._members] + 1).tolist()))
+
+
+def exact_duplicate_ids(descriptions):
+    """Same id for rows whose cleaned descriptions are identical.
+
+    A description that cleans to nothing (blank, or only URLs and emoji) says
+    nothing about the episode, so each such row gets an id of its own.
+    """
+    cleaned = clean_texts_bulk(descriptions)
+    digests = [hashlib.blake2b(text, digest_size=16).digest() for text in cleaned]
+    ids, _ = pd.factorize(pd.Series(digests, dtype=object))
+    ids = ids.astype(np.int64)
+    empty = np.flatnonzero(np.fromiter((not text for text in cleaned), dtype=bool, count=len(cleaned)))
+    if len(empty):
+        ids[empty] = ids.max() + 1 + np.arange(len(empty))
+        # Renumber densely: the shared id of the empty text is no longer used
+        ids = np.unique(ids, return_inverse=True)[1].astype(np.int64)
+    return ids
+
+
+def minhash_signatures(word_sets, num_hashes=NUM_HASHES, seed=_SEED):
+    """(rows, num_hashes) uint32 MinHash signatures of space-separated word sets.
+
+    Rows without words get no signature; the second return value lists the rows that have one.
+    """
+    words_per_row = [str(ws).split() if isinstance(ws, str) else [] for ws in word_sets]
+    lengths = np.fromiter((len(w) for w in words_per_row), dtype=np.int64, count=len(words_per_row))
+    rows = np.flatnonzero(lengths)
+    signatures = np.zeros((len(rows), num_hashes), dtype=np.uint32)
+    if not len(rows):
+        return signatures, rows
+    codes, vocab = pd.factorize(pd.Series([w for ws in words_per_row for w in ws], dtype=object))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])[rows]
+
+    # Multiply-shift hashing of word codes, one odd multiplier per hash function
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, num_hashes, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, num_hashes, dtype=np.uint64)
+    word_ids = np.arange(len(vocab), dtype=np.uint64)
+    for k in range(num_hashes):
+        hashes = ((word_ids * multipliers[k] + offsets[k]) >> np.uint64(32)).astype(np.uint32)
+        signatures[:, k] = np.minimum.reduceat(hashes[codes], starts)
+    return signatures, rows
+
+
+def near_duplicate_pairs(signatures, rows, similarity=DUPLICATE_SIMILARITY, band_rows=BAND_ROWS):
+    """(a, b) row arrays of near-duplicate pairs found by LSH banding and checked on the signatures."""
+    pairs_a, pairs_b = [], []
+    rng = np.random.default_rng(_SEED + 1)
+    for start in range(0, signatures.shape[1] - band_rows + 1, band_rows):
+        band = signatures[:, start:start + band_rows].astype(np.uint64)
+        keys = band @ (rng.integers(1, 2 ** 63, band_rows, dtype=np.uint64) | np.uint64(1))
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # Pair each member of a bucket with the bucket's first member
+        bucket_start = np.searchsorted(sorted_keys, sorted_keys, side="left")
+        member = np.flatnonzero(bucket_start != np.arange(len(order)))
+        a, b = order[bucket_start[member]], order[member]
+        agree = (signatures[a] == signatures[b]).mean(axis=1)
+        keep = agree >= similarity
+        pairs_a.append(rows[a[keep]])
+        pairs_b.append(rows[b[keep]])
+    if not pairs_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+
+def find_duplicates(descriptions, word_sets=None, exact_ids=None, similarity=DUPLICATE_SIMILARITY):
+    """Group exact duplicates, plus near duplicates when word_sets (Important Words) are given.
+
+    exact_ids from an earlier call (e.g. at upload) skips hashing the descriptions again.
+    """
+    if exact_ids is None:
+        exact_ids = exact_duplicate_ids(descriptions)
+    n_rows = len(exact_ids)
+
+    # Union-find over rows, starting from the exact groups (first row of each id is its root)
+    _, first_row = np.unique(exact_ids, return_index=True)
+    parent = first_row[exact_ids] if n_rows else np.zeros(0, dtype=np.int64)
+
+    if word_sets is not None and n_rows:
+        signatures, rows = minhash_signatures(word_sets)
+        pairs_a, pairs_b = near_duplicate_pairs(signatures, rows, similarity)
+
+        def root(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in zip(pairs_a.tolist(), pairs_b.tolist()):
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+        # Point every row straight at its root
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+    # Number the groups with more than one row by their first row
+    counts = np.bincount(parent, minlength=n_rows)
+    grouped_roots = np.flatnonzero(counts > 1)
+    group_number = np.full(n_rows, -1, dtype=np.int64)
+    group_number[grouped_roots] = np.arange(len(grouped_roots))
+    return DuplicateGroups(exact_ids, group_number[parent] if n_rows else group_number)
@@ -0,0 +1,192 @@
+"""Inverted index from keywords to the episodes that contain them.
+
+Every unigram and every bigram of adjacent words in an episode's
+`Important Words` maps to a posting list: the sorted row ids of the
+episodes that contain it. All posting lists share one CSR buffer of the
+narrowest unsigned integer type that fits the row count (uint16 up to
+65,536 episodes), so AND and OR are merges of sorted arrays. Terms are
+integer keys over a sorted vocabulary of words, and the build is NumPy
+sorts over the whole column rather than a Python loop per term.
+
+The index is built once the upload is processed. Before that (and for
+single rows recomputed afterwards) rows are updated incrementally: an
+updated row's new terms go into a small overlay and its entries in the
+base postings are masked out. Updates come from Important Words edits in
+the mutation log (see mutation_log.apply_edit).
+
+Queries are phrases joined by AND / OR, with AND binding tighter:
+`cooking AND italian OR pasta recipes`. A one-word phrase is a unigram, a
+two-word phrase a bigram, and a longer phrase must contain all of its
+adjacent bigrams.
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+OPERATORS = ("and", "or")
+
+
+class SearchQueryError(ValueError):
+    """The search query is empty or malformed."""
+
+
+def _row_terms(words):
+    """Unigrams and adjacent bigrams of one Important Words value."""
+    words = (words or "").split() if isinstance(words, str) else []
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _tokenize(important_words):
+    """Word codes and row ids of every word, in order, and the sorted distinct words."""
+    words = pd.Series(important_words, dtype=object)
+    words = words.where(words.map(lambda value: isinstance(value, str)), "").str.split().explode().dropna()
+    if words.empty:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), []
+    codes, vocab = _sorted_codes(words.to_numpy())
+    return codes, words.index.to_numpy(dtype=np.int64), vocab.tolist()
+
+
+def _sorted_codes(values):
+    """(codes, uniques) like np.unique(values, return_inverse=True); hashing first only sorts the uniques."""
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(uniques)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank[codes], uniques[order]
+
+
+def _row_dtype(n_rows):
+    return np.uint16 if n_rows <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+def parse_query(text):
+    """[[term, ...], ...]: OR of AND-clauses of index terms."""
+    clauses, clause, phrase = [], [], []
+
+    def end_phrase():
+        if not phrase:
+            raise SearchQueryError("AND / OR must sit between two search terms")
+        if len(phrase) <= 2:
+            clause.append(" ".join(phrase))
+        else:
+            clause.extend(f"{a} {b}" for a, b in zip(phrase, phrase[1:]))
+        phrase.clear()
+
+    tokens = str(text or "").lower().split()
+    if not tokens:
+        raise SearchQueryError("Enter a keyword to search for")
+    for token in tokens:
+        if token in OPERATORS:
+            end_phrase()
+            if token == "or":
+                clauses.append(clause)
+                clause = []
+        else:
+            phrase.append(token)
+    end_phrase()
+    clauses.append(clause)
+    return clauses
+
+
+class EpisodeIndex:
+    """Term -> sorted row ids, with incremental per-row updates."""
+
+    def __init__(self, n_rows, vocab=None, term_keys=None, offsets=None, postings=None):
+        self.n_rows = n_rows
+        self._vocab = vocab or []                # sorted distinct words
+        # Sorted term keys, one per posting list: word * (len(vocab) + 1) + next word, or + len(vocab) for a unigram
+        self._term_keys = term_keys if term_keys is not None else np.zeros(0, dtype=np.int64)
+        self._offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+        self._postings = postings if postings is not None else np.zeros(0, dtype=_row_dtype(n_rows))
+        self._overrides = {}                     # row -> its current terms, for rows updated after the build
+        self._extra = {}                         # term -> rows among the overrides that contain it
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, important_words):
+        """Index a whole upload's Important Words column (a list of strings)."""
+        n_rows = len(important_words)
+        codes, rows, vocab = _tokenize(important_words)
+        stride = len(vocab) + 1
+        # Adjacent words of the same row make the bigrams
+        same_row = rows[1:] == rows[:-1]
+        keys = np.concatenate((codes * stride + len(vocab), codes[:-1][same_row] * stride + codes[1:][same_row]))
+        term_rows = np.concatenate((rows, rows[:-1][same_row]))
+        terms, term_keys = _sorted_codes(keys)
+        # Unique (term, row) pairs, sorted by term and then row: the posting lists, back to back
+        pairs = np.sort(terms * max(n_rows, 1) + term_rows)
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+        offsets = np.zeros(len(term_keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // max(n_rows, 1), minlength=len(term_keys)), out=offsets[1:])
+        postings = (pairs % max(n_rows, 1)).astype(_row_dtype(n_rows))
+        return cls(n_rows, vocab, term_keys, offsets, postings)
+
+    def _posting_list(self, term):
+        """Number of term's posting list in the CSR buffer, or None if no built row contains it."""
+        codes = []
+        for word in term.split(" "):
+            code = bisect.bisect_left(self._vocab, word)
+            if code == len(self._vocab) or self._vocab[code] != word:
+                return None
+            codes.append(code)
+        if len(codes) > 2:
+            return None
+        key = codes[0] * (len(self._vocab) + 1) + (codes[1] if len(codes) == 2 else len(self._vocab))
+        i = int(np.searchsorted(self._term_keys, key))
+        return i if i < len(self._term_keys) and self._term_keys[i] == key else None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._term_keys) + len(self._extra)
+
+    def update_row(self, row, important_words):
+        """Replace one row's terms after its Important Words were (re)computed."""
+        terms = frozenset(_row_terms(important_words))
+        with self._lock:
+            for term in self._overrides.get(row, ()):
+                rows = self._extra.get(term)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self._extra[term]
+            self._overrides[row] = terms
+            for term in terms:
+                self._extra.setdefault(term, set()).add(row)
+
+    def rows(self, term):
+        """Sorted int64 row ids of the episodes containing term."""
+        code = self._posting_list(term)
+        base = self._postings[self._offsets[code]:self._offsets[code + 1]] if code is not None else self._postings[:0]
+        with self._lock:
+            if not self._overrides:
+                return base.astype(np.int64)
+            overridden = np.fromiter(self._overrides, dtype=np.int64, count=len(self._overrides))
+            extra = np.fromiter(self._extra.get(term, ()), dtype=np.int64)
+        base = base.astype(np.int64)
+        base = base[~np.isin(base, overridden, assume_unique=True)]
+        return np.union1d(base, extra)
+
+    def search(self, query):
+        """Sorted row ids matching a query string (see parse_query)."""
+        result = np.zeros(0, dtype=np.int64)
+        for clause in parse_query(query):
+            # Rarest term first keeps the intersections small
+            postings = sorted((self.rows(term) for term in clause), key=len)
+            matched = postings[0]
+            for rows in postings[1:]:
+                if not len(matched):
+                    break
+                matched = np.intersect1d(matched, rows, assume_unique=True)
+            result = np.union1d(result, matched)
+        return result
@@ -0,0 +1,139 @@
+"""Streaming export of an upload for /download.
+
+The frame is written EXPORT_CHUNK_ROWS rows at a time and each piece is
+yielded as soon as it is encoded, so a download never holds more than one
+chunk of encoded output in the worker. The saved queries are materialized
+per chunk as well (see query_table.py).
+
+Formats: `csv`, `csv.gz` (one gzip stream across all chunks) and `parquet`
+(one row group per chunk; needs pyarrow).
+"""
+import os
+import zlib
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 50000))
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportFormatError(ValueError):
+    """The requested download format is unknown or not available."""
+
+
+def _chunks(df, queries, chunk_rows):
+    """Yield the frame in positional row chunks, with the query columns put back."""
+    chunk_rows = max(1, int(chunk_rows or EXPORT_CHUNK_ROWS))
+    for start in range(0, max(len(df), 1), chunk_rows):
+        end = min(start + chunk_rows, len(df))
+        chunk = df.iloc[start:end]
+        if queries is not None:
+            chunk = queries.materialize(chunk, range(start, end))
+        yield chunk
+
+
+def iter_csv(df, queries=None, chunk_rows=None):
+    """Yield the CSV text of the frame chunk by chunk, header first."""
+    header = True
+    for chunk in _chunks(df, queries, chunk_rows):
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+
+
+def iter_csv_gzip(df, queries=None, chunk_rows=None):
+    """Yield the gzip-compressed CSV of the frame chunk by chunk."""
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for text in iter_csv(df, queries, chunk_rows):
+        data = compressor.compress(text.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _Sink:
+    """Write-only file that hands written bytes out through drain().
+
+    tell() keeps counting across drains, so the offsets pyarrow records in
+    the Parquet footer stay correct.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(df, queries=None, chunk_rows=None):
+    """Yield a Parquet file of the frame, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Sink()
+    writer = None
+    for chunk in _chunks(df, queries, chunk_rows):
+        if writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = pq.ParquetWriter(sink, table.schema)
+        else:
+            # Later chunks follow the first chunk's schema (e.g. an all-empty text column)
+            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+_WRITERS = {
+    "csv": iter_csv,
+    "csv.gz": iter_csv_gzip,
+    "parquet": iter_parquet,
+}
+
+
+def export_stream(df, queries=None, fmt="csv", chunk_rows=None):
+    """Return a generator of the encoded frame in the given format.
+
+    Raises ExportFormatError for an unknown format, or for Parquet without pyarrow.
+    """
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ExportFormatError(f"Unknown download format: {fmt}")
+    if fmt == "parquet":
+        # Checked here because the generator body only runs once the response is sent
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ExportFormatError("Parquet downloads need pyarrow installed on the server")
+    return writer(df, queries, chunk_rows)
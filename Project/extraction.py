@@ -0,0 +1,260 @@
+"""Batch runner for background keyword extraction.
+
+Runs helper.important_words_bulk over a Description column in batches,
+either inline in the calling thread (default) or on a process pool when
+EXTRACTION_PROCESSES is set, so large uploads can use every core instead
+of being bound by the GIL.
+
+EXTRACTION_PROCESSES: 0 (default) = inline, "auto" = one process per CPU,
+N = N processes. EXTRACTION_BATCH_ROWS: rows per batch (default 5000).
+EARLY_EXTRACTION=1 starts extracting each CSV chunk as soon as the upload
+parser produces it; the background job then only collects the results.
+Batches of uploads that are never processed are dropped once they are older
+than SESSION_TTL or more than SESSION_MAX_USERS uploads hold batches, like
+the session they belong to.
+
+Every batch is first looked up in the keyword cache (keyword_cache.py);
+only descriptions it has never seen are extracted.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from helper import important_words_bulk
+from keyword_cache import keyword_cache
+
+
+def _processes_from_env():
+    value = os.environ.get("EXTRACTION_PROCESSES", "0").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+
+EXTRACTION_PROCESSES = _processes_from_env()
+EXTRACTION_BATCH_ROWS = int(os.environ.get("EXTRACTION_BATCH_ROWS", 5000))
+EARLY_EXTRACTION = os.environ.get("EARLY_EXTRACTION", "0").strip().lower() in ("1", "true", "yes")
+EARLY_EXTRACTION_MAX_UPLOADS = int(os.environ.get("SESSION_MAX_USERS", 100))
+EARLY_EXTRACTION_TTL = int(os.environ.get("SESSION_TTL", 14400))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# upload id -> (first submitted at, [(start_row, end_row, future)]) for chunks submitted while parsing,
+# oldest upload first
+_early_jobs = {}
+_early_lock = threading.Lock()
+_early_threads = None
+
+
+def get_extraction_pool():
+    """Create the shared process pool on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a multi-threaded Flask worker is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class CachedBatch:
+    """Future-like result of one batch: cached words plus the extraction of the misses."""
+
+    def __init__(self, texts, words, missing, future=None):
+        self.texts = texts
+        self.words = words
+        self.missing = missing
+        self.future = future
+
+    def result(self):
+        if self.future is not None:
+            extracted = self.future.result()
+            missing_texts = [self.texts[i] for i in self.missing]
+            for i, w in zip(self.missing, extracted):
+                self.words[i] = w
+            if keyword_cache is not None:
+                keyword_cache.put_many(missing_texts, extracted)
+            self.future = None
+        return self.words
+
+    def cancel(self):
+        return self.future.cancel() if self.future is not None else False
+
+
+def submit_batch(executor, texts):
+    """Look a batch up in the keyword cache and submit only the misses to executor."""
+    texts = list(texts)
+    if keyword_cache is not None:
+        words = keyword_cache.get_many(texts)
+    else:
+        words = [None] * len(texts)
+    missing = [i for i, w in enumerate(words) if w is None]
+    future = executor.submit(important_words_bulk, [texts[i] for i in missing]) if missing else None
+    return CachedBatch(texts, words, missing, future)
+
+
+def extract_batch(texts):
+    """Important Words for one batch, in this thread, going through the keyword cache."""
+    if keyword_cache is None:
+        return important_words_bulk(texts)
+    return keyword_cache.lookup_or_extract(texts, important_words_bulk)
+
+
+def start_early_extraction(upload_id, start_row, texts):
+    """Submit one freshly parsed CSV chunk for extraction ahead of /process."""
+    global _early_threads
+    texts = list(texts)
+    if EXTRACTION_PROCESSES > 0:
+        batch = submit_batch(get_extraction_pool(), texts)
+    else:
+        with _early_lock:
+            if _early_threads is None:
+                _early_threads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="early-extraction")
+        batch = _early_threads.submit(extract_batch, texts)
+    dropped = []
+    with _early_lock:
+        entry = _early_jobs.get(upload_id)
+        if entry is None:
+            dropped = _expire_early_jobs(time.monotonic())
+            entry = _early_jobs[upload_id] = (time.monotonic(), [])
+        entry[1].append((start_row, start_row + len(texts), batch))
+    for _, _, future in dropped:
+        future.cancel()
+
+
+def _expire_early_jobs(now):
+    """Remove uploads past EARLY_EXTRACTION_TTL, then the oldest beyond the cap; caller holds _early_lock."""
+    dropped = []
+    for upload_id, (submitted_at, batches) in list(_early_jobs.items()):
+        if now - submitted_at <= EARLY_EXTRACTION_TTL and len(_early_jobs) < EARLY_EXTRACTION_MAX_UPLOADS:
+            break
+        dropped.extend(batches)
+        del _early_jobs[upload_id]
+    return dropped
+
+
+def take_early_extraction(upload_id):
+    """Remove and return the chunks submitted for an upload (None if there are none)."""
+    with _early_lock:
+        entry = _early_jobs.pop(upload_id, None)
+    return entry[1] if entry is not None else None
+
+
+def discard_early_extraction(upload_id):
+    for _, _, future in take_early_extraction(upload_id) or ():
+        future.cancel()
+
+
+def _collect_early(jobs, total_rows, on_batch_done, on_batch_result=None):
+    jobs = sorted(jobs, key=lambda job: job[0])
+    expected = 0
+    for start, end, _ in jobs:
+        if start != expected:
+            return None
+        expected = end
+    if expected != total_rows:
+        return None
+
+    words = []
+    for start, end, future in jobs:
+        batch = future.result()
+        words.extend(batch)
+        if on_batch_result:
+            on_batch_result(start, end, batch)
+        if on_batch_done:
+            on_batch_done(end)
+    return words
+
+
+def _plan_batches(total_rows, batch_size, done):
+    """(start, end) of the batches still to run, filling the gaps between finished ranges."""
+    bounds = []
+    pos = 0
+    for start, end in sorted(done) + [(total_rows, total_rows)]:
+        while pos < start:
+            stop = min(pos + batch_size, start)
+            bounds.append((pos, stop))
+            pos = stop
+        pos = max(pos, end)
+    return bounds
+
+
+def extract_important_words(descriptions, on_batch_done=None, batch_size=None, early_jobs=None,
+                            done_batches=None, on_batch_result=None):
+    """Return Important Words for every description, in input order.
+
+    on_batch_done(rows_done) is called after each completed batch. Any batch
+    error is re-raised to the caller after the remaining batches are cancelled.
+    early_jobs (from take_early_extraction) are used as-is when they cover every row.
+    done_batches is a list of (start, end, words) finished by an earlier run; only
+    the rows they don't cover are extracted. on_batch_result(start, end, words)
+    receives every newly finished batch, e.g. to checkpoint it.
+    """
+    texts = list(descriptions)
+    total_rows = len(texts)
+    if early_jobs and not done_batches:
+        words = _collect_early(early_jobs, total_rows, on_batch_done, on_batch_result)
+        if words is not None:
+            return words
+    batch_size = batch_size or EXTRACTION_BATCH_ROWS
+
+    parts = {start: words for start, _, words in done_batches or ()}
+    bounds = _plan_batches(total_rows, batch_size, [(start, end) for start, end, _ in done_batches or ()])
+    rows_done = total_rows - sum(end - start for start, end in bounds)
+    if rows_done and on_batch_done:
+        on_batch_done(rows_done)
+
+    def batch_finished(start, end, words):
+        nonlocal rows_done
+        parts[start] = words
+        if on_batch_result:
+            on_batch_result(start, end, words)
+        rows_done += end - start
+        if on_batch_done:
+            on_batch_done(rows_done)
+
+    if EXTRACTION_PROCESSES <= 0 or len(bounds) < 2:
+        for start, end in bounds:
+            batch_finished(start, end, extract_batch(texts[start:end]))
+        return [w for start in sorted(parts) for w in parts[start]]
+
+    pool = get_extraction_pool()
+    futures = {}
+    try:
+        for start, end in bounds:
+            batch = submit_batch(pool, texts[start:end])
+            if batch.future is None:
+                # Entirely cached
+                batch_finished(start, end, batch.result())
+            else:
+                futures[batch.future] = (start, end, batch)
+        # Batches finish out of order; progress counts rows, results are merged by position
+        for future in as_completed(futures):
+            start, end, batch = futures[future]
+            batch_finished(start, end, batch.result())
+    except BrokenProcessPool:
+        # A crashed worker poisons the pool; start a fresh one next time
+        _discard_pool()
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return [w for start in sorted(parts) for w in parts[start]]
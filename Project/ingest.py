@@ -0,0 +1,109 @@
+"""Chunked CSV ingestion for episode uploads.
+
+The upload is parsed in bounded chunks instead of one `pd.read_csv` call.
+The Title/Description header is validated on the first chunk, and every
+chunk is converted to compact dtypes before the next one is read: bool
+`Analyzed`, int32 `No of Queries`, Arrow-backed strings for the text
+columns when pyarrow is installed, and category for repetitive extra
+columns once the whole file is in.
+"""
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    # Plain object columns without pyarrow
+    TEXT_DTYPE = None
+
+
+CSV_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", 50000))
+
+REQUIRED_COLUMNS = ("Title", "Description")
+TRACKING_DEFAULTS = {
+    "Analyzed": False,
+    "No of Queries": 0,
+    "Added Queries": ""
+}
+# Columns the app writes to or looks up by value; never turned into categories
+MANAGED_COLUMNS = set(REQUIRED_COLUMNS) | set(TRACKING_DEFAULTS) | {"Important Words"}
+
+_TRUE_STRINGS = {"true", "1", "yes", "y"}
+
+
+class CSVValidationError(ValueError):
+    """The uploaded file is not a usable episodes CSV."""
+
+
+def _to_bool(series):
+    if series.dtype == bool:
+        return series
+
+    def convert(value):
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUE_STRINGS
+        return bool(value) if pd.notna(value) else False
+
+    return series.map(convert).astype(bool)
+
+
+def compact_chunk(chunk):
+    """Add missing tracking columns and narrow the dtypes of one parsed chunk."""
+    for col, default_val in TRACKING_DEFAULTS.items():
+        if col not in chunk.columns:
+            chunk[col] = default_val
+
+    # Missing text is written back as an empty cell either way; "" keeps it a real string
+    for col in REQUIRED_COLUMNS:
+        chunk[col] = chunk[col].fillna("")
+        if TEXT_DTYPE:
+            chunk[col] = chunk[col].astype(TEXT_DTYPE)
+
+    chunk["Analyzed"] = _to_bool(chunk["Analyzed"])
+    chunk["No of Queries"] = pd.to_numeric(chunk["No of Queries"], errors="coerce").fillna(0).astype("int32")
+    chunk["Added Queries"] = chunk["Added Queries"].fillna("").astype(str).astype(object)
+    return chunk
+
+
+def iter_csv_chunks(file, chunksize=None):
+    """Yield compacted chunks of an episodes CSV, validating the header on the first one."""
+    reader = pd.read_csv(file, chunksize=chunksize or CSV_CHUNK_ROWS)
+    first = True
+    for chunk in reader:
+        if first:
+            if any(col not in chunk.columns for col in REQUIRED_COLUMNS):
+                reader.close()
+                raise CSVValidationError("CSV must contain columns: Title, Description")
+            first = False
+        yield compact_chunk(chunk)
+
+
+def categorize_repetitive_columns(df, max_unique_ratio=0.5):
+    """Store extra text columns with few distinct values as categories."""
+    for col in df.columns:
+        if col in MANAGED_COLUMNS or df[col].dtype != object or len(df) == 0:
+            continue
+        if df[col].nunique(dropna=False) / len(df) <= max_unique_ratio:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def read_episodes_csv(file, chunksize=None, on_chunk=None):
+    """Read an uploaded CSV chunk by chunk into one compact DataFrame.
+
+    on_chunk(start_row, chunk) is called as soon as each chunk is parsed, so
+    work such as keyword extraction can begin before the file is fully read.
+    """
+    chunks = []
+    start_row = 0
+    for chunk in iter_csv_chunks(file, chunksize):
+        chunk.index = pd.RangeIndex(start_row, start_row + len(chunk))
+        if on_chunk is not None and len(chunk):
+            on_chunk(start_row, chunk)
+        start_row += len(chunk)
+        chunks.append(chunk)
+
+    df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    return categorize_repetitive_columns(df)
@@ -0,0 +1,309 @@
+"""Durable queue for keyword-extraction jobs.
+
+Jobs, and the Important Words of every finished chunk, are kept in SQLite
+(JOB_DB). A job interrupted by a restart or a recycled worker is put back
+in the queue once its heartbeat is older than JOB_STALE_SECONDS and
+resumes from its last checkpoint instead of row 0. Each worker runs at
+most JOB_CONCURRENCY jobs at once; the rest wait until a worker has room.
+
+A queue created with pin_jobs (user data kept in each worker's memory)
+only lets the worker that queued a job run it. The worker keeps the
+heartbeat of its queued jobs fresh, and a pinned job whose worker went
+away is failed instead of requeued, since its data went with it.
+
+Nothing runs until the serving process calls start(); importing the app
+(process-pool children, the reloader's parent) never claims jobs.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", 2))
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 60))
+DISPATCH_SECONDS = 5
+FINISHED_JOB_RETENTION_SECONDS = 86400
+
+ACTIVE_STATUSES = ("queued", "running")
+WORKER_GONE = "The worker holding this upload stopped; upload the file again"
+
+
+class JobCancelled(Exception):
+    """The job was cancelled (or taken over by another worker) while it ran."""
+
+
+class JobQueue:
+    """SQLite-backed job records and chunk checkpoints, plus this worker's runner."""
+
+    def __init__(self, path, max_running=JOB_CONCURRENCY, stale_seconds=JOB_STALE_SECONDS, pin_jobs=False):
+        self.path = path
+        self.max_running = max(1, max_running)
+        self.stale_seconds = stale_seconds
+        self.pin_jobs = pin_jobs
+        self._owner = self._owner_pid = None
+        self._handler = None
+        self._local = threading.local()
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " uid TEXT NOT NULL,"
+                " upload_id TEXT,"
+                " status TEXT NOT NULL,"
+                " total_rows INTEGER NOT NULL,"
+                " rows_done INTEGER NOT NULL DEFAULT 0,"
+                " owner TEXT,"
+                " heartbeat REAL,"
+                " created_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " error TEXT,"
+                " profile INTEGER NOT NULL DEFAULT 0,"
+                " pinned_to TEXT)"
+            )
+            try:
+                # Job databases created before jobs could be profiled
+                conn.execute("ALTER TABLE jobs ADD COLUMN profile INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass
+            try:
+                # Job databases created before jobs could be pinned to a worker
+                conn.execute("ALTER TABLE jobs ADD COLUMN pinned_to TEXT")
+            except sqlite3.OperationalError:
+                pass
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_chunks ("
+                " job_id INTEGER NOT NULL,"
+                " start_row INTEGER NOT NULL,"
+                " end_row INTEGER NOT NULL,"
+                " words TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, start_row))"
+            )
+
+    @property
+    def owner(self):
+        """This worker's id in the owner and pinned_to columns; a forked worker gets its own."""
+        if self._owner_pid != os.getpid():
+            self._owner_pid = os.getpid()
+            self._owner = f"{socket.gethostname()}:{self._owner_pid}:{uuid.uuid4().hex[:8]}"
+        return self._owner
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        yield conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # Submitting and inspecting jobs
+
+    def submit(self, uid, upload_id, total_rows, profile=False):
+        """Queue a job and return its id; with profile, the handler is asked to profile the run."""
+        now = time.time()
+        pinned_to = self.owner if self.pin_jobs else None
+        with self._connection() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (uid, upload_id, status, total_rows, created_at, profile, pinned_to, heartbeat)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (uid, upload_id, total_rows, now, int(bool(profile)), pinned_to, now if pinned_to else None),
+            ).lastrowid
+        self._wake.set()
+        return job_id
+
+    def active_job(self, uid):
+        """The user's queued or running job, or None."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE uid = ? AND status IN (?, ?) ORDER BY id DESC LIMIT 1",
+                (uid, *ACTIVE_STATUSES),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def cancel(self, uid):
+        """Cancel the user's queued and running jobs (a running job stops at its next checkpoint)."""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM job_chunks WHERE job_id IN"
+                " (SELECT id FROM jobs WHERE uid = ? AND status IN (?, ?))",
+                (uid, *ACTIVE_STATUSES),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE uid = ? AND status IN (?, ?)",
+                (time.time(), uid, *ACTIVE_STATUSES),
+            )
+
+    def stats(self):
+        """Queue depth and running jobs across all workers, plus this worker's share."""
+        with self._connection() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "running_here": len(self._running),
+            "max_running_here": self.max_running,
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "cancelled": counts.get("cancelled", 0),
+        }
+
+    # Checkpoints, used by the handler while a job runs
+
+    def checkpoints(self, job_id):
+        """[(start_row, end_row, words)] finished so far by any run of the job."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT start_row, end_row, words FROM job_chunks WHERE job_id = ? ORDER BY start_row", (job_id,)
+            ).fetchall()
+        return [(start, end, json.loads(words)) for start, end, words in rows]
+
+    def save_checkpoint(self, job_id, start_row, end_row, words):
+        """Persist one finished chunk; raises JobCancelled if this worker no longer owns the job."""
+        with self._transaction() as conn:
+            owned = conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                (time.time(), job_id, self.owner),
+            ).rowcount
+            if not owned:
+                raise JobCancelled(job_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO job_chunks (job_id, start_row, end_row, words) VALUES (?, ?, ?, ?)",
+                (job_id, start_row, end_row, json.dumps(words)),
+            )
+            conn.execute(
+                "UPDATE jobs SET rows_done ="
+                " (SELECT SUM(end_row - start_row) FROM job_chunks WHERE job_id = ?) WHERE id = ?",
+                (job_id, job_id),
+            )
+
+    # Running jobs
+
+    def start(self, handler):
+        """Run queued jobs with handler(job) on a background dispatcher thread.
+
+        handler returns None on success or an error message; raising also fails the job.
+        Call it from the process that serves requests; later calls do nothing.
+        """
+        with self._start_lock:
+            self._handler = handler
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    @property
+    def started(self):
+        return self._dispatcher is not None
+
+    def _dispatch_loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+                while len(self._running) < self.max_running:
+                    job = self._claim()
+                    if job is None:
+                        break
+                    with self._running_lock:
+                        self._running.add(job["id"])
+                    threading.Thread(target=self._run, args=(job,), name=f"job-{job['id']}", daemon=True).start()
+            except sqlite3.Error as e:
+                print(f"Job dispatcher error: {e}")
+            self._wake.wait(DISPATCH_SECONDS)
+
+    def _heartbeat(self):
+        with self._running_lock:
+            running = list(self._running)
+        with self._connection() as conn:
+            if running:
+                conn.execute(
+                    f"UPDATE jobs SET heartbeat = ? WHERE owner = ? AND id IN ({','.join('?' * len(running))})",
+                    (time.time(), self.owner, *running),
+                )
+            if self.pin_jobs:
+                # Pinned jobs still waiting here are alive as long as this worker is
+                conn.execute(
+                    "UPDATE jobs SET heartbeat = ? WHERE pinned_to = ? AND status = 'queued'",
+                    (time.time(), self.owner),
+                )
+
+    def _requeue_stale(self):
+        # Running jobs whose worker stopped sending heartbeats (restart, crash, recycled worker)
+        now = time.time()
+        with self._connection() as conn:
+            # No other worker has the data of a pinned job
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ?"
+                " WHERE pinned_to IS NOT NULL AND status IN (?, ?) AND heartbeat < ?",
+                (now, WORKER_GONE, *ACTIVE_STATUSES, now - self.stale_seconds),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND heartbeat < ?",
+                (now - self.stale_seconds,),
+            )
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - FINISHED_JOB_RETENTION_SECONDS,))
+
+    def _claim(self):
+        with self._transaction() as conn:
+            # Unpinned jobs, and jobs pinned to this worker
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND (pinned_to IS NULL OR pinned_to = ?) ORDER BY id LIMIT 1",
+                (self.owner,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ? WHERE id = ?",
+                (self.owner, time.time(), row["id"]),
+            )
+        return dict(row)
+
+    def _run(self, job):
+        try:
+            error = self._handler(job)
+        except JobCancelled:
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        try:
+            self._finish(job["id"], error)
+        finally:
+            with self._running_lock:
+                self._running.discard(job["id"])
+            self._wake.set()
+
+    def _finish(self, job_id, error=None):
+        with self._transaction() as conn:
+            owned = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?"
+                " WHERE id = ? AND status = 'running' AND owner = ?",
+                ("failed" if error else "done", time.time(), error, job_id, self.owner),
+            ).rowcount
+            if owned:
+                # Finished results live in the user's DataFrame; checkpoints are only for resuming
+                conn.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
@@ -0,0 +1,196 @@
+"""Prebuilt keyword index artifact: build it from a source list, load it with mmap.
+
+The four Feedspot lists are stored as sorted, deduplicated tables of
+normalized UTF-8 phrases. Each table is split into buckets by byte length,
+so every bucket is a run of fixed-width records with no padding. Workers
+map the file read-only, so the OS shares one copy between them, and look
+phrases up with a binary search (numpy.searchsorted) directly on the
+mapped records.
+
+Build (source: queries_list.py or a JSON file with the same four lists):
+
+    python keyword_artifact.py --source queries_list.py --out data/keywords.kwidx
+"""
+import argparse
+import ast
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+
+import numpy as np
+
+
+MAGIC = b"KWIDX001"
+ALIGN = 8
+
+# Section name in the artifact -> list name in the source
+SECTIONS = {
+    "red_one_word": "one_word_list",
+    "red_two_word": "two_word_list",
+    "yellow_one_word": "synonym_for_one_word",
+    "yellow_two_word": "synonym_for_two_word",
+}
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class ArtifactError(ValueError):
+    """The file is not a keyword index artifact this version can read."""
+
+
+def normalize_phrase(phrase):
+    """Lowercase a phrase and collapse its internal whitespace."""
+    return WHITESPACE_RE.sub(" ", str(phrase)).strip().lower()
+
+
+class KeywordTable:
+    """Read-only set of phrases backed by sorted records, one array per byte length."""
+
+    def __init__(self, buckets):
+        self._buckets = buckets  # {byte length: sorted numpy S<length> array}
+
+    def __len__(self):
+        return sum(len(records) for records in self._buckets.values())
+
+    def __iter__(self):
+        for records in self._buckets.values():
+            yield from (r.decode("utf-8") for r in records)
+
+    def __contains__(self, phrase):
+        key = str(phrase).encode("utf-8", "surrogatepass")
+        records = self._buckets.get(len(key))
+        if records is None:
+            return False
+        i = int(np.searchsorted(records, key))
+        return i < len(records) and records[i] == key
+
+    def contains_many(self, phrases):
+        """Boolean array: is each phrase in the table."""
+        keys = [str(p).encode("utf-8", "surrogatepass") for p in phrases]
+        found = np.zeros(len(keys), dtype=bool)
+        by_length = {}
+        for i, key in enumerate(keys):
+            by_length.setdefault(len(key), []).append(i)
+        for length, positions in by_length.items():
+            records = self._buckets.get(length)
+            if records is None:
+                continue
+            needles = np.array([keys[i] for i in positions], dtype=records.dtype)
+            at = np.minimum(np.searchsorted(records, needles), len(records) - 1)
+            found[positions] = records[at] == needles
+        return found
+
+
+def load_source(path):
+    """Read the four lists from a queries_list.py-style module (without importing it) or a JSON file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        lists = json.loads(text)
+    else:
+        lists = {}
+        for node in ast.parse(text).body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                lists[node.targets[0].id] = ast.literal_eval(node.value)
+    missing = [name for name in SECTIONS.values() if name not in lists]
+    if missing:
+        raise ArtifactError(f"{path} is missing: {', '.join(missing)}")
+    return {name: lists[name] for name in SECTIONS.values()}
+
+
+def build_artifact(lists):
+    """Serialize the lists into artifact bytes."""
+    tables = {}
+    for section, source_name in SECTIONS.items():
+        phrases = {normalize_phrase(p).encode("utf-8", "surrogatepass") for p in lists[source_name]} - {b""}
+        by_length = {}
+        for phrase in phrases:
+            by_length.setdefault(len(phrase), []).append(phrase)
+        tables[section] = {
+            length: np.array(sorted(group), dtype=f"S{length}") for length, group in sorted(by_length.items())
+        }
+
+    digest = hashlib.sha256()
+    for section, buckets in tables.items():
+        digest.update(section.encode() + b"\x00")
+        for records in buckets.values():
+            digest.update(records.tobytes() + b"\x00")
+
+    # Bucket offsets depend on the header's own length: lay out until it stops changing
+    header = b""
+    while True:
+        offset = len(MAGIC) + 4 + len(header)
+        sections = {}
+        for section, buckets in tables.items():
+            sections[section] = []
+            for length, records in buckets.items():
+                offset += -offset % ALIGN
+                sections[section].append([length, len(records), offset])
+                offset += records.nbytes
+        laid_out = json.dumps({"generation": digest.hexdigest()[:16], "sections": sections}).encode()
+        if len(laid_out) == len(header):
+            break
+        header = laid_out
+    header = laid_out
+
+    out = bytearray(MAGIC + struct.pack("<I", len(header)) + header)
+    for section, buckets in tables.items():
+        for (length, count, offset), records in zip(sections[section], buckets.values()):
+            out.extend(b"\x00" * (offset - len(out)))
+            out.extend(records.tobytes())
+    return bytes(out)
+
+
+def write_artifact(lists, out_path):
+    """Build and atomically replace out_path, so running workers never see a partial file."""
+    data = build_artifact(lists)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+    return len(data)
+
+
+def read_artifact(buffer):
+    """Return (generation, {section: KeywordTable}) over artifact bytes or an mmap."""
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ArtifactError("not a keyword index artifact")
+    (header_len,) = struct.unpack_from("<I", buffer, len(MAGIC))
+    start = len(MAGIC) + 4
+    header = json.loads(bytes(buffer[start:start + header_len]))
+    tables = {}
+    for section in SECTIONS:
+        tables[section] = KeywordTable({
+            length: np.frombuffer(buffer, dtype=f"S{length}", count=count, offset=offset)
+            for length, count, offset in header["sections"][section]
+        })
+    return header["generation"], tables
+
+
+def map_artifact(path):
+    """Memory-map an artifact file read-only."""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return read_artifact(buffer)
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build the keyword index artifact from a source list.")
+    parser.add_argument("--source", default=os.path.join(here, "queries_list.py"),
+                        help="queries_list.py-style module or JSON file with the four lists")
+    parser.add_argument("--out", default=os.path.join(here, "data", "keywords.kwidx"))
+    args = parser.parse_args()
+
+    size = write_artifact(load_source(args.source), args.out)
+    generation, tables = map_artifact(args.out)
+    counts = ", ".join(f"{section} {len(table)}" for section, table in tables.items())
+    print(f"wrote {args.out} ({size:,} bytes, generation {generation}): {counts}")
+
+
+if __name__ == "__main__":
+    main()
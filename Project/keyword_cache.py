@@ -0,0 +1,188 @@
+"""Persistent cache of extracted Important Words, keyed by description content.
+
+The key is a hash of the extractor version (stopwords, max_words and the
+cleaning patterns) plus the description text, so re-uploads of the same
+show only extract descriptions that changed, and any change to the
+extractor starts from an empty cache. Entries live in a SQLite file
+(KEYWORD_CACHE_DB) shared by all workers; once it holds more than
+KEYWORD_CACHE_MAX_ENTRIES the least recently used entries are evicted.
+KEYWORD_CACHE_MAX_ENTRIES=0 disables the cache.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from helper import EMAIL_RE, EMOJI_RE, HTML_RE, STOPWORDS, URL_RE
+from session_store import DEFAULT_SESSION_DIR
+
+
+KEYWORD_CACHE_MAX_ENTRIES = int(os.environ.get("KEYWORD_CACHE_MAX_ENTRIES", 500000))
+KEYWORD_CACHE_DB = os.environ.get(
+    "KEYWORD_CACHE_DB", os.path.join(os.environ.get("SESSION_DIR", DEFAULT_SESSION_DIR), "keywords.sqlite3")
+)
+
+# Bump when the extraction rules change in a way the values below don't capture
+EXTRACTOR_REVISION = 1
+MAX_WORDS = 200
+
+_LOOKUP_BATCH = 500          # keys per SELECT ... IN (...)
+_TOUCH_SECONDS = 3600        # hits refresh used_at at most this often
+_EVICT_TO = 0.9              # evict down to this share of max_entries
+
+
+def extractor_version(max_words=MAX_WORDS):
+    """Digest of everything that determines the extracted words besides the text."""
+    parts = [
+        str(EXTRACTOR_REVISION),
+        str(max_words),
+        " ".join(sorted(STOPWORDS)),
+        *(pattern.pattern for pattern in (URL_RE, EMAIL_RE, HTML_RE, EMOJI_RE)),
+    ]
+    return hashlib.blake2b("\x00".join(parts).encode(), digest_size=16).digest()
+
+
+class KeywordCache:
+    """Description hash -> Important Words, with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path, max_entries=KEYWORD_CACHE_MAX_ENTRIES, max_words=MAX_WORDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = extractor_version(max_words)
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS keywords ("
+                " key BLOB PRIMARY KEY,"
+                " words TEXT NOT NULL,"
+                " used_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS keywords_by_use ON keywords (used_at)")
+            # Entry count kept by triggers in the writing transaction, so eviction checks don't scan the table
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS keyword_count ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " entries INTEGER NOT NULL)"
+            )
+            if conn.execute("SELECT 1 FROM keyword_count").fetchone() is None:
+                # First connection to this file: count what an older version left in it
+                conn.execute("INSERT INTO keyword_count (id, entries) SELECT 0, COUNT(*) FROM keywords")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS keywords_counted_insert AFTER INSERT ON keywords"
+                " BEGIN UPDATE keyword_count SET entries = entries + 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS keywords_counted_delete AFTER DELETE ON keywords"
+                " BEGIN UPDATE keyword_count SET entries = entries - 1; END"
+            )
+            conn.execute("COMMIT")
+            self._local.conn = conn
+        yield conn
+
+    def key(self, text):
+        return hashlib.blake2b(
+            str(text).encode("utf-8", "surrogatepass"), digest_size=16, key=self._version
+        ).digest()
+
+    def get_many(self, texts):
+        """Cached words for each text, None where missing."""
+        keys = [self.key(t) for t in texts]
+        found = {}
+        stale = []
+        now = time.time()
+        with self._connection() as conn:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                for key, words, used_at in conn.execute(
+                    f"SELECT key, words, used_at FROM keywords WHERE key IN ({','.join('?' * len(batch))})", batch
+                ):
+                    found[key] = words
+                    if used_at < now - _TOUCH_SECONDS:
+                        stale.append((now, key))
+            if stale:
+                # Refresh the LRU position of entries not used for a while
+                conn.executemany("UPDATE keywords SET used_at = ? WHERE key = ?", stale)
+        words = [found.get(k) for k in keys]
+        with self._counter_lock:
+            hits = len(keys) - words.count(None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return words
+
+    def put_many(self, texts, words):
+        if not texts:
+            return
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert, not INSERT OR REPLACE: a replace would skip the delete trigger and over-count
+                conn.executemany(
+                    "INSERT INTO keywords (key, words, used_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET words = excluded.words, used_at = excluded.used_at",
+                    [(self.key(t), w, now) for t, w in zip(texts, words)],
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._evict(conn)
+
+    def _evict(self, conn):
+        size = self._size(conn)
+        if size <= self.max_entries:
+            return
+        excess = size - int(self.max_entries * _EVICT_TO)
+        conn.execute(
+            "DELETE FROM keywords WHERE key IN (SELECT key FROM keywords ORDER BY used_at LIMIT ?)", (excess,)
+        )
+        with self._counter_lock:
+            self.evictions += excess
+
+    @staticmethod
+    def _size(conn):
+        return conn.execute("SELECT entries FROM keyword_count").fetchone()[0]
+
+    def lookup_or_extract(self, texts, extract):
+        """Words for every text, calling extract(texts) only for the cache misses."""
+        texts = list(texts)
+        words = self.get_many(texts)
+        missing = [i for i, w in enumerate(words) if w is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            extracted = extract(missing_texts)
+            for i, w in zip(missing, extracted):
+                words[i] = w
+            self.put_many(missing_texts, extracted)
+        return words
+
+    def stats(self):
+        with self._connection() as conn:
+            size = self._size(conn)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+keyword_cache = KeywordCache(KEYWORD_CACHE_DB) if KEYWORD_CACHE_MAX_ENTRIES > 0 else None
@@ -0,0 +1,130 @@
+"""Index over the Feedspot keyword lists.
+
+The lists are read from the prebuilt artifact (KEYWORD_INDEX_PATH, built by
+keyword_artifact.py from queries_list.py): sorted tables of normalized
+phrases that every worker maps read-only, so startup is a file open instead
+of importing and hashing ~22k list entries, and classifying a suggestion
+card is a binary search. When the artifact is rebuilt, workers pick it up
+within KEYWORD_INDEX_RELOAD_SECONDS without a restart.
+
+Every decision is memoized per process in a bounded LRU keyed on the index
+generation and the normalized phrase, so the grams that recur across
+episodes and users skip the search; see status_cache_stats().
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from lru_cache import LRUCache
+from keyword_artifact import build_artifact, load_source, map_artifact, normalize_phrase, read_artifact
+
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+KEYWORD_INDEX_PATH = os.environ.get("KEYWORD_INDEX_PATH", os.path.join(_HERE, "data", "keywords.kwidx"))
+KEYWORD_INDEX_RELOAD_SECONDS = float(os.environ.get("KEYWORD_INDEX_RELOAD_SECONDS", 10))
+KEYWORD_SOURCE_PATH = os.path.join(_HERE, "queries_list.py")
+KEYWORD_STATUS_CACHE_SIZE = int(os.environ.get("KEYWORD_STATUS_CACHE_SIZE", 50000))
+
+RED = "red"        # phrase already has a Feedspot list
+YELLOW = "yellow"  # similar-intent phrase that might have a Feedspot list
+NEW = "new"        # not covered by Feedspot yet
+
+# (generation, n, normalized phrase) -> status; entries of a replaced generation age out
+_status_cache = LRUCache(KEYWORD_STATUS_CACHE_SIZE)
+
+
+class KeywordIndex:
+    """One loaded generation of the four keyword tables."""
+
+    def __init__(self, generation, tables, file_id=None):
+        self.generation = generation
+        self.file_id = file_id
+        self.red_one_word = tables["red_one_word"]
+        self.red_two_word = tables["red_two_word"]
+        self.yellow_one_word = tables["yellow_one_word"]
+        self.yellow_two_word = tables["yellow_two_word"]
+        self._tables_by_size = {
+            1: (self.red_one_word, self.yellow_one_word),
+            2: (self.red_two_word, self.yellow_two_word),
+        }
+
+    def classify(self, phrase, n=1):
+        return self.classify_many([phrase], n)[0]
+
+    def classify_many(self, phrases, n=1):
+        keys = [normalize_phrase(p) for p in phrases]
+        if not keys:
+            return []
+        cache_keys = [(self.generation, n, key) for key in keys]
+        statuses = _status_cache.get_many(cache_keys)
+        missing = [i for i, status in enumerate(statuses) if status is None]
+        if missing:
+            # One vectorized search per table for the phrases not seen before
+            red, yellow = self._tables_by_size[n]
+            needles = [keys[i] for i in missing]
+            found = np.where(red.contains_many(needles), RED,
+                             np.where(yellow.contains_many(needles), YELLOW, NEW)).tolist()
+            for i, status in zip(missing, found):
+                statuses[i] = status
+            _status_cache.put_many(zip((cache_keys[i] for i in missing), found))
+        return statuses
+
+
+def _file_id(path):
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def load_index(path=KEYWORD_INDEX_PATH):
+    """Map the artifact at path, or build the tables in memory from queries_list.py if it is missing."""
+    try:
+        file_id = _file_id(path)
+    except FileNotFoundError:
+        print(f"Keyword index {path} not found; building it in memory from {KEYWORD_SOURCE_PATH}")
+        return KeywordIndex(*read_artifact(build_artifact(load_source(KEYWORD_SOURCE_PATH))))
+    return KeywordIndex(*map_artifact(path), file_id=file_id)
+
+
+_index = load_index()
+_checked_at = time.monotonic()
+_reload_lock = threading.Lock()
+
+
+def current_index():
+    """The loaded index, reloading it first if the artifact file was replaced."""
+    global _index, _checked_at
+    if time.monotonic() - _checked_at < KEYWORD_INDEX_RELOAD_SECONDS:
+        return _index
+    # One thread checks the file; the others keep using the loaded index meanwhile
+    if _reload_lock.acquire(blocking=False):
+        try:
+            _checked_at = time.monotonic()
+            try:
+                changed = _file_id(KEYWORD_INDEX_PATH) != _index.file_id
+            except FileNotFoundError:
+                changed = False
+            if changed:
+                _index = load_index()
+        except Exception as e:
+            print(f"Keyword index reload failed, keeping generation {_index.generation}: {e}")
+        finally:
+            _reload_lock.release()
+    return _index
+
+
+def classify(phrase, n=1):
+    """Return RED, YELLOW or NEW for a one-word (n=1) or two-word (n=2) phrase."""
+    return current_index().classify(phrase, n)
+
+
+def classify_many(phrases, n=1):
+    """Classify a batch of phrases, preserving order."""
+    return current_index().classify_many(phrases, n)
+
+
+def status_cache_stats():
+    """Hit/miss counters of this process's memoized classifications."""
+    return _status_cache.stats()
@@ -0,0 +1,229 @@
+"""In-process latency and throughput metrics, rendered for Prometheus.
+
+Recording is a bucket search and a few additions under a per-metric lock
+(or, for session lock stripes, under the stripe's own lock);
+gauges (user store size, running jobs, ...) are only computed when /metrics
+is scraped, so a worker nobody scrapes pays almost nothing. Every worker
+reports its own numbers; Prometheus sums them across workers.
+"""
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# Seconds; from a cache hit up to a large upload or extraction
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        return self._render_series(series)
+
+    def _render_series(self, series):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class UnlockedRecorder:
+    """One owner's bucket counts for a SummedHistogram; the owner serializes its observe() calls."""
+    __slots__ = ("_buckets", "series", "__weakref__")
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self.series = [0] * (len(buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        self.series[bisect.bisect_left(self._buckets, value)] += 1
+        self.series[-1] += value
+
+
+class SummedHistogram(Histogram):
+    """Unlabelled histogram kept in many recorders and summed at scrape time.
+
+    For hot paths that already hold a lock of their own (session lock
+    stripes): recording takes no shared lock.
+    """
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, buckets=buckets)
+        self._recorders = weakref.WeakSet()
+
+    def recorder(self):
+        recorder = UnlockedRecorder(self.buckets)
+        with self._lock:
+            self._recorders.add(recorder)
+        # Keep the counts of a dropped owner so the totals never go down
+        weakref.finalize(recorder, self._retire, recorder.series)
+        return recorder
+
+    def _retire(self, series):
+        with self._lock:
+            totals = self._series.setdefault((), [0] * (len(self.buckets) + 1) + [0.0])
+            for i, value in enumerate(series):
+                totals[i] += value
+
+    def observe(self, value, *labels):
+        raise TypeError(f"{self.name} is recorded through recorder()")
+
+    def render(self):
+        with self._lock:
+            recorders = list(self._recorders)
+            retired = {labels: list(values) for labels, values in self._series.items()}
+        # Read without the owners' locks: a scrape may miss an observation in flight
+        live = [r.series[:] for r in recorders]
+        if live:
+            totals = retired.setdefault((), [0] * (len(self.buckets) + 1) + [0.0])
+            for values in live:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return self._render_series(retired)
+
+
+class Counter:
+    """Monotonic total, one series per label combination."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time.
+
+    The callback returns a number, or {label values tuple: number} for a
+    labelled gauge.
+    """
+
+    def __init__(self, name, help_text, callback, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self._callback()
+        except Exception as e:
+            # A failing source must not break the whole scrape
+            return lines + [f"# {self.name} unavailable: {_escape(e)}"]
+        values = value if isinstance(value, dict) else {(): value}
+        for labels, number in sorted(values.items()):
+            if number is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(number)}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, in registration order."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, help_text, callback, labelnames=()):
+        return self.register(Gauge(name, help_text, callback, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "qg_request_seconds", "Time to build each response (streamed bodies excluded), by route.",
+    ("route", "method", "status"),
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "qg_stage_seconds", "Time spent in each pipeline stage.", ("stage",),
+))
+LOCK_WAIT_SECONDS = registry.register(SummedHistogram(
+    "qg_session_lock_wait_seconds", "Time spent waiting for a user's session lock stripe.",
+    buckets=(0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+))
+EXTRACTION_ROWS = registry.register(Counter(
+    "qg_extraction_rows_total", "Descriptions run through keyword extraction.",
+))
+EXTRACTION_SECONDS = registry.register(Counter(
+    "qg_extraction_seconds_total", "Time spent in keyword extraction; rows/second is the ratio of the two rates.",
+))
+
+
+def stage(name):
+    """Context manager timing one pipeline stage into qg_stage_seconds."""
+    return STAGE_SECONDS.time(name)
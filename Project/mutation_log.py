@@ -0,0 +1,62 @@
+"""Cell edits to an upload's DataFrame, as recorded in the mutation log.
+
+Clicks change single cells (Analyzed and lazily extracted Important
+Words) or add and remove saved queries. Instead of re-saving the whole
+frame, a store records each click as (row, column, value) edits against
+the upload's last snapshot and replays them when the frame is next loaded.
+Query edits use the ADD_QUERY / REMOVE_QUERY pseudo-columns with the query
+as value, and go to the upload's QueryTable instead of the frame.
+Important Words edits also re-index the row in the upload's EpisodeIndex,
+so the index follows the log instead of being saved with every edit.
+"""
+import json
+
+from query_table import QueryTable
+
+
+ADD_QUERY = "+query"
+REMOVE_QUERY = "-query"
+INDEXED_COLUMN = "Important Words"
+
+
+def set_cell(df, row_id: int, column: str, value):
+    """Write one cell by position, widening the column to object if it can't hold the value."""
+    if column not in df.columns:
+        df[column] = None
+    elif isinstance(value, str) and df[column].dtype != object:
+        df[column] = df[column].astype(object)
+    df.iat[row_id, df.columns.get_loc(column)] = value
+
+
+def apply_edit(data, row_id: int, column: str, value):
+    """Apply one edit to a user's data: a frame cell, or a query of data["queries"]."""
+    if column == ADD_QUERY or column == REMOVE_QUERY:
+        queries = data.get("queries")
+        if queries is None:
+            queries = data["queries"] = QueryTable(len(data["df"]))
+        if column == ADD_QUERY:
+            queries.add(row_id, value)
+        else:
+            queries.remove(row_id, value)
+    else:
+        set_cell(data["df"], row_id, column, value)
+        if column == INDEXED_COLUMN and data.get("episode_index") is not None:
+            data["episode_index"].update_row(row_id, value)
+
+
+def apply_edits(data, edits):
+    """Replay (row, column, value) edits in order."""
+    for row_id, column, value in edits:
+        apply_edit(data, row_id, column, value)
+    return data
+
+
+def encode_value(value):
+    # numpy scalars (e.g. from df.iat) become plain Python values
+    if hasattr(value, "item"):
+        value = value.item()
+    return json.dumps(value)
+
+
+def decode_value(text):
+    return json.loads(text)
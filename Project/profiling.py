@@ -0,0 +1,162 @@
+"""Opt-in profiles of single requests and extraction jobs.
+
+Profiling is off unless PROFILE_TOKEN is set. A request sent with the
+header `X-Profile: <token>` is run under cProfile, and a /process request
+with that header profiles the extraction job it queues. While a profile
+runs, a sampler thread also records the profiled thread's stack every
+PROFILE_SAMPLE_SECONDS, which gives collapsed stacks (one
+`frame;frame;frame count` line per stack) for flame graphs.
+
+Each profile is written under PROFILE_DIR as `<id>.pstats` (load it with
+pstats or snakeviz), `<id>.collapsed` and `<id>.json` (what was profiled
+and how long it took); only the newest PROFILE_KEEP are kept.
+
+On Python 3.12+ only one cProfile can be active in the process at a time;
+a profile that starts while another runs keeps only the sampled stacks.
+"""
+import cProfile
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from session_store import DEFAULT_SESSION_DIR
+
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.environ.get("SESSION_DIR", DEFAULT_SESSION_DIR), "profiles"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 50))
+PROFILE_SAMPLE_SECONDS = float(os.environ.get("PROFILE_SAMPLE_SECONDS", 0.005))
+
+PROFILE_HEADER = "X-Profile"
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[a-z]+-[0-9a-f]{8}$")
+EXTENSIONS = ("pstats", "collapsed", "json")
+
+
+def profiling_enabled():
+    return bool(PROFILE_TOKEN)
+
+
+def token_matches(token):
+    """True if profiling is enabled and token is the admin token."""
+    return profiling_enabled() and bool(token) and hmac.compare_digest(str(token), PROFILE_TOKEN)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _StackSampler(threading.Thread):
+    """Counts the stacks of one thread until stopped."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profile:
+    """One running profile of the calling thread; call stop() in the same thread."""
+
+    def __init__(self, kind, target):
+        self.kind = kind
+        self.target = target
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{kind}-{uuid.uuid4().hex[:8]}"
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # Another profile is active (Python 3.12+); keep the sampled stacks only
+            self._profiler = None
+        self._sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_SECONDS)
+        self._sampler.start()
+
+    def stop(self, **details):
+        """Stop profiling, write the files and return the profile's summary."""
+        seconds = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._sampler.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, self.id)
+        files = []
+        if self._profiler is not None:
+            self._profiler.dump_stats(f"{base}.pstats")
+            files.append("pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in self._sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        files.append("collapsed")
+        summary = {
+            "id": self.id,
+            "kind": self.kind,
+            "target": self.target,
+            "started_at": self._started_at,
+            "seconds": round(seconds, 6),
+            "samples": sum(self._sampler.stacks.values()),
+            "files": files + ["json"],
+            **details,
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        _prune()
+        return summary
+
+
+def _prune():
+    """Delete all but the newest PROFILE_KEEP profiles."""
+    for profile_id in [p["id"] for p in list_profiles(limit=None)][PROFILE_KEEP:]:
+        for ext in EXTENSIONS:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f"{profile_id}.{ext}"))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit=20):
+    """Summaries of the stored profiles, newest first."""
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    summaries = []
+    for name in sorted((n for n in names if n.endswith(".json")), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def profile_file(profile_id, ext):
+    """Path of one stored profile file, or None if the id or extension is not valid or missing."""
+    if ext not in EXTENSIONS or not _ID_RE.match(profile_id or ""):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+    return path if os.path.exists(path) else None
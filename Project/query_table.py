@@ -0,0 +1,164 @@
+"""Saved queries of an upload, kept apart from its DataFrame.
+
+Every distinct query string is stored once and numbered; each episode
+keeps the numbers of its queries in an insertion-ordered set, so adding,
+removing and checking a query are O(1) and an episode's count is the size
+of its set. The `No of Queries` and `Added Queries` columns only exist in
+the uploaded CSV and in what the user sees: they are read into the table
+at upload and written back (at their original positions) for downloads
+and table pages. A row whose uploaded `No of Queries` is set but whose
+`Added Queries` is empty keeps that count: the queries exist, they just
+weren't listed, and queries added later count on top of them.
+
+In the `Added Queries` text, queries are comma-separated; a query that
+itself contains a comma or a quote is quoted CSV-style, so it survives a
+download and re-upload.
+"""
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+
+COUNT_COLUMN = "No of Queries"
+TEXT_COLUMN = "Added Queries"
+_SPECIAL = (",", '"', "\n", "\r")
+
+
+def split_queries(text):
+    """Queries in one `Added Queries` cell, trimmed, without empties."""
+    if not isinstance(text, str) or not text:
+        return []
+    if '"' in text:
+        parts = next(csv.reader(io.StringIO(text.replace("\r", " ").replace("\n", " ")), skipinitialspace=True), [])
+    else:
+        parts = text.split(",")
+    return [q for q in (p.strip() for p in parts) if q]
+
+
+def join_queries(queries):
+    """The `Added Queries` cell for a list of queries (inverse of split_queries)."""
+    if not any(ch in q for q in queries for ch in _SPECIAL):
+        return ",".join(queries)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(queries)
+    return buffer.getvalue()
+
+
+def _row_list(rows, n_rows):
+    if rows is None:
+        return range(n_rows)
+    return rows.tolist() if isinstance(rows, np.ndarray) else rows
+
+
+class QueryTable:
+    """Interned query strings plus an ordered set of query ids per episode row."""
+
+    def __init__(self, n_rows, positions=None):
+        self.n_rows = n_rows
+        # Where the two columns sat in the uploaded frame: {column: position}
+        self.positions = dict(positions or {})
+        self._strings = []   # id -> query
+        self._ids = {}       # query -> id
+        self._rows = {}      # row -> {id: None}, only rows that have queries
+        self._unlisted = {}  # row -> queries counted in the upload but not listed in its text
+
+    def __setstate__(self, state):
+        # Tables pickled before unlisted counts were kept
+        state.setdefault("_unlisted", {})
+        self.__dict__.update(state)
+
+    def _intern(self, query):
+        query_id = self._ids.get(query)
+        if query_id is None:
+            query_id = self._ids[query] = len(self._strings)
+            self._strings.append(query)
+        return query_id
+
+    def add(self, row_id, query):
+        """Add query to the row; False if it was already there."""
+        ids = self._rows.setdefault(row_id, {})
+        query_id = self._intern(query)
+        if query_id in ids:
+            return False
+        ids[query_id] = None
+        return True
+
+    def remove(self, row_id, query):
+        """Remove query from the row; False if it wasn't there."""
+        ids = self._rows.get(row_id)
+        query_id = self._ids.get(query)
+        if ids is None or query_id not in ids:
+            return False
+        del ids[query_id]
+        if not ids:
+            del self._rows[row_id]
+        return True
+
+    def contains(self, row_id, query):
+        query_id = self._ids.get(query)
+        return query_id is not None and query_id in self._rows.get(row_id, ())
+
+    def queries(self, row_id):
+        """The row's queries in the order they were added."""
+        return [self._strings[i] for i in self._rows.get(row_id, ())]
+
+    def count(self, row_id):
+        return len(self._rows.get(row_id, ())) + self._unlisted.get(row_id, 0)
+
+    def counts(self, rows=None):
+        """int32 query counts for the given positional rows (all rows by default)."""
+        rows = _row_list(rows, self.n_rows)
+        counts = np.fromiter((len(self._rows.get(r, ())) for r in rows), dtype=np.int32, count=len(rows))
+        if self._unlisted:
+            counts += np.fromiter((self._unlisted.get(r, 0) for r in rows), dtype=np.int32, count=len(rows))
+        return counts
+
+    def texts(self, rows=None):
+        """`Added Queries` cells for the given positional rows (all rows by default)."""
+        rows = _row_list(rows, self.n_rows)
+        return [join_queries(self.queries(r)) if r in self._rows else "" for r in rows]
+
+    def column_names(self, frame_columns):
+        """frame_columns with the two query columns put back at their positions."""
+        names = [c for c in frame_columns if c not in self.positions]
+        for column, position in sorted(self.positions.items(), key=lambda item: item[1]):
+            names.insert(min(position, len(names)), column)
+        return names
+
+    def materialize(self, frame, rows=None):
+        """frame (the upload's frame, or the given positional rows of it) with the query columns added.
+
+        The frame itself is left unchanged; the copy shares its other columns.
+        """
+        if rows is None:
+            rows = range(len(frame))
+        frame = frame.copy(deep=False)
+        values = {COUNT_COLUMN: self.counts(rows), TEXT_COLUMN: self.texts(rows)}
+        for column, position in sorted(self.positions.items(), key=lambda item: item[1]):
+            if column in frame.columns:
+                frame[column] = values[column]
+            else:
+                frame.insert(min(position, len(frame.columns)), column, values[column])
+        return frame
+
+    @classmethod
+    def from_frame(cls, df):
+        """Move the query columns of an uploaded frame into a new table; returns (frame, table)."""
+        columns = list(df.columns)
+        positions = {c: columns.index(c) for c in (COUNT_COLUMN, TEXT_COLUMN) if c in columns}
+        table = cls(len(df), positions)
+        if TEXT_COLUMN in df.columns:
+            texts = df[TEXT_COLUMN]
+            filled = np.flatnonzero(pd.Series(texts).fillna("").astype(str).str.len().to_numpy() > 0)
+            for row_id, text in zip(filled.tolist(), texts.iloc[filled].tolist()):
+                for query in split_queries(text):
+                    table.add(row_id, query)
+        if COUNT_COLUMN in df.columns:
+            # Listed queries are counted from the text; an uploaded count without a list is kept
+            counts = pd.to_numeric(df[COUNT_COLUMN], errors="coerce").fillna(0).clip(lower=0).to_numpy(dtype=np.int64)
+            unlisted = np.flatnonzero(counts > 0)
+            table._unlisted = {row_id: count for row_id, count in zip(unlisted.tolist(), counts[unlisted].tolist())
+                               if row_id not in table._rows}
+        return df.drop(columns=list(positions)), table
@@ -0,0 +1,660 @@
+"""Per-user session storage behind get_user_data / save_user_data.
+
+SESSION_BACKEND=memory (default) keeps every user's data in the current
+process, as before. SESSION_BACKEND=disk keeps it under SESSION_DIR so all
+gunicorn workers share uploads, processing state and edits: each DataFrame
+is a Parquet file (pickle when pyarrow is not installed) and everything
+else lives in a small SQLite table. Every worker keeps the last version it
+read in memory and only reloads when the SQLite version moves on.
+
+Eviction is configured with SESSION_EVICTION: "ttl_lru" (default, expire
+after SESSION_TTL seconds without a save and keep at most SESSION_MAX_USERS
+users), "ttl" or "lru".
+
+Users are spread over SESSION_LOCK_STRIPES lock stripes, so one user's
+saves never wait for another's unless they hash to the same stripe.
+Processing progress is kept apart from the user's data in a ProgressRecord
+that the background job updates without taking any lock.
+
+Cell edits go through apply_edits. The disk store appends them to a
+mutation log instead of rewriting the frame, replays the log on the next
+load, and folds it into a new snapshot every SESSION_SNAPSHOT_EDITS edits.
+The upload's saved queries (a QueryTable) are edited through the same log
+and snapshotted next to the frame. Edits only move the session's
+data_version; its version (and the pickled metadata, kept in a table of
+its own) changes when the metadata is saved, so other workers replay just
+the new edits and an edit never rewrites the metadata.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import LOCK_WAIT_SECONDS
+from mutation_log import apply_edit, apply_edits, decode_value, encode_value
+
+try:
+    from cachetools import LRUCache, TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    # Fallback for environments without cachetools
+    CACHETOOLS_AVAILABLE = False
+    print("Warning: cachetools not available, using fallback cache")
+
+try:
+    import pyarrow  # noqa: F401
+    FRAME_FORMAT = "parquet"
+except ImportError:
+    FRAME_FORMAT = "pickle"
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process file locks (Windows); locking is per process only
+    fcntl = None
+
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "session_data")
+EVICTION_POLICIES = ("ttl_lru", "ttl", "lru")
+EVICTION_SWEEP_SECONDS = 60
+PROGRESS_PUBLISH_SECONDS = 0.25
+SNAPSHOT_EDITS = int(os.environ.get("SESSION_SNAPSHOT_EDITS", 500))
+
+IDLE_PROGRESS = {
+    "in_progress": False,
+    "started_at": None,
+    "percent": 0,
+    "eta": "00:00:00",
+    "done": False,
+    "error": None
+}
+
+
+class ProgressRecord:
+    """Processing progress of one user's background job.
+
+    The job is the only writer. Each update swaps in a new dict, so readers
+    never take a lock and never see a half-applied update. Listeners that
+    want to be woken on change (the progress stream) wait on the record's
+    condition instead of polling.
+    """
+    __slots__ = ("_state", "_on_publish", "_seq", "_changed")
+
+    def __init__(self, state=None, on_publish=None):
+        self._state = dict(IDLE_PROGRESS, **(state or {}))
+        self._on_publish = on_publish
+        self._seq = 0
+        self._changed = threading.Condition(threading.Lock())
+
+    def snapshot(self):
+        """Current state; treat it as read-only."""
+        return self._state
+
+    def _set(self, state):
+        with self._changed:
+            self._state = state
+            self._seq += 1
+            self._changed.notify_all()
+        if self._on_publish is not None:
+            self._on_publish(state)
+
+    def update(self, **changes):
+        state = dict(self._state)
+        state.update(changes)
+        self._set(state)
+
+    def reset(self, **changes):
+        """Start over from the idle state (new upload or new job)."""
+        self._set(dict(IDLE_PROGRESS, **changes))
+
+    def wait(self, seen_seq, timeout=None):
+        """Block until the record changes after seen_seq (or timeout); return (seq, state)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq != seen_seq, timeout)
+            return self._seq, self._state
+
+
+class TimedLock:
+    """threading.Lock that records how long callers waited for it.
+
+    Each lock keeps its own counts, written while it is held, so timing
+    a stripe never waits on the other stripes; /metrics sums them.
+    """
+    __slots__ = ("_lock", "_waits")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = LOCK_WAIT_SECONDS.recorder()
+
+    def __enter__(self):
+        if self._lock.acquire(blocking=False):
+            self._waits.observe(0.0)
+            return self
+        start = time.perf_counter()
+        self._lock.acquire()
+        self._waits.observe(time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+class LockStripes:
+    """A fixed set of locks; a user id always maps to the same one."""
+
+    def __init__(self, stripes=16):
+        self._locks = tuple(TimedLock() for _ in range(max(1, stripes)))
+
+    def index(self, uid):
+        return hash(uid) % len(self._locks)
+
+    def get(self, uid):
+        return self._locks[self.index(uid)]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+if CACHETOOLS_AVAILABLE:
+    class _CountingLRUCache(LRUCache):
+        evictions = 0
+
+        def popitem(self):
+            self.evictions += 1
+            return super().popitem()
+
+    class _CountingTTLCache(TTLCache):
+        evictions = 0
+
+        def popitem(self):
+            self.evictions += 1
+            return super().popitem()
+
+        def expire(self, time=None):
+            expired = super().expire(time)
+            self.evictions += len(expired)
+            return expired
+
+
+def _make_cache(max_users, ttl, eviction):
+    if not CACHETOOLS_AVAILABLE:
+        # Fallback: simple dict, nothing is evicted
+        return {}
+    if eviction == "lru":
+        return _CountingLRUCache(maxsize=max_users)
+    if eviction == "ttl":
+        return _CountingTTLCache(maxsize=float("inf"), ttl=ttl)
+    return _CountingTTLCache(maxsize=max_users, ttl=ttl)
+
+
+class MemoryStore:
+    """Users' data in this process only (single gunicorn worker).
+
+    One cache holds every user, so max_users and the TTL apply to the process
+    as a whole. Work on a user's data runs under the user's lock stripe; the
+    cache's own lock is only held to look a user up or store them (which may
+    evict someone else).
+    """
+
+    def __init__(self, max_users=100, ttl=14400, eviction="ttl_lru", stripes=16):
+        self._locks = LockStripes(stripes)
+        self._cache = _make_cache(max_users, ttl, eviction)
+        self._cache_lock = threading.Lock()
+
+    def _lookup(self, uid):
+        with self._cache_lock:
+            return self._cache.get(uid)
+
+    def _store(self, uid, data):
+        with self._cache_lock:
+            self._cache[uid] = data
+
+    def get(self, uid):
+        with self._locks.get(uid):
+            data = self._lookup(uid)
+            return data if data is not None else {}
+
+    def update(self, uid, new_data):
+        with self._locks.get(uid):
+            data = self._lookup(uid)
+            if data is None:
+                data = {}
+            # Merge into the stored dict; re-setting the key only refreshes the TTL
+            data.update(new_data)
+            self._store(uid, data)
+
+    def apply_edits(self, uid, row_id, values):
+        """Write {column: value} into one row of the user's frame and bump data_version."""
+        self.apply_cell_edits(uid, [(row_id, column, value) for column, value in values.items()])
+
+    def apply_cell_edits(self, uid, edits):
+        """Write (row, column, value) edits, possibly across many rows, as one update."""
+        with self._locks.get(uid):
+            data = self._lookup(uid)
+            if data is None or data.get("df") is None:
+                return
+            for row_id, column, value in edits:
+                apply_edit(data, row_id, column, value)
+            data["data_version"] = time.time_ns()
+            self._store(uid, data)
+
+    def progress(self, uid):
+        """The user's progress record, for the job to update in place."""
+        with self._locks.get(uid):
+            data = self._lookup(uid)
+            if data is None:
+                data = {}
+                self._store(uid, data)
+            record = data.get("progress")
+            if record is None:
+                record = data["progress"] = ProgressRecord()
+            return record
+
+    def stats(self):
+        """Users held in this process and users evicted so far."""
+        with self._cache_lock:
+            return {"users": len(self._cache), "evictions": getattr(self._cache, "evictions", 0)}
+
+    def progress_snapshot(self, uid):
+        with self._locks.get(uid):
+            record = (self._lookup(uid) or {}).get("progress")
+        return record.snapshot() if record is not None else IDLE_PROGRESS
+
+    def live_progress(self, uid):
+        """The record of a job running in this process, or None."""
+        with self._locks.get(uid):
+            record = (self._lookup(uid) or {}).get("progress")
+        return record if record is not None and record.snapshot()["in_progress"] else None
+
+
+class DiskStore:
+    """Users' data under a directory shared by every worker on the host."""
+
+    def __init__(self, root, max_users=100, ttl=14400, eviction="ttl_lru", stripes=16):
+        self.root = root
+        self.max_users = max_users
+        self.ttl = ttl
+        self.eviction = eviction
+        self._frames_dir = os.path.join(root, "frames")
+        self._locks_dir = os.path.join(root, "locks")
+        os.makedirs(self._frames_dir, exist_ok=True)
+        os.makedirs(self._locks_dir, exist_ok=True)
+        self._db_path = os.path.join(root, "sessions.sqlite3")
+        self._local = threading.local()
+        self._locks = LockStripes(stripes)
+        # uid -> (version, frame_version, last applied edit seq, data) as last read or written here
+        self._cache = {}
+        # uid -> ProgressRecord of jobs started by this process, and when each was last published
+        self._progress = {}
+        self._published_at = {}
+        self._last_sweep = 0.0
+        self._evictions = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " uid TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " frame_version INTEGER NOT NULL,"
+                " saved_at REAL NOT NULL,"
+                " edit_count INTEGER NOT NULL DEFAULT 0,"
+                " data_version INTEGER NOT NULL DEFAULT 0)"
+            )
+            # The pickled metadata has a table of its own: SQLite rewrites a whole row on
+            # UPDATE, and each edit updates the sessions row
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_meta ("
+                " uid TEXT PRIMARY KEY,"
+                " meta BLOB NOT NULL)"
+            )
+            self._migrate(conn)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS edits ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " uid TEXT NOT NULL,"
+                " frame_version INTEGER NOT NULL,"
+                " row_id INTEGER NOT NULL,"
+                " col TEXT NOT NULL,"
+                " value TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS edits_by_uid ON edits (uid, seq)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                " uid TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def _migrate(conn):
+        """Bring a sessions table written by an older version to the current layout."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "data_version" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+        if "meta" in columns:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO session_meta (uid, meta) SELECT uid, meta FROM sessions")
+                conn.execute("ALTER TABLE sessions DROP COLUMN meta")
+            except sqlite3.OperationalError:
+                # Another worker migrated it first
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute("COMMIT")
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # One connection per thread; WAL lets readers in other workers run during a write
+            conn = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        yield conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def _locked(self, uid):
+        """Hold the user's lock stripe in this process and, where supported, a lock across workers."""
+        with self._locks.get(uid):
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self._locks_dir, f"{uid}.lock"), "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _frame_path(self, uid, frame_version, fmt=FRAME_FORMAT):
+        return os.path.join(self._frames_dir, f"{uid}-{frame_version}.{fmt}")
+
+    def _write_frame(self, uid, frame_version, df):
+        """Write the frame atomically and return its file name."""
+        fmt = FRAME_FORMAT
+        path = self._frame_path(uid, frame_version, fmt)
+        tmp_path = f"{path}.tmp"
+        try:
+            if fmt == "parquet":
+                df.to_parquet(tmp_path)
+            else:
+                df.to_pickle(tmp_path)
+        except (TypeError, ValueError, ImportError):
+            # Columns Arrow can't type (e.g. mixed objects) still round-trip through pickle
+            fmt = "pickle"
+            path = self._frame_path(uid, frame_version, fmt)
+            tmp_path = f"{path}.tmp"
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        return os.path.basename(path)
+
+    def _write_queries(self, uid, frame_version, queries):
+        """Write the upload's QueryTable next to its frame snapshot and return the file name."""
+        path = self._frame_path(uid, frame_version, "queries")
+        with open(f"{path}.tmp", "wb") as handle:
+            pickle.dump(queries, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+        return os.path.basename(path)
+
+    def _read_queries(self, uid, frame_version):
+        try:
+            with open(self._frame_path(uid, frame_version, "queries"), "rb") as handle:
+                return pickle.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def _read_frame(self, uid, frame_version):
+        import pandas as pd
+        path = self._frame_path(uid, frame_version, "parquet")
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        return pd.read_pickle(self._frame_path(uid, frame_version, "pickle"))
+
+    def _remove_frames(self, uid, keep=()):
+        prefix = f"{uid}-"
+        for name in os.listdir(self._frames_dir):
+            if name.startswith(prefix) and name not in keep:
+                try:
+                    os.remove(os.path.join(self._frames_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _replay(self, uid, frame_version, applied_seq, data):
+        """Apply logged edits newer than applied_seq to data; return the last applied seq."""
+        with self._connection() as conn:
+            edits = conn.execute(
+                "SELECT seq, row_id, col, value FROM edits"
+                " WHERE uid = ? AND frame_version = ? AND seq > ? ORDER BY seq",
+                (uid, frame_version, applied_seq),
+            ).fetchall()
+        if edits:
+            apply_edits(data, ((row_id, col, decode_value(value)) for _, row_id, col, value in edits))
+            applied_seq = edits[-1][0]
+        return applied_seq
+
+    def _load(self, uid):
+        """Return (version, frame_version, applied_seq, data); the caller holds the user's lock."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT version, frame_version, data_version FROM sessions WHERE uid = ?", (uid,)
+            ).fetchone()
+        if row is None:
+            self._cache.pop(uid, None)
+            return 0, 0, 0, {}
+
+        version, frame_version, data_version = row
+        cached = self._cache.get(uid)
+        if cached is not None and cached[0] == version:
+            if not frame_version or cached[3].get("data_version") == data_version:
+                return cached
+            # Only cell edits happened since: replay them, the metadata is unchanged
+            data = cached[3]
+            applied_seq = self._replay(uid, frame_version, cached[2], data)
+            data["data_version"] = data_version
+            entry = (version, frame_version, applied_seq, data)
+            self._cache[uid] = entry
+            return entry
+
+        with self._connection() as conn:
+            meta = conn.execute("SELECT meta FROM session_meta WHERE uid = ?", (uid,)).fetchone()[0]
+        data = pickle.loads(meta)
+        applied_seq = 0
+        if frame_version:
+            # Unless the snapshot changed, keep the frame in memory and replay only newer edits
+            if cached is not None and cached[1] == frame_version and "df" in cached[3]:
+                df, queries, applied_seq = cached[3]["df"], cached[3].get("queries"), cached[2]
+            else:
+                df, queries = self._read_frame(uid, frame_version), self._read_queries(uid, frame_version)
+            data["df"] = df
+            if queries is not None:
+                data["queries"] = queries
+            applied_seq = self._replay(uid, frame_version, applied_seq, data)
+            if data_version:
+                data["data_version"] = data_version
+        entry = (version, frame_version, applied_seq, data)
+        self._cache[uid] = entry
+        return entry
+
+    def get(self, uid):
+        with self._locked(uid):
+            return self._load(uid)[3]
+
+    def _save(self, uid, version, frame_version, data, new_frame):
+        """Write the metadata row (and, if new_frame, snapshots of the frame and queries); caller holds the lock."""
+        snapshot_files = ()
+        if new_frame:
+            frame_version = 0
+            if data.get("df") is not None:
+                frame_version = version
+                snapshot_files = (self._write_frame(uid, frame_version, data["df"]),)
+                if data.get("queries") is not None:
+                    snapshot_files += (self._write_queries(uid, frame_version, data["queries"]),)
+
+        # The frame and the queries are only written with a snapshot; the edit log covers them in between
+        meta = pickle.dumps({k: v for k, v in data.items() if k not in ("df", "queries")},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (uid, version, frame_version, saved_at, edit_count, data_version)"
+                " VALUES (?, ?, ?, ?, 0, ?)",
+                (uid, version, frame_version, time.time(), data.get("data_version") or 0),
+            )
+            conn.execute("INSERT OR REPLACE INTO session_meta (uid, meta) VALUES (?, ?)", (uid, meta))
+            if new_frame:
+                # The snapshot already contains every logged edit
+                conn.execute("DELETE FROM edits WHERE uid = ?", (uid,))
+        if new_frame:
+            self._remove_frames(uid, keep=snapshot_files)
+        self._cache[uid] = (version, frame_version, 0, data)
+
+    def update(self, uid, new_data):
+        with self._locked(uid):
+            version, frame_version, applied_seq, current = self._load(uid)
+            data = dict(current)
+            data.update(new_data)
+            # Nanosecond versions never repeat, even for a user that was evicted and came back
+            version = max(time.time_ns(), version + 1)
+            new_frame = "df" in new_data or "queries" in new_data
+            self._save(uid, version, frame_version, data, new_frame=new_frame)
+            if not new_frame:
+                self._cache[uid] = (version, frame_version, applied_seq, data)
+
+        self._maybe_evict()
+
+    def apply_edits(self, uid, row_id, values):
+        """Log {column: value} for one row without rewriting the frame, and bump data_version."""
+        self.apply_cell_edits(uid, [(row_id, column, value) for column, value in values.items()])
+
+    def apply_cell_edits(self, uid, edits):
+        """Log (row, column, value) edits, possibly across many rows, in one transaction."""
+        if not edits:
+            return
+        with self._locked(uid):
+            version, frame_version, applied_seq, data = self._load(uid)
+            if data.get("df") is None:
+                return
+            for row_id, column, value in edits:
+                apply_edit(data, row_id, column, value)
+            # The metadata version stays; other workers see the new data_version and replay the log
+            data_version = max(time.time_ns(), (data.get("data_version") or 0) + 1)
+            data["data_version"] = data_version
+
+            with self._transaction() as conn:
+                for row_id, column, value in edits:
+                    applied_seq = conn.execute(
+                        "INSERT INTO edits (uid, frame_version, row_id, col, value) VALUES (?, ?, ?, ?, ?)",
+                        (uid, frame_version, row_id, column, encode_value(value)),
+                    ).lastrowid
+                conn.execute(
+                    "UPDATE sessions SET data_version = ?, saved_at = ?, edit_count = edit_count + ? WHERE uid = ?",
+                    (data_version, time.time(), len(edits), uid),
+                )
+                edit_count = conn.execute("SELECT edit_count FROM sessions WHERE uid = ?", (uid,)).fetchone()[0]
+            self._cache[uid] = (version, frame_version, applied_seq, data)
+
+            if edit_count >= SNAPSHOT_EDITS:
+                # Compact: fold the log into a fresh snapshot
+                self._save(uid, max(time.time_ns(), version + 1), frame_version, data, new_frame=True)
+
+    def _maybe_evict(self):
+        now = time.time()
+        if now - self._last_sweep < EVICTION_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+
+        with self._connection() as conn:
+            expired = []
+            if self.eviction in ("ttl_lru", "ttl"):
+                expired += [r[0] for r in conn.execute(
+                    "SELECT uid FROM sessions WHERE saved_at < ?", (now - self.ttl,)
+                )]
+            if self.eviction in ("ttl_lru", "lru"):
+                expired += [r[0] for r in conn.execute(
+                    "SELECT uid FROM sessions ORDER BY saved_at DESC LIMIT -1 OFFSET ?", (self.max_users,)
+                )]
+        for uid in set(expired):
+            self.delete(uid)
+        self._evictions += len(set(expired))
+
+    def stats(self):
+        """Users stored by all workers and users this worker has evicted."""
+        with self._connection() as conn:
+            users = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"users": users, "evictions": self._evictions}
+
+    def progress(self, uid):
+        """The user's progress record; updates are published to the other workers."""
+        record = self._progress.get(uid)
+        if record is None:
+            record = self._progress.setdefault(
+                uid, ProgressRecord(on_publish=lambda state: self._publish_progress(uid, state))
+            )
+        return record
+
+    def _publish_progress(self, uid, state):
+        now = time.monotonic()
+        # Ticks are throttled; the final state of a job is always written
+        if state["in_progress"] and now - self._published_at.get(uid, 0.0) < PROGRESS_PUBLISH_SECONDS:
+            return
+        self._published_at[uid] = now
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO progress (uid, state) VALUES (?, ?)", (uid, json.dumps(state))
+            )
+
+    def progress_snapshot(self, uid):
+        # A job running in this process is read directly; anything else comes from SQLite
+        record = self._progress.get(uid)
+        if record is not None and record.snapshot()["in_progress"]:
+            return record.snapshot()
+        with self._connection() as conn:
+            row = conn.execute("SELECT state FROM progress WHERE uid = ?", (uid,)).fetchone()
+        return json.loads(row[0]) if row is not None else IDLE_PROGRESS
+
+    def live_progress(self, uid):
+        """The record of a job running in this process, or None (it may run in another worker)."""
+        record = self._progress.get(uid)
+        return record if record is not None and record.snapshot()["in_progress"] else None
+
+    def delete(self, uid):
+        with self._locked(uid):
+            with self._connection() as conn:
+                conn.execute("DELETE FROM sessions WHERE uid = ?", (uid,))
+                conn.execute("DELETE FROM session_meta WHERE uid = ?", (uid,))
+                conn.execute("DELETE FROM progress WHERE uid = ?", (uid,))
+                conn.execute("DELETE FROM edits WHERE uid = ?", (uid,))
+            self._remove_frames(uid)
+            self._cache.pop(uid, None)
+            self._progress.pop(uid, None)
+            self._published_at.pop(uid, None)
+
+
+def create_store():
+    """Build the store selected by the SESSION_* environment variables."""
+    backend = os.environ.get("SESSION_BACKEND", "memory").strip().lower()
+    max_users = int(os.environ.get("SESSION_MAX_USERS", 100))
+    ttl = int(os.environ.get("SESSION_TTL", 14400))
+    eviction = os.environ.get("SESSION_EVICTION", "ttl_lru").strip().lower()
+    stripes = int(os.environ.get("SESSION_LOCK_STRIPES", 16))
+    if eviction not in EVICTION_POLICIES:
+        raise ValueError(f"SESSION_EVICTION must be one of {', '.join(EVICTION_POLICIES)}")
+
+    if backend == "memory":
+        return MemoryStore(max_users=max_users, ttl=ttl, eviction=eviction, stripes=stripes)
+    if backend == "disk":
+        root = os.environ.get("SESSION_DIR", DEFAULT_SESSION_DIR)
+        return DiskStore(root, max_users=max_users, ttl=ttl, eviction=eviction, stripes=stripes)
+    raise ValueError("SESSION_BACKEND must be 'memory' or 'disk'")
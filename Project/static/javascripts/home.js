@@ -1,8 +1,8 @@
 /*
   home.js
   Purpose: Behaviors specific to home.html
-  - Initialize DataTables for uploaded CSV
-  - Handle processing progress bar
+  - Initialize server-side DataTables for uploaded CSV
+  - Handle processing progress bar (pushed over /progress/stream, /progress polling as fallback)
 */
 
 onReady(function () {
@@ -10,7 +10,13 @@ onReady(function () {
     const tableEl = document.querySelector("#csvTableContainer table") || document.getElementById("csvTable");
     if (tableEl) {
         if (tableEl.parentElement && tableEl.parentElement.id === "csvTableContainer") {
+            // First page is server-rendered; the rest is paged (and title-filtered) by /data
             $(tableEl).DataTable({
+                serverSide: true,
+                processing: true,
+                ajax: '/data',
+                deferLoading: parseInt(tableEl.parentElement.dataset.totalRows, 10) || 0,
+                ordering: false,
                 pageLength: 5,
                 lengthMenu: [5, 10, 20, 50],
                 autoWidth: false
@@ -73,27 +79,40 @@ onReady(function () {
             if (etaText) etaText.textContent = '';
         }
 
+        // Apply one progress update; returns true once the job has finished or failed
+        function applyProgress(data) {
+            // Persist for cross-page navigation
+            localStorage.setItem('proc_in_progress', data.in_progress ? '1' : '');
+            localStorage.setItem('proc_percent', String(data.percent || 0));
+            localStorage.setItem('proc_eta', data.eta || '00:00:00');
+
+            targetProgress = data.percent || 0;
+            if (etaText) {
+                const etaVal = (data && data.eta && data.eta !== '00:00:00') ? data.eta : 'calculating...';
+                etaText.textContent = 'Estimated time remaining: ' + etaVal;
+            }
+            if (data.done) {
+                targetProgress = 100;
+                localStorage.setItem('proc_in_progress', '');
+                setTimeout(function () { window.location.href = '/results'; }, 500);
+                return true;
+            }
+            if (data.error) {
+                localStorage.setItem('proc_in_progress', '');
+                hideProgressUI();
+                return true;
+            }
+            return false;
+        }
+
         function pollProgress() {
             if (polling) return;
             polling = true;
             (function loop() {
                 $.get('/progress', function (data) {
-                    // Persist for cross-page navigation
-                    localStorage.setItem('proc_in_progress', data.in_progress ? '1' : '');
-                    localStorage.setItem('proc_percent', String(data.percent || 0));
-                    localStorage.setItem('proc_eta', data.eta || '00:00:00');
-
-                    targetProgress = data.percent || 0;
-                    if (etaText) {
-                        const etaVal = (data && data.eta && data.eta !== '00:00:00') ? data.eta : 'calculating...';
-                        etaText.textContent = 'Estimated time remaining: ' + etaVal;
-                    }
-                    if (!data.done) {
+                    if (!applyProgress(data)) {
                         setTimeout(loop, 500);
                     } else {
-                        targetProgress = 100;
-                        localStorage.setItem('proc_in_progress', '');
-                        setTimeout(function () { window.location.href = '/results'; }, 500);
                         polling = false;
                     }
                 }).fail(function() {
@@ -103,6 +122,29 @@ onReady(function () {
             })();
         }
 
+        // Progress pushed by the server; falls back to polling if the stream is unavailable
+        function watchProgress() {
+            if (polling) return;
+            if (!window.EventSource) {
+                pollProgress();
+                return;
+            }
+            polling = true;
+            const source = new EventSource('/progress/stream');
+            source.onmessage = function (event) {
+                const data = JSON.parse(event.data);
+                if (applyProgress(data) || !data.in_progress) {
+                    source.close();
+                    polling = false;
+                }
+            };
+            source.onerror = function () {
+                source.close();
+                polling = false;
+                pollProgress();
+            };
+        }
+
         generateBtn.addEventListener('click', function () {
             showProgressUI();
             $.post('/process', {}, function (resp) {
@@ -112,7 +154,7 @@ onReady(function () {
                     return;
                 }
                 if (resp && (resp.status === 'started' || resp.status === 'already_running')) {
-                    pollProgress();
+                    watchProgress();
                 } else {
                     hideProgressUI();
                 }
@@ -130,7 +172,7 @@ onReady(function () {
                     const etaVal = (data && data.eta && data.eta !== '00:00:00') ? data.eta : 'calculating...';
                     etaText.textContent = 'Estimated time remaining: ' + etaVal;
                 }
-                pollProgress();
+                watchProgress();
             } else {
                 hideProgressUI();
             }
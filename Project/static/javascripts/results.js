@@ -11,6 +11,28 @@
     function q(container, sel) { return (container || document).querySelector(sel); }
     function qa(container, sel) { return Array.from((container || document).querySelectorAll(sel)); }
 
+    // Row id of the selected episode (disambiguates duplicate titles)
+    function selectedRow() {
+        const dropdown = document.querySelector("select[name='title']");
+        const opt = dropdown && dropdown.options[dropdown.selectedIndex];
+        return opt && opt.dataset.row !== undefined ? opt.dataset.row : '';
+    }
+
+    // Whether query changes should also apply to the episode's duplicates
+    function propagateQueries() {
+        const box = document.getElementById('propagateQueries');
+        return !!(box && box.checked && !box.closest('.hidden'));
+    }
+
+    function renderDuplicates(duplicates) {
+        const info = document.getElementById('duplicatesInfo');
+        const text = document.getElementById('duplicatesText');
+        if (!info || !text) return;
+        const list = duplicates || [];
+        text.textContent = list.map(d => `#${d.row + 1} ${d.title} (${d.exact ? 'exact' : 'similar'})`).join(', ');
+        info.classList.toggle('hidden', list.length === 0);
+    }
+
     function addDisabledSectionTo(container) {
         if (!container) return;
         const s = q(container, '.suggestions');
@@ -108,7 +130,7 @@
         async function refreshEpisodeStatus(title) {
             if (!title) return;
             try {
-                const res = await fetch(`/get_episode_status?title=${encodeURIComponent(title)}`);
+                const res = await fetch(`/get_episode_status?title=${encodeURIComponent(title)}&row=${encodeURIComponent(selectedRow())}`);
                 if (!res.ok) return;
                 const data = await res.json();
                 const statusText = document.getElementById('episodeStatusText') || q(container, '#episodeStatusText');
@@ -118,6 +140,7 @@
                 const savedQueriesText = document.getElementById('savedQueriesText') || q(container, '#savedQueriesText');
                 if (queryCounterEl) queryCounterEl.textContent = data.saved_count || 0;
                 if (savedQueriesText) savedQueriesText.textContent = (data.saved_queries || []).join(', ');
+                renderDuplicates(data.duplicates);
                 // reflect saved queries on cards
                 const allCards = qa(container, '.cards .card');
                 const savedSet = new Set((data.saved_queries || []).map(s => s.toLowerCase()));
@@ -205,7 +228,7 @@
                 const res = await fetch('/mark_episode_analyzed', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ title: title, value: !currentAnalyzed })
+                    body: JSON.stringify({ title: title, row: selectedRow(), value: !currentAnalyzed })
                 });
 
                 if (!res.ok) {
@@ -367,7 +390,7 @@
                 try {
                     const res = await fetch('/mark_episode_analyzed', {
                         method: 'POST', headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ title: title, value: !currentAnalyzed })
+                        body: JSON.stringify({ title: title, row: selectedRow(), value: !currentAnalyzed })
                     });
                     const data = await res.json();
                     if (data && data.success !== false) {
@@ -416,7 +439,7 @@
                 try {
                     const res = await fetch('/add_query', {
                         method: 'POST', headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ title: title, query: word })
+                        body: JSON.stringify({ title: title, row: selectedRow(), query: word, propagate: propagateQueries() })
                     });
                     const data = await res.json();
                     if (data && data.success !== false) {
@@ -452,7 +475,7 @@
                 try {
                     const res = await fetch('/remove_query', {
                         method: 'POST', headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ title: title, query: word })
+                        body: JSON.stringify({ title: title, row: selectedRow(), query: word, propagate: propagateQueries() })
                     });
                     const data = await res.json();
                     if (data && data.success !== false) {
@@ -526,6 +549,44 @@
         const dropdown = document.querySelector("select[name='title']");
         const getSuggestionsBtn = document.querySelector("button[type='submit']");
 
+        // typeahead: replace the dropdown options with the episodes matching the typed text
+        const titleSearch = document.getElementById('titleSearch');
+        if (dropdown && titleSearch) {
+            let searchTimer = null, searchSeq = 0;
+            titleSearch.addEventListener('input', function () {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(async function () {
+                    const seq = ++searchSeq;
+                    try {
+                        const res = await fetch(`/titles/search?q=${encodeURIComponent(titleSearch.value)}&limit=50`);
+                        const data = await res.json();
+                        if (seq !== searchSeq || !data || data.success === false) return;
+                        const previous = dropdown.value + '\u0000' + selectedRow();
+                        dropdown.innerHTML = '';
+                        data.titles.forEach(function (t) {
+                            const opt = document.createElement('option');
+                            opt.value = t.title;
+                            opt.dataset.row = t.row;
+                            opt.textContent = `${t.row + 1}. ${t.title}` + (t.duplicate_group ? ` [duplicate group ${t.duplicate_group}]` : '');
+                            dropdown.appendChild(opt);
+                        });
+                        if (dropdown.value + '\u0000' + selectedRow() !== previous) {
+                            dropdown.dispatchEvent(new Event('change'));
+                        }
+                    } catch (err) {
+                        console.error('title search failed', err);
+                    }
+                }, 200);
+            });
+        }
+
+        // keep the hidden row field in sync for plain form submits
+        const rowInput = document.querySelector("input[name='row']");
+        if (dropdown && rowInput) {
+            rowInput.value = selectedRow();
+            dropdown.addEventListener('change', function () { rowInput.value = selectedRow(); });
+        }
+
         if (!container) {
             return;
         }
@@ -559,6 +620,7 @@
                 try {
                     const fd = new FormData();
                     fd.append('title', dropdown ? dropdown.value : '');
+                    fd.append('row', selectedRow());
                     const res = await fetch('/get_suggestions', { method: 'POST', body: fd });
                     const data = await res.json();
                     if (!data || data.success === false) {
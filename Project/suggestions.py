@@ -0,0 +1,89 @@
+"""Per-episode suggestion bundles and the cache that keeps them.
+
+A bundle holds everything the suggestions partial needs for one episode:
+the four n-gram lists, the red/yellow/new status of each gram and the
+keyword planner strings. Bundles are cached per (upload id, row) and are
+only reused while the row's `Important Words` value and the keyword index
+generation are unchanged.
+"""
+from helper import generate_ngrams, generate_podcast_strings_for_keywordplanner
+from keyword_index import RED, current_index
+from lru_cache import LRUCache
+
+
+def build_suggestion_bundle(important_words, index=None, ranked=None):
+    """Compute n-grams, their classification and planner strings for one episode.
+
+    ranked is the episode's (one_word, two_word) from the corpus ranking; without it
+    the grams follow the order of the Important Words.
+    """
+    index = index or current_index()
+    if ranked is not None:
+        one_word, two_word = ranked
+    else:
+        words = (important_words or "").split()
+        one_word = generate_ngrams(words, n=1)
+        two_word = generate_ngrams(words, n=2)
+    one_word_podcasts = [f"{gram} podcasts" for gram in one_word]
+    two_word_podcasts = [f"{gram} podcasts" for gram in two_word]
+
+    # "<gram> podcasts" cards share the status of their base gram, in the same order
+    one_word_status = index.classify_many(one_word, 1)
+    two_word_status = index.classify_many(two_word, 2)
+    one_word_text, two_word_text = generate_podcast_strings_for_keywordplanner(
+        one_word,
+        two_word,
+        red_one_word=frozenset(g for g, status in zip(one_word, one_word_status) if status == RED),
+        red_two_word=frozenset(g for g, status in zip(two_word, two_word_status) if status == RED),
+    )
+
+    return {
+        "one_word": one_word,
+        "two_word": two_word,
+        "one_word_podcasts": one_word_podcasts,
+        "two_word_podcasts": two_word_podcasts,
+        "one_word_status": one_word_status,
+        "two_word_status": two_word_status,
+        "one_word_podcast_text": one_word_text,
+        "two_word_podcast_text": two_word_text,
+    }
+
+
+class SuggestionCache:
+    """LRU of suggestion bundles keyed by (upload id, row)."""
+
+    def __init__(self, maxsize=500):
+        self._lru = LRUCache(maxsize)
+
+    def get(self, upload_id, row, important_words, generation=None):
+        """Return the cached bundle, or None if missing or built from other words or keyword lists."""
+        entry = self._lru.get((upload_id, row))
+        if entry is None or entry[0] != important_words:
+            return None
+        if generation is not None and entry[1] != generation:
+            return None
+        return entry[2]
+
+    def put(self, upload_id, row, important_words, bundle, generation=None):
+        self._lru.put((upload_id, row), (important_words, generation, bundle))
+
+    def get_or_build(self, upload_id, row, important_words, ranked=None):
+        index = current_index()
+        bundle = self.get(upload_id, row, important_words, index.generation)
+        if bundle is None:
+            bundle = build_suggestion_bundle(important_words, index, ranked)
+            self.put(upload_id, row, important_words, bundle, index.generation)
+        return bundle
+
+    def invalidate(self, upload_id, row=None):
+        """Drop one row's bundle, or every bundle of an upload when row is None."""
+        if row is not None:
+            self._lru.pop((upload_id, row))
+        else:
+            self._lru.pop_where(lambda key: key[0] == upload_id)
+
+    def stats(self):
+        return self._lru.stats()
+
+    def __len__(self):
+        return len(self._lru)
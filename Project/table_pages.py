@@ -0,0 +1,92 @@
+"""Server-side pages of the uploaded episode table.
+
+The home page only renders the first page; everything else is fetched
+from /data in pages. Pages are cached per (upload id, data version), so a
+page is rebuilt only after the table was edited.
+"""
+import json
+import os
+
+import numpy as np
+
+from lru_cache import LRUCache
+
+
+PREVIEW_ROWS = 5          # rows rendered into home.html (matches the DataTable page length)
+MAX_PAGE_ROWS = 500
+
+page_cache = LRUCache(maxsize=int(os.environ.get("TABLE_PAGE_CACHE_SIZE", 256)))
+
+
+def _filtered_positions(df, upload_id, title_filter):
+    """Positional rows whose title contains title_filter (case-insensitive)."""
+    key = ("filter", upload_id, title_filter)
+    positions = page_cache.get(key)
+    if positions is None:
+        mask = df["Title"].astype(str).str.contains(title_filter, case=False, regex=False)
+        positions = mask.to_numpy().nonzero()[0]
+        page_cache.put(key, positions)
+    return positions
+
+
+def table_page(df, upload_id, version, offset=0, limit=PREVIEW_ROWS, columns=None, title_filter=None, queries=None):
+    """Return one JSON-ready page of the table.
+
+    columns restricts the output to a subset (unknown names are ignored) and
+    title_filter keeps rows whose title contains the text. With the upload's
+    QueryTable, the page shows its query columns too.
+    """
+    offset = max(0, int(offset))
+    limit = int(limit)
+    limit = MAX_PAGE_ROWS if limit <= 0 else min(limit, MAX_PAGE_ROWS)
+    all_columns = queries.column_names(df.columns) if queries is not None else list(df.columns)
+    columns = tuple(c for c in columns if c in all_columns) if columns else tuple(all_columns)
+    title_filter = (title_filter or "").strip()
+
+    key = ("page", upload_id, version, offset, limit, columns, title_filter)
+    page = page_cache.get(key)
+    if page is not None:
+        return page
+
+    if title_filter:
+        positions = _filtered_positions(df, upload_id, title_filter)
+        filtered = len(positions)
+        rows = positions[offset:offset + limit]
+    else:
+        filtered = len(df)
+        rows = np.arange(offset, min(offset + limit, len(df)))
+    frame = df.iloc[rows]
+    if queries is not None:
+        frame = queries.materialize(frame, rows)
+    frame = frame.loc[:, list(columns)]
+
+    page = {
+        "columns": [{"title": c, "data": i} for i, c in enumerate(columns)],
+        "offset": offset,
+        "limit": limit,
+        "recordsTotal": int(len(df)),
+        "recordsFiltered": int(filtered),
+        # to_json takes care of NaN, numpy scalars and categories
+        "data": json.loads(frame.to_json(orient="values")),
+    }
+    page_cache.put(key, page)
+    return page
+
+
+def preview_html(df, upload_id, version, queries=None):
+    """HTML of the first page, used by home.html before the DataTable takes over."""
+    key = ("preview", upload_id, version)
+    html = page_cache.get(key)
+    if html is None:
+        frame = df.head(PREVIEW_ROWS)
+        if queries is not None:
+            frame = queries.materialize(frame, range(len(frame)))
+        html = frame.to_html(
+            classes="table table-striped display full-width", index=False, table_id="csvTable"
+        )
+        page_cache.put(key, html)
+    return html
+
+
+def forget_upload(upload_id):
+    page_cache.pop_where(lambda key: key[1] == upload_id)
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Modules import from the Project directory, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep session data, job and keyword-cache databases out of the working tree
+os.environ.setdefault("SESSION_DIR", tempfile.mkdtemp(prefix="qg-tests-"))
@@ -0,0 +1,32 @@
+from dedupe import exact_duplicate_ids, find_duplicates
+
+
+def test_blank_descriptions_are_not_duplicates():
+    descriptions = ["Cooking pasta at home", "", "", "https://example.com/ep/1 🎙️"]
+    groups = find_duplicates(descriptions)
+
+    assert groups.labels() == {}
+    assert groups.rows(1) == [1]
+    assert groups.rows(2) == [2]
+    assert len(set(exact_duplicate_ids(descriptions).tolist())) == 4
+
+
+def test_identical_descriptions_are_grouped():
+    groups = find_duplicates(["Cooking pasta at home", "", "Cooking   pasta at HOME"])
+
+    assert groups.rows(0) == [0, 2]
+    assert groups.is_exact(0, 2)
+    assert groups.rows(1) == [1]
+
+
+def test_query_is_not_propagated_between_blank_episodes():
+    import io
+    from app import app
+
+    client = app.test_client()
+    csv = b"Title,Description\nFirst episode,Cooking pasta\nSecond episode,\nThird episode,\n"
+    client.post("/", data={"file": (io.BytesIO(csv), "episodes.csv")}, content_type="multipart/form-data")
+
+    response = client.post("/add_query", json={"title": "Second episode", "query": "pasta", "propagate": True})
+
+    assert response.json["updated_rows"] == [1]
@@ -0,0 +1,112 @@
+import pickle
+import random
+
+import pandas as pd
+import pytest
+
+import session_store
+from episode_search import EpisodeIndex, SearchQueryError
+from mutation_log import apply_edit
+from session_store import DiskStore
+
+
+VOCAB = ["cooking", "italian", "pasta", "recipes", "bread", "wine", "travel", "rome", "chef", "home"]
+
+
+def random_words(rng):
+    return " ".join(rng.choices(VOCAB, k=rng.randint(0, 7)))
+
+
+def random_query(rng):
+    clauses = []
+    for _ in range(rng.randint(1, 3)):
+        phrases = [" ".join(rng.choices(VOCAB, k=rng.randint(1, 3))) for _ in range(rng.randint(1, 3))]
+        clauses.append(" AND ".join(phrases))
+    return " OR ".join(clauses)
+
+
+def brute_force(important_words, query):
+    """Rows matching query by scanning every row's words."""
+    def has_phrase(words, phrase):
+        n = len(phrase)
+        if n <= 2:
+            return any(words[i:i + n] == phrase for i in range(len(words) - n + 1))
+        # A longer phrase needs each of its adjacent pairs somewhere in the row
+        return all(has_phrase(words, [a, b]) for a, b in zip(phrase, phrase[1:]))
+
+    rows = []
+    for row, text in enumerate(important_words):
+        words = text.split() if isinstance(text, str) else []
+        if any(all(has_phrase(words, phrase.lower().split()) for phrase in clause.split(" AND "))
+               for clause in query.split(" OR ")):
+            rows.append(row)
+    return rows
+
+
+def test_build_matches_unigrams_bigrams_and_operators():
+    index = EpisodeIndex.build(["cooking italian pasta", None, "pasta recipes", "", "italian cooking"])
+
+    assert index.search("pasta").tolist() == [0, 2]
+    assert index.search("cooking italian").tolist() == [0]
+    assert index.search("cooking italian pasta").tolist() == [0]
+    assert index.search("italian AND cooking OR recipes").tolist() == [0, 2, 4]
+    assert index.search("pasta cooking").tolist() == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_search_matches_a_brute_force_scan(seed):
+    rng = random.Random(seed)
+    important_words = [random_words(rng) for _ in range(200)] + [None, ""]
+    index = EpisodeIndex.build(important_words)
+
+    for _ in range(50):
+        query = random_query(rng)
+        assert index.search(query).tolist() == brute_force(important_words, query), query
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_search_after_edits_matches_a_brute_force_scan(seed):
+    rng = random.Random(seed)
+    important_words = [random_words(rng) for _ in range(100)]
+    data = {"df": pd.DataFrame({"Important Words": important_words}), "episode_index": EpisodeIndex.build(important_words)}
+
+    for _ in range(60):
+        row, words = rng.randrange(100), random_words(rng)
+        apply_edit(data, row, "Important Words", words)
+        important_words[row] = words
+    for _ in range(50):
+        query = random_query(rng)
+        assert data["episode_index"].search(query).tolist() == brute_force(important_words, query), query
+
+
+def test_unbuilt_index_fills_in_from_edits():
+    data = {"df": pd.DataFrame({"Important Words": [None] * 3}), "episode_index": EpisodeIndex(3)}
+
+    apply_edit(data, 2, "Important Words", "cooking pasta")
+    apply_edit(data, 0, "Important Words", "pasta recipes")
+
+    assert data["episode_index"].search("pasta").tolist() == [0, 2]
+    assert data["episode_index"].search("cooking pasta OR recipes").tolist() == [0, 2]
+
+
+@pytest.mark.parametrize("query", ["", "   ", "AND pasta", "pasta OR", "pasta AND AND bread"])
+def test_malformed_queries_are_rejected(query):
+    with pytest.raises(SearchQueryError):
+        EpisodeIndex.build(["pasta bread"]).search(query)
+
+
+def test_important_words_edits_reindex_through_the_log(tmp_path, monkeypatch):
+    worker_a = DiskStore(str(tmp_path))
+    worker_b = DiskStore(str(tmp_path))
+    df = pd.DataFrame({"Title": ["a", "b", "c"], "Important Words": [""] * 3})
+    worker_a.update("u1", {"df": df, "episode_index": EpisodeIndex(len(df))})
+    worker_b.get("u1")
+
+    dumps = []
+    real_dumps = pickle.dumps
+    monkeypatch.setattr(session_store.pickle, "dumps", lambda *a, **k: dumps.append(1) or real_dumps(*a, **k))
+    worker_a.apply_edits("u1", 1, {"Important Words": "pasta recipes"})
+
+    assert dumps == []
+    assert worker_a.get("u1")["episode_index"].search("pasta recipes").tolist() == [1]
+    assert worker_b.get("u1")["episode_index"].search("pasta recipes").tolist() == [1]
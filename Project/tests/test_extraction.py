@@ -0,0 +1,24 @@
+import extraction
+from extraction import start_early_extraction, take_early_extraction
+
+
+def test_early_batches_are_capped_per_worker(monkeypatch):
+    monkeypatch.setattr(extraction, "EARLY_EXTRACTION_MAX_UPLOADS", 2)
+    for upload_id in ("up1", "up2", "up3"):
+        start_early_extraction(upload_id, 0, ["Cooking pasta at home"])
+    start_early_extraction("up3", 1, ["Baking bread"])
+
+    assert take_early_extraction("up1") is None
+    assert [(start, end) for start, end, _ in take_early_extraction("up2")] == [(0, 1)]
+    batches = take_early_extraction("up3")
+    assert [(start, end) for start, end, _ in batches] == [(0, 1), (1, 2)]
+    assert batches[0][2].result() == ["cooking pasta home"]
+
+
+def test_early_batches_expire_with_the_session(monkeypatch):
+    start_early_extraction("old", 0, ["Cooking pasta at home"])
+    monkeypatch.setattr(extraction, "EARLY_EXTRACTION_TTL", -1)
+    start_early_extraction("new", 0, ["Baking bread"])
+
+    assert take_early_extraction("old") is None
+    assert take_early_extraction("new") is not None
@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.synthetic import make_descriptions
+from helper import clean_text, clean_texts_bulk, important_words_bulk, important_words_from_texts
+
+
+EDGE_CASES = [
+    "",
+    "   ",
+    None,
+    float("nan"),
+    12345,
+    "Cooking Pasta at HOME with the chef, pasta again!",
+    "Listen at https://example.com/ep?id=1&x=2 or www.example.org/path today",
+    "Mail host@example.com for questions; http://a.b www.c",
+    "<p>Hello <b>bold</b> world</p><br/>tags <unclosed and more",
+    "Emoji 🎙️ time — café déjà vu 😀😀 naïve",
+    "tabs\tand\nnew\r\nlines\x0bvertical\x0cfeed",
+    "a b c d I x y",
+    "https://only.example.com",
+    "🎙️🎧",
+    "repeat repeat Repeat REPEAT words words",
+    "under_score snake_case 123 4th 2024-01-02",
+]
+
+
+def descriptions():
+    return EDGE_CASES + make_descriptions(300, words_per_description=60, url_share=0.3, emoji_share=0.3,
+                                          html_share=0.3, seed=7)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 20000])
+def test_bulk_important_words_match_row_by_row(chunk_size):
+    texts = descriptions()
+
+    assert important_words_bulk(texts, chunk_size=chunk_size) == important_words_from_texts(texts)
+
+
+def test_bulk_important_words_respect_max_words():
+    texts = descriptions()
+
+    assert important_words_bulk(texts, max_words=5) == important_words_from_texts(texts, max_words=5)
+
+
+def test_nul_characters_fall_back_to_row_by_row():
+    texts = ["first\x00second episode", "plain text here"]
+
+    assert important_words_bulk(texts) == important_words_from_texts(texts)
+
+
+def test_bulk_cleaning_matches_clean_text():
+    texts = descriptions()
+
+    assert clean_texts_bulk(texts, chunk_size=7) == [clean_text(t).lower().encode("ascii") for t in texts]
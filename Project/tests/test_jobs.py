@@ -0,0 +1,170 @@
+import os
+import subprocess
+import sys
+import time
+
+import io
+
+import pytest
+
+from jobs import WORKER_GONE, JobCancelled, JobQueue
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+CSV = b"Title,Description\n" + b"".join(
+    f"Episode {i},Cooking pasta and baking bread number {i}\n".encode() for i in range(4)
+)
+
+
+def status(queue, job_id):
+    with queue._connection() as conn:
+        return dict(conn.execute("SELECT status, owner, error FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def test_pinned_job_is_only_claimed_by_the_worker_that_queued_it(db):
+    serving = JobQueue(db, pin_jobs=True)
+    other = JobQueue(db, pin_jobs=True)
+    job_id = serving.submit("u1", "up1", 10)
+
+    assert other._claim() is None
+    assert serving._claim()["id"] == job_id
+    assert status(serving, job_id)["owner"] == serving.owner
+
+
+def test_pinned_job_fails_when_its_worker_stops_heartbeating(db):
+    gone = JobQueue(db, pin_jobs=True)
+    job_id = gone.submit("u1", "up1", 10)
+    other = JobQueue(db, pin_jobs=True, stale_seconds=0)
+
+    time.sleep(0.01)
+    other._requeue_stale()
+
+    assert status(other, job_id) == {"status": "failed", "owner": None, "error": WORKER_GONE}
+    assert other.active_job("u1") is None
+
+
+def test_importing_the_app_does_not_start_the_dispatcher(tmp_path):
+    env = dict(os.environ, SESSION_DIR=str(tmp_path), JOB_DB=str(tmp_path / "jobs.sqlite3"))
+    out = subprocess.run(
+        [sys.executable, "-c", "import app; print(app.job_queue.started)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    assert out.strip().splitlines()[-1] == "False"
+
+
+def test_claim_takes_queued_jobs_oldest_first(db):
+    queue = JobQueue(db)
+    first = queue.submit("u1", "up1", 10)
+    second = queue.submit("u2", "up2", 10)
+
+    assert queue._claim()["id"] == first
+    assert queue._claim()["id"] == second
+    assert queue._claim() is None
+    assert status(queue, first) == {"status": "running", "owner": queue.owner, "error": None}
+
+
+def test_heartbeat_keeps_a_running_job_and_a_stale_one_is_requeued(db):
+    worker = JobQueue(db)
+    job_id = worker.submit("u1", "up1", 10)
+    worker._claim()
+    worker._running.add(job_id)
+    with worker._connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+
+    worker._heartbeat()
+    JobQueue(db, stale_seconds=60)._requeue_stale()
+    assert status(worker, job_id)["status"] == "running"
+
+    with worker._connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+    other = JobQueue(db, stale_seconds=60)
+    other._requeue_stale()
+    assert status(other, job_id) == {"status": "queued", "owner": None, "error": None}
+
+    assert other._claim()["id"] == job_id
+    with pytest.raises(JobCancelled):
+        worker.save_checkpoint(job_id, 0, 1, ["words"])
+
+
+@pytest.fixture
+def uploaded(db, monkeypatch):
+    """(app module, idle queue, client, uid) after a 4-row upload; the queue's dispatcher never runs."""
+    import app as app_module
+
+    client = app_module.app.test_client()
+    queue = JobQueue(db)
+    monkeypatch.setattr(queue, "start", lambda handler: None)
+    queue._handler = app_module.run_extraction_job
+    monkeypatch.setattr(app_module, "job_queue", queue)
+    client.post("/", data={"file": (io.BytesIO(CSV), "episodes.csv")}, content_type="multipart/form-data")
+    with client.session_transaction() as sess:
+        uid = sess["user_id"]
+    return app_module, queue, client, uid
+
+
+def test_resumed_job_keeps_checkpointed_rows(uploaded):
+    app_module, queue, _, uid = uploaded
+    job_id = queue.submit(uid, app_module.user_store.get(uid)["upload_id"], 4)
+    job = queue._claim()
+    queue.save_checkpoint(job_id, 0, 2, ["from checkpoint", "from checkpoint"])
+
+    queue._run(job)
+
+    words = app_module.user_store.get(uid)["df"]["Important Words"].tolist()
+    assert words[:2] == ["from checkpoint", "from checkpoint"]
+    assert all("pasta" in w for w in words[2:])
+    assert status(queue, job_id)["status"] == "done"
+    assert queue.checkpoints(job_id) == []
+
+
+def test_reupload_cancels_the_running_job(uploaded):
+    app_module, queue, client, uid = uploaded
+    job_id = queue.submit(uid, app_module.user_store.get(uid)["upload_id"], 4)
+    job = queue._claim()
+    queue.save_checkpoint(job_id, 0, 2, ["from checkpoint", "from checkpoint"])
+
+    client.post("/", data={"file": (io.BytesIO(CSV), "episodes.csv")}, content_type="multipart/form-data")
+    assert status(queue, job_id)["status"] == "cancelled"
+    assert queue.checkpoints(job_id) == []
+
+    queue._run(job)
+    assert status(queue, job_id)["status"] == "cancelled"
+    assert "Important Words" not in app_module.user_store.get(uid)["df"].columns
+
+
+def test_job_without_data_fails_and_clears_progress(uploaded):
+    app_module, queue, _, _ = uploaded
+    app_module.user_store.progress("nobody").reset(in_progress=True, started_at=time.time())
+    job_id = queue.submit("nobody", None, 0)
+
+    queue._run(queue._claim())
+
+    state = app_module.user_store.progress_snapshot("nobody")
+    assert status(queue, job_id) == {"status": "failed", "owner": queue.owner, "error": "No data available"}
+    assert state["in_progress"] is False
+    assert state["error"] == "No data available"
+
+
+def test_job_reports_done_before_ranking_keywords(uploaded, monkeypatch):
+    app_module, queue, _, uid = uploaded
+    seen = {}
+    original = app_module.rank_keywords
+
+    def rank_keywords(texts):
+        data = app_module.user_store.get(uid)
+        seen["done"] = app_module.user_store.progress_snapshot(uid)["done"]
+        seen["words"] = data["df"]["Important Words"].tolist()
+        return original(texts)
+
+    monkeypatch.setattr(app_module, "rank_keywords", rank_keywords)
+    queue.submit(uid, app_module.user_store.get(uid)["upload_id"], 4)
+    queue._run(queue._claim())
+
+    assert seen["done"] is True
+    assert all("pasta" in w for w in seen["words"])
+    assert app_module.user_store.get(uid)["keyword_ranking"] is not None
@@ -0,0 +1,49 @@
+import sqlite3
+
+from keyword_cache import KeywordCache
+
+
+def table_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_entry_count_follows_upserts_and_eviction(tmp_path):
+    path = str(tmp_path / "keywords.sqlite3")
+    cache = KeywordCache(path, max_entries=100)
+
+    cache.put_many([f"text {i}" for i in range(80)], ["words"] * 80)
+    cache.put_many([f"text {i}" for i in range(50)], ["other words"] * 50)
+    assert cache.stats()["size"] == table_count(path) == 80
+
+    cache.put_many([f"text {i}" for i in range(50, 130)], ["words"] * 80)
+    assert cache.stats()["size"] == table_count(path) == 90
+    assert cache.stats()["evictions"] == 40
+    assert cache.get_many(["text 129"]) == ["words"]
+
+
+def test_existing_cache_file_is_counted(tmp_path):
+    path = str(tmp_path / "keywords.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE keywords (key BLOB PRIMARY KEY, words TEXT NOT NULL, used_at REAL NOT NULL) WITHOUT ROWID")
+    conn.executemany("INSERT INTO keywords VALUES (?, 'w', 0)", [(bytes([i]),) for i in range(7)])
+    conn.commit()
+    conn.close()
+
+    cache = KeywordCache(path, max_entries=100)
+    assert cache.stats()["size"] == 7
+    cache.put_many(["new"], ["words"])
+    assert cache.stats()["size"] == 8
+
+
+def test_count_is_shared_by_connections_to_one_file(tmp_path):
+    path = str(tmp_path / "keywords.sqlite3")
+    first, second = KeywordCache(path), KeywordCache(path)
+
+    first.put_many(["a", "b"], ["words", "words"])
+    second.put_many(["b", "c"], ["words", "words"])
+
+    assert first.stats()["size"] == second.stats()["size"] == table_count(path) == 3
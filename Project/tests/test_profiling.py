@@ -0,0 +1,34 @@
+import pytest
+
+import app as app_module
+import profiling
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return app_module.app.test_client()
+
+
+def test_profiles_rejects_a_non_integer_limit(client):
+    response = client.get("/profiles?limit=abc", headers={"X-Profile": "secret"})
+
+    assert response.status_code == 400
+    assert response.json["success"] is False
+
+
+def test_request_profile_is_saved_when_the_view_raises(client, monkeypatch):
+    def fail(limit):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(app_module, "list_profiles", fail)
+    # Propagated exceptions skip after_request, as in debug mode
+    monkeypatch.setattr(app_module.app, "testing", True)
+
+    with pytest.raises(RuntimeError):
+        client.get("/profiles", headers={"X-Profile": "secret"})
+
+    (summary,) = profiling.list_profiles()
+    assert summary["target"] == "GET /profiles"
+    assert summary["status"] == 500
+    assert "boom" in summary["error"]
@@ -0,0 +1,54 @@
+import pickle
+
+import pandas as pd
+
+from query_table import QueryTable
+
+
+def upload():
+    return pd.DataFrame({
+        "Title": ["a", "b", "c", "d"],
+        "No of Queries": [3, 5, None, 0],
+        "Added Queries": ["", "x, y", None, ""],
+    })
+
+
+def test_uploaded_count_is_kept_when_no_queries_are_listed():
+    df, table = QueryTable.from_frame(upload())
+
+    assert list(df.columns) == ["Title"]
+    assert table.counts().tolist() == [3, 2, 0, 0]
+    assert table.materialize(df)["No of Queries"].tolist() == [3, 2, 0, 0]
+
+
+def test_added_queries_count_on_top_of_an_uploaded_count():
+    _, table = QueryTable.from_frame(upload())
+
+    table.add(0, "new query")
+    assert table.count(0) == 4
+    table.remove(0, "new query")
+    assert table.count(0) == 3
+
+
+def test_count_survives_a_pickle_round_trip():
+    _, table = QueryTable.from_frame(upload())
+
+    assert pickle.loads(pickle.dumps(table)).counts().tolist() == [3, 2, 0, 0]
+
+
+def test_routes_show_the_same_count_as_the_download():
+    import io
+    from app import app
+
+    client = app.test_client()
+    csv = (b"Title,Description,Important Words,No of Queries,Added Queries\n"
+           b"First,Cooking pasta,cooking pasta,3,\nSecond,Baking bread,baking bread,0,\n")
+    client.post("/", data={"file": (io.BytesIO(csv), "episodes.csv")}, content_type="multipart/form-data")
+
+    assert client.post("/add_query", json={"title": "First", "query": "pasta"}).json["saved_count"] == 4
+    assert client.get("/get_episode_status?title=First").json["saved_count"] == 4
+    downloaded = pd.read_csv(io.BytesIO(client.get("/download").get_data()))
+    assert downloaded["No of Queries"].tolist() == [4, 0]
+    assert b'<span id="queryCounter">4</span>' in client.post("/results", data={"title": "First"}).get_data()
+
+    assert client.post("/remove_query", json={"title": "First", "query": "pasta"}).json["saved_count"] == 3
@@ -0,0 +1,93 @@
+import gc
+import pickle
+import sqlite3
+import time
+
+import pandas as pd
+
+from metrics import LOCK_WAIT_SECONDS
+import session_store
+from session_store import DiskStore, MemoryStore
+
+
+def upload(store, uid="u1", rows=10):
+    df = pd.DataFrame({"Title": [f"Episode {i}" for i in range(rows)], "Analyzed": [False] * rows})
+    store.update(uid, {"df": df, "upload_id": "up", "data_version": 1, "big": list(range(1000))})
+
+
+def test_disk_edits_replay_on_other_worker_without_reloading_meta(tmp_path, monkeypatch):
+    worker_a = DiskStore(str(tmp_path))
+    worker_b = DiskStore(str(tmp_path))
+    upload(worker_a)
+    assert worker_b.get("u1")["df"]["Analyzed"].sum() == 0
+
+    loads = []
+    real_loads = pickle.loads
+    monkeypatch.setattr(session_store.pickle, "loads", lambda data: loads.append(len(data)) or real_loads(data))
+
+    worker_a.apply_edits("u1", 3, {"Analyzed": True})
+    data = worker_b.get("u1")
+
+    assert bool(data["df"]["Analyzed"].iat[3])
+    assert data["data_version"] == worker_a.get("u1")["data_version"]
+    assert loads == []
+
+
+def test_disk_meta_changes_still_reach_other_worker(tmp_path):
+    worker_a = DiskStore(str(tmp_path))
+    worker_b = DiskStore(str(tmp_path))
+    upload(worker_a)
+    worker_b.get("u1")
+
+    worker_a.apply_edits("u1", 1, {"Analyzed": True})
+    worker_a.update("u1", {"upload_id": "other"})
+    data = worker_b.get("u1")
+
+    assert data["upload_id"] == "other"
+    assert bool(data["df"]["Analyzed"].iat[1])
+
+
+def test_disk_store_moves_meta_out_of_an_old_sessions_table(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "sessions.sqlite3"))
+    conn.execute(
+        "CREATE TABLE sessions (uid TEXT PRIMARY KEY, version INTEGER NOT NULL, frame_version INTEGER NOT NULL,"
+        " saved_at REAL NOT NULL, edit_count INTEGER NOT NULL DEFAULT 0, meta BLOB NOT NULL)"
+    )
+    conn.execute("INSERT INTO sessions VALUES ('u1', 5, 0, ?, 0, ?)", (time.time(), pickle.dumps({"upload_id": "old"})))
+    conn.commit()
+    conn.close()
+
+    store = DiskStore(str(tmp_path))
+
+    assert store.get("u1")["upload_id"] == "old"
+    store.update("u1", {"upload_id": "new"})
+    assert DiskStore(str(tmp_path)).get("u1")["upload_id"] == "new"
+
+
+def test_memory_store_keeps_max_users_whatever_their_stripes():
+    store = MemoryStore(max_users=100, stripes=16)
+    for i in range(100):
+        store.update(f"user-{i}", {"upload_id": i})
+
+    assert store.stats() == {"users": 100, "evictions": 0}
+    assert all(store.get(f"user-{i}")["upload_id"] == i for i in range(100))
+
+    store.update("user-100", {"upload_id": 100})
+    assert store.stats() == {"users": 100, "evictions": 1}
+
+
+def lock_wait_count():
+    line = next(l for l in LOCK_WAIT_SECONDS.render() if l.startswith("qg_session_lock_wait_seconds_count"))
+    return int(line.split()[-1])
+
+
+def test_lock_waits_are_summed_across_stripes_and_dropped_stores():
+    before = lock_wait_count()
+    store = MemoryStore(max_users=10, stripes=4)
+    for i in range(8):
+        store.update(f"user{i}", {"n": i})
+    assert lock_wait_count() == before + 8
+
+    del store
+    gc.collect()
+    assert lock_wait_count() == before + 8
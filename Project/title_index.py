@@ -0,0 +1,127 @@
+"""Title -> positional row lookup for an uploaded episode DataFrame.
+
+Built once per upload so routes resolve an episode with a dict lookup
+instead of scanning the `Title` column. Episodes that share a title are
+tracked explicitly: resolving such a title requires the row as well.
+
+TitleSearch serves the results page's typeahead: the words of all titles
+are kept in a sorted array with a posting list of rows per word, so each
+typed word is a binary search for the range of words it prefixes.
+"""
+import bisect
+import re
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class DuplicateTitleError(LookupError):
+    """Raised when a title matches several episodes and no row was given."""
+
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = list(rows)
+        super().__init__(
+            f'Title "{title}" matches {len(self.rows)} episodes '
+            f'(#{", #".join(str(r + 1) for r in self.rows)}); select the episode by row'
+        )
+
+
+class TitleIndex:
+    """Maps each title to the positional rows that carry it."""
+
+    def __init__(self, titles):
+        self._rows = {}
+        for pos, title in enumerate(titles):
+            self._rows.setdefault(title, []).append(pos)
+
+    def __contains__(self, title):
+        return title in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def rows(self, title):
+        """All positional rows for a title (empty list if unknown)."""
+        return list(self._rows.get(title, ()))
+
+    @property
+    def duplicates(self):
+        """Titles used by more than one episode, with their rows."""
+        return {t: list(r) for t, r in self._rows.items() if len(r) > 1}
+
+    def resolve(self, title, row=None):
+        """Return the positional row for a title, or None if it doesn't exist.
+
+        `row` picks one episode among duplicates and must belong to the title.
+        A duplicated title without `row` raises DuplicateTitleError.
+        """
+        rows = self._rows.get(title)
+        if not rows:
+            return None
+        if row is not None:
+            return row if row in rows else None
+        if len(rows) > 1:
+            raise DuplicateTitleError(title, rows)
+        return rows[0]
+
+
+class TitleSearch:
+    """Word-prefix search over the titles of an upload."""
+
+    def __init__(self, titles):
+        self.n_rows = len(titles)
+        words, rows = [], []
+        for row, title in enumerate(titles):
+            for word in set(_WORD_RE.findall(str(title).lower())):
+                words.append(word)
+                rows.append(row)
+        vocab, codes = np.unique(np.asarray(words, dtype=object), return_inverse=True) if words else ([], [])
+        self._vocab = list(vocab)     # sorted distinct words
+        order = np.argsort(codes, kind="stable")
+        self._rows = np.asarray(rows, dtype=np.int64)[order]
+        self._offsets = np.zeros(len(self._vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(np.asarray(codes, dtype=np.int64), minlength=len(self._vocab)), out=self._offsets[1:])
+
+    def _prefix_rows(self, prefix):
+        """Sorted rows with a title word starting with prefix."""
+        lo = bisect.bisect_left(self._vocab, prefix)
+        hi = bisect.bisect_left(self._vocab, prefix + "\U0010ffff", lo)
+        if lo == hi:
+            return self._rows[:0]
+        if hi - lo == 1:
+            return self._rows[self._offsets[lo]:self._offsets[hi]]
+        return np.unique(self._rows[self._offsets[lo]:self._offsets[hi]])
+
+    def search(self, text, limit=20):
+        """Rows of up to limit titles containing a word starting with each typed word, in row order.
+
+        A number also matches the episode with that position (as shown in the dropdown).
+        """
+        words = _WORD_RE.findall(str(text or "").lower())
+        if not words:
+            return list(range(min(limit, self.n_rows)))
+        matched = None
+        for word in sorted(set(words), key=len, reverse=True):
+            rows = self._prefix_rows(word)
+            matched = rows if matched is None else np.intersect1d(matched, rows, assume_unique=True)
+            if not len(matched):
+                break
+        result = matched[:limit].tolist()
+        text = str(text).strip().lstrip("#").rstrip(".")
+        if text.isdigit() and 0 < int(text) <= self.n_rows:
+            position = int(text) - 1
+            result = [position] + [r for r in result if r != position][:limit - 1]
+        return result
+
+
+def parse_row(value):
+    """Parse an optional row id sent by the client; invalid values become None."""
+    if value is None or value == "":
+        return None
+    try:
+        row = int(value)
+    except (TypeError, ValueError):
+        return None
+    return row if row >= 0 else None